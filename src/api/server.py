@@ -0,0 +1,133 @@
+import asyncio
+import base64
+import datetime
+import json
+import os
+import uuid
+
+import psycopg2 as pg
+from aiohttp import web
+
+from utils.db import db_pool, log_pool_stats
+from utils.queries import search_jobs
+
+
+# NOTE: read only job search service, queries run on pooled connections in
+# worker threads so the event loop only parses requests and serializes rows
+HOST = os.environ.get("api_host", "0.0.0.0")
+PORT = int(os.environ.get("api_port", 8080))
+MAX_LIMIT = 100
+DEFAULT_LIMIT = 20
+
+
+def encode_cursor(row: dict) -> str:
+    sort_key = row["sort_key"]
+    if isinstance(sort_key, datetime.datetime):
+        sort_key = sort_key.isoformat()
+    cursor = json.dumps([sort_key, str(row["id"])])
+    return base64.urlsafe_b64encode(cursor.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        sort_key, job_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        uuid.UUID(job_id)
+    except (ValueError, TypeError) as error:
+        raise ValueError("Invalid cursor") from error
+    return sort_key, job_id
+
+
+def get_bool(value: str | None) -> bool | None:
+    if value is None:
+        return None
+    if value.lower() in ("true", "1", "yes"):
+        return True
+    if value.lower() in ("false", "0", "no"):
+        return False
+    raise ValueError(f"Invalid boolean {value}")
+
+
+def get_float(value: str | None) -> float | None:
+    if value is None:
+        return None
+    return float(value)
+
+
+def get_search_params(query: dict) -> dict:
+    limit = int(query.get("limit", DEFAULT_LIMIT))
+    if not 0 < limit <= MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+    timezone_buckets = query.get("timezone")
+    return {
+        "query": query.get("q") or None,
+        "company": query.get("company") or None,
+        "remote": get_bool(query.get("remote")),
+        "location": query.get("location") or None,
+        "near": query.get("near") or None,
+        "radius_miles": get_float(query.get("radius")),
+        "timezone_buckets": timezone_buckets.upper().split(",")
+        if timezone_buckets
+        else None,
+        "min_salary": get_float(query.get("min_salary")),
+        "max_salary": get_float(query.get("max_salary")),
+        "after": decode_cursor(query["cursor"]) if query.get("cursor") else None,
+        "limit": limit,
+    }
+
+
+def serialize_job(row: dict) -> dict:
+    return {
+        "id": str(row["id"]),
+        "title": row["title"],
+        "company": row["company_name"],
+        "url": row["url"],
+        "location": row["location"],
+        "remote": row["remote"],
+        "salary": row["salary"],
+        "salary_annual_min": float(row["salary_annual_min"])
+        if row["salary_annual_min"] is not None
+        else None,
+        "salary_annual_max": float(row["salary_annual_max"])
+        if row["salary_annual_max"] is not None
+        else None,
+        "posted": row["insert_timestamp"].isoformat(),
+    }
+
+
+async def search(request: web.Request) -> web.Response:
+    try:
+        params = get_search_params(request.query)
+        rows = await asyncio.to_thread(search_jobs, **params)
+    except ValueError as error:
+        return web.json_response({"error": str(error)}, status=400)
+    except pg.errors.QueryCanceled:
+        return web.json_response({"error": "Search timed out"}, status=503)
+    except pg.DataError:
+        return web.json_response({"error": "Invalid cursor"}, status=400)
+    next_cursor = None
+    if len(rows) == params["limit"]:
+        next_cursor = encode_cursor(rows[-1])
+    return web.json_response(
+        {"jobs": [serialize_job(row) for row in rows], "next_cursor": next_cursor}
+    )
+
+
+async def health(request: web.Request) -> web.Response:
+    return web.json_response({"status": "ok", "pool": db_pool.get_stats()})
+
+
+async def close_pool(app: web.Application) -> None:
+    log_pool_stats("api")
+    db_pool.close()
+    return
+
+
+def create_app() -> web.Application:
+    app = web.Application()
+    app.add_routes([web.get("/jobs/search", search), web.get("/health", health)])
+    app.on_cleanup.append(close_pool)
+    return app
+
+
+if __name__ == "__main__":
+    web.run_app(create_app(), host=HOST, port=PORT)
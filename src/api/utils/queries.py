@@ -0,0 +1,163 @@
+from psycopg2.extras import RealDictCursor, RealDictRow
+
+from utils.db import db_pool
+
+
+METERS_PER_MILE = 1609.344
+TIMEZONE_BUCKETS = ("PT", "MT", "CT", "ET")
+
+
+def get_cities_by_name(city_name: str, limit: int = 10) -> list[RealDictRow]:
+    with db_pool.connection() as conn:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute(
+            """
+            SELECT c.id AS city_id
+            , c.name AS city_name
+            , cd.name AS country_division_name
+            , co.name AS country_name
+            , c.latitude
+            , c.longitude
+            , c.population
+            FROM logistics_jobs.cities AS c
+                INNER JOIN logistics_jobs.country_divisions AS cd
+                    ON c.country_division_id = cd.id
+                INNER JOIN logistics_jobs.countries AS co
+                    ON c.country_id = co.id
+            WHERE lower(c.name) = lower(%s)
+            ORDER BY c.population DESC
+            LIMIT %s
+            """,
+            [city_name, limit],
+        )
+        queryset = cursor.fetchall()
+    return queryset
+
+
+def search_jobs(
+    query: str | None = None,
+    company: str | None = None,
+    remote: bool | None = None,
+    location: str | None = None,
+    near: str | None = None,
+    radius_miles: float | None = None,
+    timezone_buckets: list[str] | None = None,
+    min_salary: float | None = None,
+    max_salary: float | None = None,
+    after: tuple | None = None,
+    limit: int = 50,
+) -> list[RealDictRow]:
+    # NOTE: keyset pagination, after is the sort key of the last row of the
+    # previous page, (rank, id) for keyword searches and (insert_timestamp, id)
+    # otherwise. Both sort descending so a single row comparison pages forward
+    conditions = ["j.active = true"]
+    params = {"query": query, "limit": limit}
+    if query:
+        conditions.append(
+            "j.searchable_description @@ websearch_to_tsquery('english', %(query)s)"
+        )
+        sort_key = "ts_rank(j.searchable_description, websearch_to_tsquery('english', %(query)s))"
+        after_cast = "real"
+    else:
+        sort_key = "j.insert_timestamp"
+        after_cast = "timestamp"
+    if company:
+        conditions.append("lower(co.company_name) = lower(%(company)s)")
+        params["company"] = company
+    if remote is not None:
+        conditions.append("j.remote = %(remote)s")
+        params["remote"] = remote
+    if location:
+        conditions.append(
+            """EXISTS (
+                SELECT 1
+                FROM logistics_jobs.jobs_locations AS jl
+                    INNER JOIN logistics_jobs.locations AS l
+                        ON jl.location_id = l.id
+                WHERE jl.job_id = j.id
+                    AND l.location ILIKE %(location)s
+            )"""
+        )
+        # NOTE: the filter is a prefix match, wildcards typed by the caller are
+        # matched literally
+        location = location.replace("\\", "\\\\")
+        location = location.replace("%", "\\%").replace("_", "\\_")
+        params["location"] = f"{location}%"
+    if near:
+        cities = get_cities_by_name(near, limit=1)
+        if not cities:
+            raise ValueError(f"Unable to find city {near}")
+        conditions.append(
+            """EXISTS (
+                SELECT 1
+                FROM logistics_jobs.jobs_locations AS jl
+                    INNER JOIN logistics_jobs.locations AS l
+                        ON jl.location_id = l.id
+                    INNER JOIN logistics_jobs.cities AS c
+                        ON l.city_id = c.id
+                WHERE jl.job_id = j.id
+                    AND earth_box(
+                        ll_to_earth(%(latitude)s, %(longitude)s), %(radius)s
+                    ) @> ll_to_earth(c.latitude, c.longitude)
+                    AND earth_distance(
+                        ll_to_earth(%(latitude)s, %(longitude)s)
+                        , ll_to_earth(c.latitude, c.longitude)
+                    ) <= %(radius)s
+            )"""
+        )
+        params["latitude"] = cities[0]["latitude"]
+        params["longitude"] = cities[0]["longitude"]
+        params["radius"] = (radius_miles or 50) * METERS_PER_MILE
+    if timezone_buckets:
+        for timezone_bucket in timezone_buckets:
+            if timezone_bucket not in TIMEZONE_BUCKETS:
+                raise ValueError(f"Unknown timezone bucket {timezone_bucket}")
+        conditions.append(
+            """EXISTS (
+                SELECT 1
+                FROM logistics_jobs.jobs_timezone_buckets AS t
+                WHERE t.job_id = j.id
+                    AND t.timezone_bucket = ANY(%(timezone_buckets)s)
+            )"""
+        )
+        params["timezone_buckets"] = list(timezone_buckets)
+    if min_salary is not None:
+        conditions.append("j.salary_annual_max >= %(min_salary)s")
+        params["min_salary"] = min_salary
+    if max_salary is not None:
+        conditions.append("j.salary_annual_min <= %(max_salary)s")
+        params["max_salary"] = max_salary
+    after_condition = ""
+    if after:
+        after_condition = f"WHERE (r.sort_key, r.id) < (%(after_key)s::{after_cast}, %(after_id)s::uuid)"
+        params["after_key"], params["after_id"] = after
+    with db_pool.connection() as conn:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute(
+            f"""
+            SELECT r.*
+            FROM (
+                SELECT j.id
+                , j.title
+                , j.url
+                , j.location
+                , j.salary
+                , j.salary_annual_min
+                , j.salary_annual_max
+                , j.remote
+                , j.insert_timestamp
+                , co.company_name
+                , {sort_key} AS sort_key
+                FROM logistics_jobs.jobs AS j
+                    INNER JOIN logistics_jobs.companies AS co
+                        ON j.company_id = co.id
+                WHERE {" AND ".join(conditions)}
+            ) AS r
+            {after_condition}
+            ORDER BY r.sort_key DESC, r.id DESC
+            LIMIT %(limit)s
+            """,
+            params,
+        )
+        queryset = cursor.fetchall()
+    return queryset
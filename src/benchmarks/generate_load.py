@@ -0,0 +1,189 @@
+# NOTE: fills the jobs tables with synthetic companies and a job history at
+# sizing scale, run from the repository root after build_tables.py and
+# build_locations.py. Jobs are spread over companies with a long tail, open for
+# a random lifetime within the history window so only recent ones are still
+# active, and carry descriptions, parsed salaries and resolved locations like
+# scraped rows. The load resumes from the synthetic jobs already committed, so
+# raising load_jobs grows an existing dataset to the next scale point
+
+import csv
+import datetime
+import io
+import itertools
+import os
+import random
+import sys
+import time
+import uuid
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_PATH, "..", "scrapers"))
+
+import synthetic  # noqa: E402
+
+from queries import (  # noqa: E402
+    insert_synthetic_companies,
+    count_jobs_by_insert_run_ids,
+    copy_jobs,
+)
+from utils.models import Job  # noqa: E402
+from utils.queries import get_locations  # noqa: E402
+from utils.salaries import get_salary_row  # noqa: E402
+
+
+COMPANIES = int(os.environ.get("load_companies", 10000))
+JOBS = int(os.environ.get("load_jobs", 5000000))
+HISTORY_DAYS = int(os.environ.get("load_history_days", 365))
+MEAN_LIFETIME_DAYS = float(os.environ.get("load_mean_lifetime_days", 45))
+CHUNK_SIZE = int(os.environ.get("load_chunk_size", 50000))
+SEED = os.environ.get("load_seed", "synthetic")
+REMOTE_SHARE = 0.08
+MULTI_LOCATION_SHARE = 0.1
+SYNTHETIC_RUN_IDS = [
+    str(uuid.uuid5(uuid.NAMESPACE_URL, f"synthetic-run/{day}"))
+    for day in range(HISTORY_DAYS)
+]
+
+
+def get_companies() -> list[tuple]:
+    rng = random.Random(f"{SEED}/companies")
+    ats_names = list(synthetic.ATS_WEIGHTS)
+    ats_weights = list(synthetic.ATS_WEIGHTS.values())
+    companies = []
+    for i in range(COMPANIES):
+        company_name = synthetic.get_company_name(i)
+        ats = rng.choices(ats_names, ats_weights)[0]
+        companies.append(
+            (
+                str(uuid.uuid5(uuid.NAMESPACE_URL, company_name)),
+                company_name,
+                ats,
+                synthetic.ATS_CAREER_SITE_URLS[ats].format(board=f"synthetic{i}"),
+            )
+        )
+    return companies
+
+
+def get_city_locations() -> list[tuple]:
+    # NOTE: sorted by id so a seeded chunk picks the same locations on rerun
+    return sorted(
+        (row[0], f"{row[8]}, {row[6]}, {row[4]}", row[9])
+        for row in get_locations()
+        if row[3] is not None
+    )
+
+
+def get_job_location(rng: random.Random, locations: list[tuple], cum_weights) -> list:
+    if rng.random() < REMOTE_SHARE:
+        return [(None, "Remote")]
+    k = 2 if rng.random() < MULTI_LOCATION_SHARE else 1
+    # NOTE: choices draws with replacement, a city picked twice would break
+    # job_locations_unique_job_location and abort the chunk's COPY
+    return list(
+        dict.fromkeys(
+            (location_id, location)
+            for location_id, location, _ in rng.choices(
+                locations, cum_weights=cum_weights, k=k
+            )
+        )
+    )
+
+
+def write_jobs_chunk(
+    start: int,
+    end: int,
+    companies: list[tuple],
+    company_cum_weights: list[float],
+    locations: list[tuple],
+    location_cum_weights: list[float],
+    history_start: datetime.datetime,
+) -> tuple[io.StringIO, io.StringIO, list[str]]:
+    # NOTE: seeded by the chunk's first job so reruns write the same rows
+    rng = random.Random(f"{SEED}/jobs/{start}")
+    jobs_file, jobs_locations_file = io.StringIO(), io.StringIO()
+    jobs_writer = csv.writer(jobs_file)
+    jobs_locations_writer = csv.writer(jobs_locations_file)
+    company_indexes = rng.choices(
+        range(len(companies)), cum_weights=company_cum_weights, k=end - start
+    )
+    job_ids = []
+    for i, company_index in zip(range(start, end), company_indexes):
+        job = Job()
+        job.company_id, _, ats, _ = companies[company_index]
+        job.id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"synthetic-job/{i}"))
+        job.title = synthetic.get_title(rng)
+        job.url = synthetic.get_job_url(
+            ats, f"synthetic{company_index}", job.id, i, job.title
+        )
+        job.description = synthetic.get_description(rng, job.title)
+        job.salary = synthetic.get_salary(rng)
+        job_locations = get_job_location(rng, locations, location_cum_weights)
+        job.location = "; ".join(location for _, location in job_locations)
+        insert_day = rng.randrange(HISTORY_DAYS)
+        inactive_day = insert_day + int(rng.expovariate(1 / MEAN_LIFETIME_DAYS))
+        job.active = inactive_day >= HISTORY_DAYS
+        job.new = insert_day >= HISTORY_DAYS - 1
+        job.remote = job.location == "Remote"
+        job.insert_timestamp = (
+            history_start
+            + datetime.timedelta(days=insert_day, seconds=rng.randrange(86400))
+        ).strftime("%Y-%m-%d %H:%M:%S")
+        job.scrape_run_id = SYNTHETIC_RUN_IDS[insert_day]
+        # NOTE: laid out like upsert_jobs, with scrape_inactive_run_id last
+        jobs_writer.writerow(
+            (
+                *job.to_row(),
+                job.get_listing_fingerprint(),
+                job.get_description_hash(),
+                *get_salary_row(job.salary),
+                None if job.active else SYNTHETIC_RUN_IDS[inactive_day],
+            )
+        )
+        for location_id, location in job_locations:
+            jobs_locations_writer.writerow((job.id, location_id, location))
+        job_ids.append(job.id)
+    jobs_file.seek(0)
+    jobs_locations_file.seek(0)
+    return jobs_file, jobs_locations_file, job_ids
+
+
+def generate_load(job_target: int) -> None:
+    locations = get_city_locations()
+    if not locations:
+        print("No city locations found, run build_locations.py first")
+        return
+    companies = get_companies()
+    insert_synthetic_companies(companies)
+    job_count = count_jobs_by_insert_run_ids(SYNTHETIC_RUN_IDS)
+    print(
+        f"Generating {max(job_target - job_count, 0)} jobs for {len(companies)}"
+        f" companies, {job_count} already loaded"
+    )
+    company_cum_weights = synthetic.get_cum_weights(len(companies))
+    location_cum_weights = list(
+        itertools.accumulate(population for _, _, population in locations)
+    )
+    history_start = datetime.datetime.utcnow() - datetime.timedelta(days=HISTORY_DAYS)
+    start_time = time.perf_counter()
+    for start in range(job_count, job_target, CHUNK_SIZE):
+        end = min(start + CHUNK_SIZE, job_target)
+        jobs_file, jobs_locations_file, job_ids = write_jobs_chunk(
+            start,
+            end,
+            companies,
+            company_cum_weights,
+            locations,
+            location_cum_weights,
+            history_start,
+        )
+        copy_jobs(jobs_file, jobs_locations_file, job_ids)
+        elapsed = time.perf_counter() - start_time
+        print(
+            f"{end}/{job_target} jobs loaded"
+            f" | {(end - job_count) / elapsed:.0f} jobs/s"
+        )
+    return
+
+
+if __name__ == "__main__":
+    generate_load(JOBS)
@@ -0,0 +1,369 @@
+# NOTE: sizing benchmark for Postgres and the search path, run from the
+# repository root against a scratch database built with build_tables.py and
+# build_locations.py. Each scale point grows the synthetic dataset with
+# generate_load.py, then times the scrapers' diff, upsert and deactivate
+# queries on a sample of synthetic companies with some churn in their job
+# lists, which is removed again afterwards, and every search shape from
+# search_load_test.py against a local API server. Results are written as JSON
+# per commit
+
+import contextlib
+import datetime
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+import uuid
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_PATH, "..", "scrapers"))
+
+import synthetic  # noqa: E402
+
+from search_load_test import QUERY_MIX, get_percentile  # noqa: E402
+from utils.db import db_pool  # noqa: E402
+from utils.helpers import examine_current_job_list  # noqa: E402
+from utils.models import Job  # noqa: E402
+from utils.queries import (  # noqa: E402
+    get_active_job_ids,
+    get_active_job_ids_by_company_id,
+    get_locations,
+    upsert_jobs,
+    update_inactive_jobs,
+    deactivate_unseen_jobs,
+    refresh_jobs_timezone_buckets,
+)
+from utils.snapshot import active_job_index  # noqa: E402
+
+
+SCALE_POINTS = [
+    int(point)
+    for point in os.environ.get(
+        "benchmark_scale_points", "100000,1000000,5000000"
+    ).split(",")
+]
+SAMPLE_COMPANIES = int(os.environ.get("benchmark_sample_companies", 200))
+CHURN = float(os.environ.get("benchmark_churn", 0.1))
+SEARCH_REPEATS = int(os.environ.get("benchmark_search_repeats", 5))
+API_PORT = int(os.environ.get("benchmark_api_port", 8091))
+RESULTS_DIR = os.environ.get("benchmark_results_dir", ".cache/benchmarks")
+
+
+def get_synthetic_companies() -> list[tuple]:
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id::text
+            , ats
+            FROM logistics_jobs.companies
+            WHERE company_name LIKE 'Synthetic %'
+            ORDER BY company_name
+            """
+        )
+        queryset = cursor.fetchall()
+    return queryset
+
+
+def get_table_stats() -> dict:
+    # NOTE: analyzed first, a bulk load leaves the planner with stale estimates
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("ANALYZE logistics_jobs.jobs")
+        cursor.execute("ANALYZE logistics_jobs.jobs_locations")
+        cursor.execute("ANALYZE logistics_jobs.jobs_timezone_buckets")
+        cursor.execute(
+            """
+            SELECT count(*)
+            , count(*) FILTER (WHERE active = true)
+            , pg_total_relation_size('logistics_jobs.jobs')
+            , pg_relation_size('logistics_jobs.ts_searchable_description_idx')
+            , pg_total_relation_size('logistics_jobs.jobs_locations')
+            FROM logistics_jobs.jobs
+            """
+        )
+        row = cursor.fetchone()
+        conn.commit()
+    return dict(
+        zip(
+            (
+                "jobs",
+                "active_jobs",
+                "jobs_bytes",
+                "search_index_bytes",
+                "jobs_locations_bytes",
+            ),
+            row,
+        )
+    )
+
+
+def generate_load(job_target: int) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, os.path.join(BENCHMARKS_PATH, "generate_load.py")],
+        env={**os.environ, "load_jobs": str(job_target)},
+        check=True,
+    )
+    return time.perf_counter() - start
+
+
+def get_location_texts() -> tuple[list[str], list[int]]:
+    location_texts, populations = [], []
+    for row in get_locations():
+        if row[3] is not None:
+            location_texts.append(f"{row[8]}, {row[6]}")
+            populations.append(row[9])
+    return location_texts, populations
+
+
+def get_new_jobs(
+    rng: random.Random, company_id: str, ats: str, count: int, locations: tuple
+) -> list[Job]:
+    location_texts, populations = locations
+    jobs = []
+    for _ in range(count):
+        job = Job()
+        job.id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        job.company_id = company_id
+        job.title = synthetic.get_title(rng)
+        job.url = synthetic.get_job_url(
+            ats, "benchmark", job.id, rng.getrandbits(32), job.title
+        )
+        job.description = synthetic.get_description(rng, job.title)
+        job.salary = synthetic.get_salary(rng)
+        job.location = rng.choices(location_texts, populations)[0]
+        jobs.append(job)
+    return jobs
+
+
+def get_timings(timings: list[float]) -> dict:
+    timings = sorted(timings)
+    if not timings:
+        return {"count": 0}
+    return {
+        "count": len(timings),
+        "mean_ms": statistics.mean(timings) * 1000,
+        "p50_ms": get_percentile(timings, 0.50) * 1000,
+        "p95_ms": get_percentile(timings, 0.95) * 1000,
+        "max_ms": timings[-1] * 1000,
+    }
+
+
+def time_company_queries(job_target: int, companies: list[tuple], run_id: str) -> dict:
+    # NOTE: half of the sample deactivates per company and half through one
+    # run level deactivate_unseen_jobs, the two DEACTIVATION_MODE paths
+    rng = random.Random(f"benchmark/{job_target}")
+    locations = get_location_texts()
+    timings = {
+        "diff_db": [],
+        "diff_snapshot": [],
+        "upsert": [],
+        "upsert_per_job": [],
+        "deactivate_company": [],
+    }
+    start = time.perf_counter()
+    active_job_index.load(get_active_job_ids())
+    snapshot_seconds = time.perf_counter() - start
+    seen_job_ids = {}
+    for i, (company_id, ats) in enumerate(
+        rng.sample(companies, min(SAMPLE_COMPANIES, len(companies)))
+    ):
+        start = time.perf_counter()
+        active_ids = sorted(
+            str(job_id) for job_id, in get_active_job_ids_by_company_id(company_id)
+        )
+        timings["diff_db"].append(time.perf_counter() - start)
+        current_job_list = [
+            Job(id=job_id, company_id=company_id)
+            for job_id in rng.sample(active_ids, int(len(active_ids) * (1 - CHURN)))
+        ]
+        current_job_list += get_new_jobs(
+            rng, company_id, ats, max(round(len(active_ids) * CHURN), 1), locations
+        )
+        start = time.perf_counter()
+        ids_to_add, ids_to_deactivate = examine_current_job_list(
+            current_job_list, company_id
+        )
+        timings["diff_snapshot"].append(time.perf_counter() - start)
+        jobs_to_add = [job for job in current_job_list if job.id in ids_to_add]
+        for job in jobs_to_add:
+            job.scrape_run_id = run_id
+            job.active = True
+            job.new = True
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            upsert_jobs(jobs_to_add)
+        timings["upsert"].append(time.perf_counter() - start)
+        timings["upsert_per_job"].append(timings["upsert"][-1] / len(jobs_to_add))
+        if i % 2 == 0:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                update_inactive_jobs(list(ids_to_deactivate), run_id)
+            timings["deactivate_company"].append(time.perf_counter() - start)
+        else:
+            seen_job_ids[company_id] = [job.id for job in current_job_list]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        deactivate_unseen_jobs(seen_job_ids, run_id)
+    deactivate_run_seconds = time.perf_counter() - start
+    return {
+        "snapshot_load_seconds": snapshot_seconds,
+        "deactivate_run_seconds": deactivate_run_seconds,
+        **{name: get_timings(values) for name, values in timings.items()},
+    }
+
+
+def remove_churn(run_id: str) -> None:
+    # NOTE: the churn is tagged with the run id, its jobs are deleted and the
+    # synthetic jobs it deactivated come back, so every scale point measures
+    # the generated dataset
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            DELETE FROM logistics_jobs.jobs_timezone_buckets
+            WHERE job_id IN (
+                SELECT id
+                FROM logistics_jobs.jobs
+                WHERE scrape_insert_run_id = %s
+            )
+            """,
+            [run_id],
+        )
+        cursor.execute(
+            """
+            DELETE FROM logistics_jobs.jobs_locations
+            WHERE job_id IN (
+                SELECT id
+                FROM logistics_jobs.jobs
+                WHERE scrape_insert_run_id = %s
+            )
+            """,
+            [run_id],
+        )
+        cursor.execute(
+            """
+            DELETE FROM logistics_jobs.jobs
+            WHERE scrape_insert_run_id = %s
+            """,
+            [run_id],
+        )
+        cursor.execute(
+            """
+            UPDATE logistics_jobs.jobs
+            SET active = true
+                , scrape_inactive_run_id = NULL
+            WHERE scrape_inactive_run_id = %s
+            RETURNING id
+            """,
+            [run_id],
+        )
+        job_ids = [str(job_id) for job_id, in cursor.fetchall()]
+        conn.commit()
+    refresh_jobs_timezone_buckets(job_ids)
+    return
+
+
+@contextlib.contextmanager
+def api_server():
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BENCHMARKS_PATH, "..", "api", "server.py")],
+        env={**os.environ, "api_host": "127.0.0.1", "api_port": str(API_PORT)},
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{API_PORT}/health")
+                break
+            except OSError:
+                time.sleep(0.1)
+        yield f"http://127.0.0.1:{API_PORT}/jobs/search"
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def time_searches() -> dict:
+    # NOTE: one request at a time, this measures query latency at the data
+    # size, search_load_test.py measures it under concurrency
+    searches = {}
+    with api_server() as search_url:
+        for params in QUERY_MIX:
+            search_name = urllib.parse.urlencode(params) or "latest"
+            timings, errors = [], 0
+            for _ in range(SEARCH_REPEATS):
+                start = time.perf_counter()
+                try:
+                    urllib.request.urlopen(
+                        f"{search_url}?{urllib.parse.urlencode(params)}", timeout=30
+                    ).read()
+                    timings.append(time.perf_counter() - start)
+                except OSError:
+                    errors += 1
+            searches[search_name] = {**get_timings(timings), "errors": errors}
+    return searches
+
+
+def run_scale_point(job_target: int) -> dict:
+    result = {"job_target": job_target, "generate_seconds": generate_load(job_target)}
+    result.update(get_table_stats())
+    run_id = str(uuid.uuid4())
+    try:
+        result.update(
+            time_company_queries(job_target, get_synthetic_companies(), run_id)
+        )
+    finally:
+        remove_churn(run_id)
+    result["search"] = time_searches()
+    print(
+        f"{result['jobs']} jobs | {result['active_jobs']} active"
+        f" | snapshot {result['snapshot_load_seconds']:.2f}s"
+        f" | diff db p95 {result['diff_db']['p95_ms']:.1f}ms"
+        f" | upsert p95 {result['upsert']['p95_ms']:.1f}ms"
+        f" | deactivate p95 {result['deactivate_company']['p95_ms']:.1f}ms"
+        f" | deactivate run {result['deactivate_run_seconds']:.2f}s"
+    )
+    for search_name, timings in result["search"].items():
+        if timings["count"]:
+            print(
+                f"  {search_name:<48} | p50 {timings['p50_ms']:8.1f}ms"
+                f" | max {timings['max_ms']:8.1f}ms | {timings['errors']} errors"
+            )
+        else:
+            print(f"  {search_name:<48} | {timings['errors']} errors")
+    return result
+
+
+def get_commit() -> str:
+    result = subprocess.run(
+        ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=False
+    )
+    return result.stdout.strip() or "unknown"
+
+
+if __name__ == "__main__":
+    results = {
+        "commit": get_commit(),
+        "created_at": datetime.datetime.utcnow().isoformat(),
+        "config": {
+            "scale_points": SCALE_POINTS,
+            "sample_companies": SAMPLE_COMPANIES,
+            "churn": CHURN,
+            "search_repeats": SEARCH_REPEATS,
+        },
+        "scales": [run_scale_point(job_target) for job_target in SCALE_POINTS],
+    }
+    db_pool.close()
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results_path = os.path.join(RESULTS_DIR, f"load-{results['commit'][:12]}.json")
+    with open(results_path, "w") as results_file:
+        json.dump(results, results_file, indent=2)
+    print(f"Results written to {results_path}")
@@ -0,0 +1,118 @@
+# NOTE: checks every available HTML parser backend against html.parser on the
+# recorded fixtures, then times each backend, run from the repository root.
+# Job fields must match exactly, descriptions are compared with whitespace
+# collapsed since html.parser's handling of inter-tag whitespace varies by
+# BeautifulSoup version. Location texts in fixtures/locations.json are also
+# resolved against a small location index and must match their expected ids
+
+import contextlib
+import io
+import json
+import os
+import sys
+import timeit
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_PATH, "..", "scrapers"))
+
+import greenhouse  # noqa: E402
+import jazzhr  # noqa: E402
+import lever  # noqa: E402
+
+from utils.locations import LocationIndex  # noqa: E402
+from utils.parsers import get_available_parsers, get_parser  # noqa: E402
+
+
+FIXTURES_PATH = os.path.join(BENCHMARKS_PATH, "fixtures")
+ITERATIONS = int(os.environ.get("benchmark_iterations", 200))
+LEVER_CAREER_SITE_URL = "https://jobs.lever.co/roadrunner/"
+
+PARSE_CASES = [
+    ("greenhouse listing", greenhouse.parse_response_for_job_list, "greenhouse_listing.html", []),
+    ("greenhouse description", greenhouse.parse_job_description, "greenhouse_description.html", []),
+    ("lever listing", lever.parse_response_for_job_list, "lever_listing.html", [LEVER_CAREER_SITE_URL]),
+    ("lever description", lever.parse_job_description, "lever_description.html", []),
+    ("jazzhr listing", jazzhr.parse_response_for_job_list, "jazzhr_listing.html", []),
+    ("jazzhr description", jazzhr.parse_job_description, "jazzhr_description.html", []),
+]  # fmt: skip
+
+
+def read_fixture(fixture_name: str) -> bytes:
+    with open(os.path.join(FIXTURES_PATH, fixture_name), mode="rb") as fixture_file:
+        return fixture_file.read()
+
+
+def normalize_result(result) -> list | str:
+    if isinstance(result, list):
+        return [job.to_row() for job in result]
+    return " ".join(result.split())
+
+
+def check_parity(parser_names: list[str]) -> bool:
+    reference_parser = get_parser("html.parser")
+    parity = True
+    for case_name, parse_function, fixture_name, args in PARSE_CASES:
+        content = read_fixture(fixture_name)
+        expected = normalize_result(
+            parse_function(content, *args, parser=reference_parser)
+        )
+        for parser_name in parser_names:
+            result = normalize_result(
+                parse_function(content, *args, parser=get_parser(parser_name))
+            )
+            if result != expected:
+                parity = False
+                print(f"MISMATCH | {case_name} | {parser_name}")
+                print(f"  expected: {expected!r}")
+                print(f"  received: {result!r}")
+    return parity
+
+
+def check_locations() -> bool:
+    # NOTE: resolutions the noise token stripping has broken before, like the
+    # IN and ON division codes read as "in" and "on"
+    with open(os.path.join(FIXTURES_PATH, "locations.json")) as fixture_file:
+        fixture = json.load(fixture_file)
+    location_index = LocationIndex("US")
+    with contextlib.redirect_stdout(io.StringIO()):
+        location_index.load([tuple(location) for location in fixture["locations"]])
+    parity = True
+    for location, expected in fixture["cases"].items():
+        result = location_index.resolve(location)
+        if result != expected:
+            parity = False
+            print(f"MISMATCH | location | {location!r}")
+            print(f"  expected: {expected!r}")
+            print(f"  received: {result!r}")
+    return parity
+
+
+def time_parsers(parser_names: list[str]) -> None:
+    for case_name, parse_function, fixture_name, args in PARSE_CASES:
+        content = read_fixture(fixture_name)
+        baseline = None
+        for parser_name in parser_names:
+            parser = get_parser(parser_name)
+            with contextlib.redirect_stdout(io.StringIO()):
+                seconds = timeit.timeit(
+                    lambda: parse_function(content, *args, parser=parser),
+                    number=ITERATIONS,
+                )
+            per_page = seconds / ITERATIONS * 1000
+            baseline = baseline or per_page
+            print(
+                f"{case_name:<24} | {parser_name:<11} | {per_page:8.3f} ms/page"
+                f" | {baseline / per_page:5.1f}x"
+            )
+    return
+
+
+if __name__ == "__main__":
+    for scraper in (greenhouse, jazzhr, lever):
+        scraper.scrape_run_id = "benchmark"
+    parser_names = get_available_parsers()
+    parity = check_parity(parser_names)
+    parity = check_locations() and parity
+    time_parsers(parser_names)
+    if not parity:
+        sys.exit(1)
@@ -0,0 +1,110 @@
+from typing import TextIO
+
+from psycopg2.extras import execute_values
+
+from utils.db import db_pool
+
+
+# NOTE: bulk loaders for generate_load.py, run with the scrapers' utils on the
+# path like the rest of the benchmarks
+
+
+def insert_synthetic_companies(companies: list[tuple]) -> None:
+    # NOTE: reruns grow the same dataset, companies already loaded are kept
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        execute_values(
+            cursor,
+            """
+            INSERT INTO logistics_jobs.companies(
+                id
+                , company_name
+                , ats
+                , career_site_url
+            )
+            VALUES %s
+            ON CONFLICT (id) DO NOTHING
+            """,
+            companies,
+        )
+        conn.commit()
+    return
+
+
+def count_jobs_by_insert_run_ids(run_ids: list[str]) -> int:
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT count(*)
+            FROM logistics_jobs.jobs
+            WHERE scrape_insert_run_id = ANY(%s::uuid[])
+            """,
+            [run_ids],
+        )
+        job_count = cursor.fetchone()[0]
+    return job_count
+
+
+def copy_jobs(jobs_file: TextIO, jobs_locations_file: TextIO, job_ids: list) -> int:
+    # NOTE: bulk load for generated jobs, rows are laid out like upsert_jobs
+    # with scrape_inactive_run_id last. A chunk of jobs, their locations and
+    # timezone buckets load in one transaction, so an interrupted load can
+    # resume from the committed job count
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.copy_expert(
+            """
+            COPY logistics_jobs.jobs(
+                id
+                , company_id
+                , title
+                , url
+                , description
+                , salary
+                , location
+                , active
+                , new
+                , remote
+                , insert_timestamp
+                , scrape_insert_run_id
+                , listing_fingerprint
+                , description_hash
+                , salary_min
+                , salary_max
+                , salary_currency
+                , salary_period
+                , salary_annual_min
+                , salary_annual_max
+                , salary_bucket
+                , scrape_inactive_run_id)
+            FROM STDIN WITH (FORMAT csv)
+            """,
+            jobs_file,
+        )
+        job_count = cursor.rowcount
+        cursor.copy_expert(
+            """
+            COPY logistics_jobs.jobs_locations(job_id, location_id, location)
+            FROM STDIN WITH (FORMAT csv)
+            """,
+            jobs_locations_file,
+        )
+        cursor.execute(
+            """
+            INSERT INTO logistics_jobs.jobs_timezone_buckets(timezone_bucket, job_id)
+            SELECT DISTINCT l.timezone_bucket
+            , jl.job_id
+            FROM logistics_jobs.jobs_locations AS jl
+                INNER JOIN logistics_jobs.locations AS l
+                    ON jl.location_id = l.id
+                INNER JOIN logistics_jobs.jobs AS j
+                    ON jl.job_id = j.id
+            WHERE jl.job_id = ANY(%s::uuid[])
+                AND j.active = true
+                AND l.timezone_bucket IS NOT NULL
+            """,
+            [job_ids],
+        )
+        conn.commit()
+    return job_count
@@ -0,0 +1,410 @@
+# NOTE: offline end to end benchmark, run from the repository root. Recorded
+# fixtures are replayed by a local fixture server per ATS, with ids and urls
+# rewritten for each synthetic company, and every scraper's scrape_company runs
+# through the real engine, pipeline and queries. Each ATS is scraped twice, a
+# cold pass that adds every job and a warm pass that only diffs. The database
+# steps need a scratch Postgres built with build_tables.py (postgres_* env),
+# without one only parse timings are recorded. Results are written as JSON per
+# commit, set benchmark_baseline to a previous result to compare
+
+import contextlib
+import datetime
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import timeit
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_PATH, "..", "scrapers"))
+# NOTE: the board cache would turn the warm pass into 304s and the browser
+# fallbacks need network, both are set before the scrapers read their settings
+os.environ.setdefault("scrape_board_cache", "false")
+os.environ.setdefault("scrape_fetch_mode", "api")
+
+import psycopg2 as pg  # noqa: E402
+
+import ashby  # noqa: E402
+import greenhouse  # noqa: E402
+import jazzhr  # noqa: E402
+import lever  # noqa: E402
+import workable  # noqa: E402
+
+from parse_benchmark import PARSE_CASES, read_fixture  # noqa: E402
+from utils.db import db_pool  # noqa: E402
+from utils.engine import ScrapeEngine  # noqa: E402
+from utils.queries import get_active_job_ids  # noqa: E402
+from utils.snapshot import active_job_index  # noqa: E402
+from utils.telemetry import run_telemetry  # noqa: E402
+
+
+COMPANIES = int(os.environ.get("benchmark_companies", 50))
+POSTING_COPIES = int(os.environ.get("benchmark_posting_copies", 5))
+CONCURRENCY = int(os.environ.get("benchmark_concurrency", 8))
+ITERATIONS = int(os.environ.get("benchmark_iterations", 200))
+RESULTS_DIR = os.environ.get("benchmark_results_dir", ".cache/benchmarks")
+BASELINE_PATH = os.environ.get("benchmark_baseline")
+SCRAPERS = (greenhouse, lever, jazzhr, ashby, workable)
+
+API_PARSE_CASES = [
+    ("greenhouse api listing", greenhouse.parse_api_response_for_job_list, "greenhouse_api.json", ["acmefreight"]),
+    ("lever api listing", lever.parse_api_response_for_job_list, "lever_api.json", ["https://jobs.lever.co/roadrunner/"]),
+    ("ashby api listing", ashby.parse_api_response_for_job_list, "ashby_api.json", ["https://jobs.ashbyhq.com/shipfast/"]),
+    ("workable api listing", workable.parse_api_response_for_job_list, "workable_api.json", ["harbor"]),
+]  # fmt: skip
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        page = self.server.pages.get(urlparse(self.path).path)
+        if page is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        content_type, body = page
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        return
+
+    def log_message(self, format: str, *args) -> None:
+        return
+
+
+def start_fixture_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    server.daemon_threads = True
+    server.base_url = f"http://127.0.0.1:{server.server_port}"
+    server.pages = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def get_boards() -> list[str]:
+    return [f"bench{i}" for i in range(COMPANIES)]
+
+
+def get_fixture_uuid(*names) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, "/".join(map(str, names))))
+
+
+def json_page(data) -> tuple[str, bytes]:
+    return "application/json", json.dumps(data).encode("utf-8")
+
+
+def add_greenhouse_pages(server: ThreadingHTTPServer) -> list[str]:
+    greenhouse.ATS_BASE_URL = server.base_url
+    greenhouse.ATS_API_URL = (
+        server.base_url + "/v1/boards/{board_token}/jobs?content=true"
+    )
+    postings = json.loads(read_fixture("greenhouse_api.json"))["jobs"]
+    for board in get_boards():
+        server.pages[f"/v1/boards/{board}/jobs"] = json_page(
+            {
+                "jobs": [
+                    {**posting, "id": f"{board}-{copy}-{posting['id']}"}
+                    for copy in range(POSTING_COPIES)
+                    for posting in postings
+                ]
+            }
+        )
+    return [f"{server.base_url}/{board}" for board in get_boards()]
+
+
+def add_lever_pages(server: ThreadingHTTPServer) -> list[str]:
+    lever.ATS_API_URL = server.base_url + "/v0/postings/{site}?mode=json"
+    postings = json.loads(read_fixture("lever_api.json"))
+    for board in get_boards():
+        server.pages[f"/v0/postings/{board}"] = json_page(
+            [
+                {
+                    **posting,
+                    "hostedUrl": f"{server.base_url}/{board}/"
+                    + get_fixture_uuid(board, copy, posting["id"]),
+                }
+                for copy in range(POSTING_COPIES)
+                for posting in postings
+            ]
+        )
+    return [f"{server.base_url}/{board}/" for board in get_boards()]
+
+
+def add_jazzhr_pages(server: ThreadingHTTPServer) -> list[str]:
+    jazzhr.ATS_BASE_PATTERN = f"^{re.escape(server.base_url)}/bench[0-9]+/apply"
+    listing = read_fixture("jazzhr_listing.html").decode("utf-8")
+    head, postings, tail = re.split(
+        r'(?<=<ul class="list-group">)(.*)(?=</ul>\s*</div>)', listing, flags=re.S
+    )[:3]
+    description = ("text/html", read_fixture("jazzhr_description.html"))
+    for board in get_boards():
+        board_postings = []
+        for copy in range(POSTING_COPIES):
+            board_postings.append(
+                re.sub(
+                    r"https://[0-9a-z]+\.applytojob\.com/apply/(\w+)/",
+                    rf"{server.base_url}/{board}/apply/\g<1>{copy}/",
+                    postings,
+                )
+            )
+        server.pages[f"/{board}/apply"] = (
+            "text/html",
+            (head + "".join(board_postings) + tail).encode("utf-8"),
+        )
+        for path in re.findall(
+            rf"{re.escape(server.base_url)}([^\"]+)", tail + "".join(board_postings)
+        ):
+            server.pages[path] = description
+    return [f"{server.base_url}/{board}/apply" for board in get_boards()]
+
+
+def add_ashby_pages(server: ThreadingHTTPServer) -> list[str]:
+    ashby.ATS_API_URL = (
+        server.base_url + "/posting-api/job-board/{board}?includeCompensation=true"
+    )
+    postings = json.loads(read_fixture("ashby_api.json"))["jobs"]
+    for board in get_boards():
+        server.pages[f"/posting-api/job-board/{board}"] = json_page(
+            {
+                "jobs": [
+                    {
+                        **posting,
+                        "jobUrl": f"{server.base_url}/{board}/"
+                        + get_fixture_uuid(board, copy, posting["jobUrl"]),
+                    }
+                    for copy in range(POSTING_COPIES)
+                    for posting in postings
+                ]
+            }
+        )
+    return [f"{server.base_url}/{board}/" for board in get_boards()]
+
+
+def add_workable_pages(server: ThreadingHTTPServer) -> list[str]:
+    workable.ATS_BASE_URL = server.base_url
+    workable.ATS_API_URL = (
+        server.base_url + "/api/v1/widget/accounts/{account}?details=true"
+    )
+    postings = json.loads(read_fixture("workable_api.json"))["jobs"]
+    for board in get_boards():
+        server.pages[f"/api/v1/widget/accounts/{board}"] = json_page(
+            {
+                "jobs": [
+                    {**posting, "shortcode": f"{posting['shortcode']}{board}{copy}"}
+                    for copy in range(POSTING_COPIES)
+                    for posting in postings
+                ]
+            }
+        )
+    return [f"{server.base_url}/{board}/" for board in get_boards()]
+
+
+ADD_PAGES = {
+    greenhouse.ATS_TO_SCRAPE: add_greenhouse_pages,
+    lever.ATS_TO_SCRAPE: add_lever_pages,
+    jazzhr.ATS_TO_SCRAPE: add_jazzhr_pages,
+    ashby.ATS_TO_SCRAPE: add_ashby_pages,
+    workable.ATS_TO_SCRAPE: add_workable_pages,
+}
+
+
+def time_parse_cases() -> dict[str, float]:
+    # NOTE: the parsers log errors against the module run id, set by run.py
+    for scraper in SCRAPERS:
+        scraper.scrape_run_id = "benchmark"
+    parse_times = {}
+    for case_name, parse_function, fixture_name, args in PARSE_CASES + API_PARSE_CASES:
+        content = read_fixture(fixture_name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            seconds = timeit.timeit(
+                lambda: parse_function(content, *args), number=ITERATIONS
+            )
+        parse_times[case_name] = seconds / ITERATIONS * 1000
+        print(f"{case_name:<24} | {parse_times[case_name]:8.3f} ms/page")
+    return parse_times
+
+
+def get_company_ids(ats: str) -> list[str]:
+    return [get_fixture_uuid("benchmark", ats, i) for i in range(COMPANIES)]
+
+
+def reset_benchmark_companies(ats: str, career_site_urls: list[str]) -> list[tuple]:
+    # NOTE: removes the jobs left by earlier runs so the cold pass adds every
+    # job, urls are rewritten since the fixture server port changes per run
+    company_ids = get_company_ids(ats)
+    companies = [
+        (company_id, f"Benchmark {ats} {i}", career_site_url, ats)
+        for i, (company_id, career_site_url) in enumerate(
+            zip(company_ids, career_site_urls)
+        )
+    ]
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            DELETE FROM logistics_jobs.jobs_locations
+            WHERE job_id IN (
+                SELECT id
+                FROM logistics_jobs.jobs
+                WHERE company_id = ANY(%s::uuid[])
+            )
+            """,
+            [company_ids],
+        )
+        cursor.execute(
+            """
+            DELETE FROM logistics_jobs.jobs
+            WHERE company_id = ANY(%s::uuid[])
+            """,
+            [company_ids],
+        )
+        for company_id, company_name, career_site_url, _ in companies:
+            cursor.execute(
+                """
+                INSERT INTO logistics_jobs.companies(
+                    id
+                    , company_name
+                    , ats
+                    , career_site_url
+                )
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (id)
+                DO UPDATE SET career_site_url = EXCLUDED.career_site_url
+                """,
+                [company_id, company_name, ats, career_site_url],
+            )
+        conn.commit()
+    return companies
+
+
+def run_pass(scraper, companies: list[tuple], pass_name: str) -> dict:
+    run_id = str(uuid.uuid4())
+    scraper.scrape_run_id = run_id
+    run_telemetry.begin(run_id, f"benchmark {scraper.ATS_TO_SCRAPE} {pass_name}")
+    active_job_index.load(get_active_job_ids())
+    engine = ScrapeEngine(
+        run_id,
+        ats=scraper.ATS_TO_SCRAPE,
+        max_concurrency=CONCURRENCY,
+        host_interval=0,
+    )
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = engine.run(companies, scraper.scrape_company)
+    elapsed = time.perf_counter() - start
+    totals = run_telemetry.get_run_totals()
+    jobs_seen = sum(len(job_ids) for job_ids in engine.seen_job_ids.values())
+    return {
+        "seconds": elapsed,
+        "companies": len(companies),
+        "companies_failed": len(
+            [result for result in results if isinstance(result, Exception)]
+        ),
+        "companies_per_minute": len(companies) / elapsed * 60,
+        "jobs_seen": jobs_seen,
+        "jobs_added": totals["jobs_added"],
+        "jobs_per_second": jobs_seen / elapsed,
+        "requests": totals["requests"],
+        "bytes_downloaded": totals["bytes_downloaded"],
+        "fetch_time": totals["fetch_time"],
+        "parse_time": totals["parse_time"],
+        "db_time": totals["db_time"],
+        "errors": totals["errors"],
+    }
+
+
+def has_database() -> bool:
+    # NOTE: building the pool connects, a missing postgres_* variable raises
+    # KeyError from build_dsn and an unreachable server OperationalError
+    try:
+        db_pool.get_pool()
+    except (pg.OperationalError, KeyError) as error:
+        print(f"Skipping end to end runs, no benchmark database: {error!r}")
+        return False
+    return True
+
+
+def run_scrapes(server: ThreadingHTTPServer) -> dict[str, dict]:
+    scrape_results = {}
+    for scraper in SCRAPERS:
+        career_site_urls = ADD_PAGES[scraper.ATS_TO_SCRAPE](server)
+        companies = reset_benchmark_companies(scraper.ATS_TO_SCRAPE, career_site_urls)
+        scrape_results[scraper.ATS_TO_SCRAPE] = {}
+        for pass_name in ("cold", "warm"):
+            result = run_pass(scraper, companies, pass_name)
+            scrape_results[scraper.ATS_TO_SCRAPE][pass_name] = result
+            print(
+                f"{scraper.ATS_TO_SCRAPE:<10} | {pass_name} | {result['seconds']:6.2f}s"
+                f" | {result['companies_per_minute']:8.1f} companies/min"
+                f" | {result['jobs_per_second']:8.1f} jobs/s"
+                f" | fetch {result['fetch_time']:.2f}s"
+                f" | parse {result['parse_time']:.2f}s | db {result['db_time']:.2f}s"
+                f" | {result['companies_failed']} failed"
+            )
+        reset_benchmark_companies(scraper.ATS_TO_SCRAPE, career_site_urls)
+    return scrape_results
+
+
+def get_commit() -> str:
+    result = subprocess.run(
+        ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=False
+    )
+    return result.stdout.strip() or "unknown"
+
+
+def compare_results(results: dict, baseline: dict) -> None:
+    print(f"Compared with {baseline['commit'][:12]}")
+    for case_name, per_page in results["parse"].items():
+        baseline_per_page = baseline["parse"].get(case_name)
+        if baseline_per_page:
+            change = per_page / baseline_per_page - 1
+            print(f"{case_name:<24} | {change:+7.1%} ms/page")
+    for ats, passes in results["scrape"].items():
+        for pass_name, result in passes.items():
+            baseline_result = baseline["scrape"].get(ats, {}).get(pass_name)
+            if baseline_result and baseline_result["jobs_per_second"]:
+                change = result["jobs_per_second"] / baseline_result["jobs_per_second"]
+                print(f"{ats:<10} | {pass_name} | {change - 1:+7.1%} jobs/s")
+    return
+
+
+def write_results(results: dict) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    results_path = os.path.join(RESULTS_DIR, f"{results['commit'][:12]}.json")
+    with open(results_path, "w") as results_file:
+        json.dump(results, results_file, indent=2)
+    return results_path
+
+
+if __name__ == "__main__":
+    results = {
+        "commit": get_commit(),
+        "created_at": datetime.datetime.utcnow().isoformat(),
+        "config": {
+            "companies": COMPANIES,
+            "posting_copies": POSTING_COPIES,
+            "concurrency": CONCURRENCY,
+            "iterations": ITERATIONS,
+        },
+        "parse": time_parse_cases(),
+        "scrape": {},
+    }
+    if has_database():
+        server = start_fixture_server()
+        try:
+            results["scrape"] = run_scrapes(server)
+        finally:
+            server.shutdown()
+            db_pool.close()
+    print(f"Results written to {write_results(results)}")
+    if BASELINE_PATH:
+        with open(BASELINE_PATH) as baseline_file:
+            compare_results(results, json.load(baseline_file))
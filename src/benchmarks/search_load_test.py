@@ -0,0 +1,114 @@
+# NOTE: open loop load test for the search API, requests are started on a fixed
+# schedule whether or not earlier ones have finished so a slow server shows up
+# as latency instead of silently lowering the offered rate. Start the server
+# with python src/api/server.py, then run this from the repository root
+
+import asyncio
+import os
+import random
+import statistics
+import time
+
+import aiohttp
+
+
+URL = os.environ.get("load_test_url", "http://localhost:8080/jobs/search")
+QPS = float(os.environ.get("load_test_qps", 50))
+DURATION = float(os.environ.get("load_test_duration", 30))
+MAX_IN_FLIGHT = int(os.environ.get("load_test_max_in_flight", 500))
+PAGES = int(os.environ.get("load_test_pages", 3))
+
+QUERY_MIX = [
+    {"q": "driver"},
+    {"q": "warehouse associate", "remote": "false"},
+    {"q": "dispatcher", "timezone": "CT,ET"},
+    {"q": '"freight broker"'},
+    {"q": "logistics coordinator", "min_salary": "50000"},
+    {"q": "forklift", "near": "Chicago", "radius": "50"},
+    {"location": "Texas"},
+    {"remote": "true"},
+    {"min_salary": "80000", "max_salary": "150000"},
+    {"timezone": "PT"},
+    {},
+]
+
+
+async def run_search(
+    session: aiohttp.ClientSession, params: dict, results: dict
+) -> None:
+    # NOTE: follows next_cursor for a few pages like a user paging results
+    params = dict(params)
+    for _ in range(PAGES):
+        start = time.perf_counter()
+        try:
+            async with session.get(URL, params=params) as response:
+                body = await response.json()
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            results["errors"].append(repr(error))
+            return
+        results["latencies"].append(time.perf_counter() - start)
+        if status != 200:
+            results["errors"].append(f"{status} {body.get('error')}")
+            return
+        if not body["next_cursor"]:
+            return
+        params["cursor"] = body["next_cursor"]
+    return
+
+
+async def load_test() -> dict:
+    results = {"latencies": [], "errors": [], "dropped": 0}
+    in_flight = set()
+    timeout = aiohttp.ClientTimeout(total=30)
+    connector = aiohttp.TCPConnector(limit=MAX_IN_FLIGHT)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        sent = 0
+        while loop.time() - start < DURATION:
+            next_send = start + sent / QPS
+            await asyncio.sleep(max(next_send - loop.time(), 0))
+            sent += 1
+            if len(in_flight) >= MAX_IN_FLIGHT:
+                results["dropped"] += 1
+                continue
+            task = asyncio.create_task(
+                run_search(session, random.choice(QUERY_MIX), results)
+            )
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        await asyncio.gather(*in_flight)
+        results["elapsed"] = loop.time() - start
+    results["sent"] = sent
+    return results
+
+
+def get_percentile(latencies: list[float], percentile: float) -> float:
+    index = min(int(len(latencies) * percentile), len(latencies) - 1)
+    return latencies[index]
+
+
+def print_results(results: dict) -> None:
+    latencies = sorted(results["latencies"])
+    print(
+        f"{results['sent']} searches started at {QPS:g} qps target"
+        f" | {len(latencies)} requests | {len(results['errors'])} errors"
+        f" | {results['dropped']} dropped"
+        f" | {len(latencies) / results['elapsed']:.1f} requests/s achieved"
+    )
+    if latencies:
+        print(
+            f"p50 {get_percentile(latencies, 0.50) * 1000:.1f}ms"
+            f" | p95 {get_percentile(latencies, 0.95) * 1000:.1f}ms"
+            f" | p99 {get_percentile(latencies, 0.99) * 1000:.1f}ms"
+            f" | max {latencies[-1] * 1000:.1f}ms"
+            f" | mean {statistics.mean(latencies) * 1000:.1f}ms"
+        )
+    for error in sorted(set(results["errors"]))[:10]:
+        print(f"error: {error}")
+    return
+
+
+if __name__ == "__main__":
+    print_results(asyncio.run(load_test()))
@@ -0,0 +1,143 @@
+import random
+
+
+# NOTE: generated text only, the loader derives salary columns and fingerprints
+# from it with utils/salaries.py and Job like upsert_jobs does
+ATS_WEIGHTS = {
+    "Greenhouse": 35,
+    "Lever": 25,
+    "JazzHR": 15,
+    "Ashby": 15,
+    "Workable": 10,
+}
+ATS_CAREER_SITE_URLS = {
+    "Greenhouse": "https://boards.greenhouse.io/{board}",
+    "Lever": "https://jobs.lever.co/{board}/",
+    "JazzHR": "https://{board}.applytojob.com/apply",
+    "Ashby": "https://jobs.ashbyhq.com/{board}/",
+    "Workable": "https://apply.workable.com/{board}/",
+}
+ATS_JOB_URLS = {
+    "Greenhouse": "https://boards.greenhouse.io/{board}/jobs/{number}",
+    "Lever": "https://jobs.lever.co/{board}/{job_id}",
+    "JazzHR": "https://{board}.applytojob.com/apply/{code}/{slug}",
+    "Ashby": "https://jobs.ashbyhq.com/{board}/{job_id}",
+    "Workable": "https://apply.workable.com/{board}/j/{code}/",
+}
+COMPANY_PREFIXES = [
+    "Atlas", "Blue Line", "Cascade", "Delta", "Eagle", "Frontier", "Granite",
+    "Harbor", "Interstate", "Keystone", "Liberty", "Meridian", "Northstar",
+    "Pioneer", "Red River", "Summit", "Tri-State", "Vanguard", "Westbound",
+]  # fmt: skip
+COMPANY_SUFFIXES = [
+    "Freight", "Logistics", "Transport", "Carriers", "Supply Chain", "Drayage",
+    "Distribution", "Express", "Trucking", "Cold Chain", "Fulfillment",
+]  # fmt: skip
+TITLE_LEVELS = ["", "", "", "Senior ", "Lead ", "Junior ", "Night Shift ", "Regional "]
+TITLES = [
+    "CDL-A Truck Driver", "Local Delivery Driver", "Owner Operator",
+    "Warehouse Associate", "Forklift Operator", "Dispatcher", "Freight Broker",
+    "Logistics Coordinator", "Carrier Sales Representative", "Fleet Manager",
+    "Diesel Technician", "Inventory Control Specialist", "Yard Jockey",
+    "Operations Manager", "Customs Broker", "Load Planner", "Safety Manager",
+    "Transportation Analyst", "Shipping and Receiving Clerk", "Route Planner",
+    "Software Engineer", "Data Analyst", "Account Executive", "Customer Success Manager",
+]  # fmt: skip
+DESCRIPTION_SENTENCES = [
+    "We are looking for a {title} to join our {team} team in {place}.",
+    "You will coordinate {noun} across {count} terminals and work closely with {team}.",
+    "Our fleet runs {count} tractors hauling {freight} through the {region}.",
+    "The ideal candidate has {count} years of experience with {noun}.",
+    "A clean MVR and a valid CDL-A with {endorsement} endorsement are preferred.",
+    "This role reports to the {team} manager and is based in {place}.",
+    "You will use {tool} every day to track {noun} and resolve exceptions.",
+    "We offer medical, dental and vision coverage, a 401k match and paid time off.",
+    "Home time is {home_time} with consistent miles and no forced dispatch.",
+    "Responsibilities include {noun}, {noun} and keeping {team} informed.",
+    "You must be able to lift {count}0 pounds and work in a fast paced warehouse.",
+    "We move {freight} for shippers across the {region} with a {count} percent on time rate.",
+]  # fmt: skip
+DESCRIPTION_WORDS = {
+    "team": ["operations", "dispatch", "brokerage", "safety", "maintenance", "sales", "engineering"],
+    "place": ["Chicago", "Dallas", "Atlanta", "Memphis", "Columbus", "Reno", "Laredo", "Savannah"],
+    "noun": ["load tendering", "carrier onboarding", "appointment scheduling", "cycle counts",
+             "rate negotiation", "detention claims", "cross docking", "route optimization",
+             "preventive maintenance", "hours of service compliance", "freight audits"],
+    "freight": ["dry van freight", "refrigerated loads", "flatbed steel", "intermodal containers",
+                "hazmat tankers", "LTL shipments", "parcel volume"],
+    "region": ["Midwest", "Southeast", "Gulf Coast", "Pacific Northwest", "Northeast", "Southwest"],
+    "endorsement": ["hazmat", "tanker", "doubles and triples", "TWIC"],
+    "tool": ["our TMS", "McLeod", "SAP", "a WMS", "Samsara", "Excel", "DAT load boards"],
+    "home_time": ["daily", "weekly", "every other weekend", "after 10 days out"],
+}  # fmt: skip
+SALARY_FORMATS = [
+    ("${min:,} - ${max:,} per year", "year"),
+    ("${min:,}-${max:,}/yr", "year"),
+    ("${min_k}k - ${max_k}k", "year"),
+    ("${min} - ${max} per hour", "hour"),
+    ("${min}/hr", "hour"),
+    ("${min:,} - ${max:,} weekly", "week"),
+]
+SALARY_RANGES = {"hour": (16, 45, 1), "week": (22, 52, 50), "year": (40, 180, 1000)}
+
+
+def get_cum_weights(size: int, exponent: float = 0.9) -> list[float]:
+    # NOTE: zipf like, a few large employers and a long tail of small ones
+    cum_weights = []
+    total = 0.0
+    for rank in range(1, size + 1):
+        total += rank**-exponent
+        cum_weights.append(total)
+    return cum_weights
+
+
+def get_company_name(index: int) -> str:
+    prefix = COMPANY_PREFIXES[index % len(COMPANY_PREFIXES)]
+    suffix = COMPANY_SUFFIXES[index // len(COMPANY_PREFIXES) % len(COMPANY_SUFFIXES)]
+    return f"Synthetic {prefix} {suffix} {index}"
+
+
+def get_job_url(ats: str, board: str, job_id: str, number: int, title: str) -> str:
+    return ATS_JOB_URLS[ats].format(
+        board=board,
+        job_id=job_id,
+        number=number,
+        code=job_id.replace("-", "")[:10].upper(),
+        slug="-".join(title.split()),
+    )
+
+
+def get_title(rng: random.Random) -> str:
+    return rng.choice(TITLE_LEVELS) + rng.choice(TITLES)
+
+
+def get_description(rng: random.Random, title: str) -> str:
+    paragraphs = []
+    for _ in range(rng.randint(3, 6)):
+        sentences = []
+        for template in rng.sample(DESCRIPTION_SENTENCES, rng.randint(2, 5)):
+            words = {
+                key: rng.choice(values) for key, values in DESCRIPTION_WORDS.items()
+            }
+            sentences.append(
+                template.format(title=title, count=rng.randint(2, 40), **words)
+            )
+        paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+
+def get_salary(rng: random.Random) -> str | None:
+    if rng.random() < 0.45:
+        return None
+    salary_format, period = rng.choice(SALARY_FORMATS)
+    low, high, step = SALARY_RANGES[period]
+    salary_min = rng.randint(low, high) * step
+    salary_max = salary_min
+    if "{max" in salary_format:
+        salary_max = rng.randint(salary_min // step, high + (high - low) // 4) * step
+    return salary_format.format(
+        min=salary_min,
+        max=salary_max,
+        min_k=salary_min // 1000,
+        max_k=salary_max // 1000,
+    )
@@ -1,5 +1,6 @@
-import time
+import json
 
+import requests
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -9,19 +10,29 @@ from utils.helpers import (
     log_error,
     log_run_begin,
     log_run_end,
-    create_driver,
-    examine_current_job_list,
+    DEACTIVATION_MODE,
+    FETCH_MODE,
+    get_board_token,
     normalize_career_site_url,
     parse_url_for_uuid,
 )
 
 from utils.queries import (
     get_company_by_ats,
-    insert_job,
-    update_inactive_jobs,
+    get_active_job_ids,
+    upsert_jobs,
+    deactivate_unseen_jobs,
 )
 
 from utils.models import Job
+from utils.db import log_pool_stats
+from utils.cache import board_cache, log_cache_stats
+from utils.locations import log_location_cache_stats
+from utils.drivers import driver_pool
+from utils.engine import ScrapeEngine
+from utils.snapshot import active_job_index
+from utils.sessions import log_session_stats
+from utils.telemetry import log_run_telemetry, run_telemetry
 
 
 # TODO: add tests, prints -> logging
@@ -29,99 +40,149 @@ from utils.models import Job
 
 ATS_TO_SCRAPE = "Ashby"
 ATS_BASE_URL = "https://jobs.ashbyhq.com"
+ATS_API_URL = (
+    "https://api.ashbyhq.com/posting-api/job-board/{board}?includeCompensation=true"
+)
 
 
 def get_job_details(job: Job) -> Job | None:
-    driver = create_driver()
-    try:
-        driver.get(job.url)
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(
-                (By.CSS_SELECTOR, ".ashby-job-posting-left-pane")
+    with driver_pool.acquire() as driver:
+        try:
+            driver.get(job.url)
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located(
+                    (By.CSS_SELECTOR, ".ashby-job-posting-left-pane")
+                )
+            )
+            details = driver.find_elements(
+                By.CSS_SELECTOR, ".ashby-job-posting-left-pane > div"
             )
-        )
-        details = driver.find_elements(
-            By.CSS_SELECTOR, ".ashby-job-posting-left-pane > div"
-        )
-        for detail in details:
-            if detail.find_element(By.CSS_SELECTOR, "h2").text == "Location":
-                job.location = detail.find_element(By.CSS_SELECTOR, "p").text
-                if job.location.lower() == "remote":
-                    job.remote = True
-            if detail.find_element(By.CSS_SELECTOR, "h2").text == "Compensation":
-                job.salary = detail.find_element(By.CSS_SELECTOR, "ul > li > span").text
-        job.description = driver.find_element(By.ID, "overview").text
-    except TimeoutException:
-        log_error(scrape_run_id, f"Timed out on {job.url}")
-    except NoSuchElementException as error:
-        log_error(scrape_run_id, error)
-    driver.close()
+            for detail in details:
+                if detail.find_element(By.CSS_SELECTOR, "h2").text == "Location":
+                    job.location = detail.find_element(By.CSS_SELECTOR, "p").text
+                    if job.location.lower() == "remote":
+                        job.remote = True
+                if detail.find_element(By.CSS_SELECTOR, "h2").text == "Compensation":
+                    job.salary = detail.find_element(
+                        By.CSS_SELECTOR, "ul > li > span"
+                    ).text
+            job.description = driver.find_element(By.ID, "overview").text
+        except TimeoutException:
+            log_error(scrape_run_id, f"Timed out on {job.url}")
+        except NoSuchElementException as error:
+            log_error(scrape_run_id, error)
     return job
 
 
-def get_current_job_list(career_site_url: str) -> list[Job]:
+def parse_api_response_for_job_list(content: bytes, career_site_url: str) -> list[Job]:
     job_list = []
-    driver = create_driver()
-    try:
-        driver.get(career_site_url)
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located(
-                (By.CSS_SELECTOR, ".ashby-job-posting-brief-list")
+    for posting in json.loads(content)["jobs"]:
+        if posting.get("isListed") is False:
+            continue
+        try:
+            job = Job()
+            job.title = posting["title"]
+            job.url = posting["jobUrl"]
+            job.id = parse_url_for_uuid(job.url, career_site_url)
+            job.location = posting.get("location")
+            job.remote = posting.get("isRemote")
+            compensation = posting.get("compensation") or {}
+            job.salary = compensation.get("compensationTierSummary")
+            job.description = posting.get("descriptionPlain") or ""
+            job_list.append(job)
+        except ValueError as error:
+            log_error(scrape_run_id, error)
+    return job_list
+
+
+def get_current_job_list_from_api(career_site_url: str) -> list[Job] | None:
+    board = get_board_token(career_site_url)
+    response_content, changed = board_cache.fetch(
+        ATS_API_URL.format(board=board), key=career_site_url
+    )
+    if not changed:
+        return None
+    if response_content is None:
+        raise ValueError(f"No posting API found for {career_site_url}")
+    with run_telemetry.timer("parse_time"):
+        return parse_api_response_for_job_list(response_content, career_site_url)
+
+
+def get_current_job_list_from_browser(career_site_url: str) -> list[Job]:
+    job_list = []
+    with driver_pool.acquire() as driver:
+        try:
+            driver.get(career_site_url)
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located(
+                    (By.CSS_SELECTOR, ".ashby-job-posting-brief-list")
+                )
             )
-        )
-        postings = driver.find_elements(
-            By.CSS_SELECTOR, ".ashby-job-posting-brief-list > a"
-        )
-        for posting in postings:
-            try:
-                job = Job()
-                job.title = posting.find_element(By.CSS_SELECTOR, "h3").text
-                job.url = posting.get_attribute("href")
-                job.id = parse_url_for_uuid(job.url, career_site_url)
-                job_list.append(job)
-            except ValueError as error:
-                log_error(scrape_run_id, error)
-    except TimeoutException:
-        log_error(scrape_run_id, f"Timed out on {career_site_url}")
-    except NoSuchElementException as error:
-        log_error(scrape_run_id, error)
-    driver.close()
+            postings = driver.find_elements(
+                By.CSS_SELECTOR, ".ashby-job-posting-brief-list > a"
+            )
+            for posting in postings:
+                try:
+                    job = Job()
+                    job.title = posting.find_element(By.CSS_SELECTOR, "h3").text
+                    job.url = posting.get_attribute("href")
+                    job.id = parse_url_for_uuid(job.url, career_site_url)
+                    job_list.append(job)
+                except ValueError as error:
+                    log_error(scrape_run_id, error)
+        except TimeoutException as error:
+            raise ValueError(f"Timed out on {career_site_url}") from error
+        except NoSuchElementException as error:
+            raise ValueError(f"Unable to load {career_site_url}") from error
     return job_list
 
 
+def get_current_job_list(career_site_url: str) -> list[Job] | None:
+    if FETCH_MODE == "api":
+        try:
+            return get_current_job_list_from_api(career_site_url)
+        except (ValueError, KeyError, TypeError, requests.RequestException) as error:
+            log_error(scrape_run_id, f"Falling back to Selenium, {error!r}")
+    return get_current_job_list_from_browser(career_site_url)
+
+
+async def write_jobs(engine: ScrapeEngine, jobs: list[Job]) -> None:
+    jobs_to_detail = [job for job in jobs if job.description is None]
+    if jobs_to_detail:
+        await engine.run_blocking(driver_pool.map, get_job_details, jobs_to_detail)
+    await engine.run_blocking(upsert_jobs, jobs)
+    return
+
+
+async def scrape_company(engine: ScrapeEngine, result: tuple) -> tuple[int, int]:
+    career_site_url = normalize_career_site_url(result[2])
+    print(f"{scrape_run_id} | {result[1]} | {career_site_url}")
+    return await engine.scrape_board(
+        result[0], career_site_url, get_current_job_list, write_jobs
+    )
+
+
 def scrape_jobs() -> None:
     company_queryset = get_company_by_ats(ATS_TO_SCRAPE)
-    for result in company_queryset:
-        time.sleep(1)
-        career_site_url = normalize_career_site_url(result[2])
-        print(f"{scrape_run_id} | {result[1]} | {career_site_url}")
-        current_job_list = get_current_job_list(career_site_url)
-        if current_job_list:
-            ids_to_add, ids_to_deactivate = examine_current_job_list(
-                current_job_list, result[0]
-            )
-            if ids_to_add:
-                print(f"{len(ids_to_add)} jobs found to add")
-                for job in current_job_list:
-                    if job.id in list(ids_to_add):
-                        time.sleep(5)
-                        job = get_job_details(job)
-                        job.company_id = result[0]
-                        job.active = True
-                        job.new = True
-                        job.scrape_run_id = scrape_run_id
-                        insert_job(job)
-            else:
-                print(f"No new jobs found for {career_site_url}")
-            if ids_to_deactivate:
-                print(f"{len(ids_to_deactivate)} jobs found to deactivate")
-                update_inactive_jobs(list(ids_to_deactivate), scrape_run_id)
-        else:
-            print(f"No jobs found for {career_site_url}")
+    active_job_index.load(get_active_job_ids())
+    engine = ScrapeEngine(
+        scrape_run_id, ats=ATS_TO_SCRAPE, max_concurrency=driver_pool.size
+    )
+    engine.run(company_queryset, scrape_company)
+    if DEACTIVATION_MODE == "run":
+        deactivate_unseen_jobs(engine.seen_job_ids, scrape_run_id)
+    log_session_stats(scrape_run_id)
+    log_cache_stats(scrape_run_id)
+    log_location_cache_stats(scrape_run_id)
+    log_pool_stats(scrape_run_id)
     return
 
 
 if __name__ == "__main__":
     scrape_run_id, run_time = log_run_begin(ATS_TO_SCRAPE)
-    scrape_jobs()
+    try:
+        scrape_jobs()
+    finally:
+        driver_pool.close()
+    log_run_telemetry(scrape_run_id)
     log_run_end(scrape_run_id, ATS_TO_SCRAPE)
@@ -1,24 +1,35 @@
-import time
+import html
+import json
 import uuid
-from bs4 import BeautifulSoup
-from psycopg2.errors import UniqueViolation
+
+import requests
 
 from utils.helpers import (
     log_error,
     log_run_begin,
     log_run_end,
     get_url,
-    examine_current_job_list,
+    DEACTIVATION_MODE,
+    FETCH_MODE,
+    get_board_token,
 )
 
 from utils.queries import (
     get_company_by_ats,
-    insert_job,
-    update_inactive_jobs,
-    update_job,
+    get_active_job_ids,
+    upsert_jobs,
+    deactivate_unseen_jobs,
 )
 
 from utils.models import Job
+from utils.parsers import HtmlParser, html_parser
+from utils.db import log_pool_stats
+from utils.cache import board_cache, log_cache_stats
+from utils.locations import log_location_cache_stats
+from utils.engine import ScrapeEngine
+from utils.snapshot import active_job_index
+from utils.sessions import log_session_stats
+from utils.telemetry import log_run_telemetry, run_telemetry
 
 
 # TODO: add custom site parsing
@@ -26,6 +37,9 @@ from utils.models import Job
 
 ATS_TO_SCRAPE = "Greenhouse"
 ATS_BASE_URL = "https://boards.greenhouse.io"
+ATS_API_URL = (
+    "https://boards-api.greenhouse.io/v1/boards/{board_token}/jobs?content=true"
+)
 
 
 def parse_url_for_job_id(url: str) -> str:
@@ -37,39 +51,31 @@ def parse_url_for_job_id(url: str) -> str:
         raise ValueError(f"Unable to parse url {url} for job_id")
 
 
-def parse_job_description(content: bytes) -> str:
-    soup = BeautifulSoup(content, "html.parser", from_encoding="utf-8")
-    content = soup.find(id="content")
-    if content:
-        return content.get_text()
+def parse_job_description(content: bytes, parser: HtmlParser = html_parser) -> str:
+    document = parser.parse(content)
+    content = parser.get_by_id(document, "content")
+    if content is not None:
+        return parser.get_text(content)
     else:
         raise ValueError("Unable to parse job description")
 
 
-def get_job_description(job_url: str) -> bytes | None:
-    try:
-        response_content = get_url(job_url)
-        if response_content:
-            job_description = parse_job_description(response_content)
-            return job_description
-        else:
-            return None
-    except ValueError as error:
-        log_error(scrape_run_id, error)
-        return None
-
-
-def parse_response_for_job_list(content: bytes) -> list[Job]:
-    soup = BeautifulSoup(content, "html.parser", from_encoding="utf-8")
+def parse_response_for_job_list(
+    content: bytes, parser: HtmlParser = html_parser
+) -> list[Job]:
+    document = parser.parse(content)
     job_list = []
-    posting_titles = soup.select(".opening")
+    posting_titles = parser.select(document, ".opening")
     if posting_titles:
         for posting_title in posting_titles:
             try:
                 job = Job()
-                job.title = posting_title.find("a").text
-                job.url = ATS_BASE_URL + posting_title.find("a")["href"]
-                job.location = posting_title.select_one(".location").text
+                posting_link = parser.select_one(posting_title, "a")
+                job.title = parser.get_text(posting_link)
+                job.url = ATS_BASE_URL + parser.get_attribute(posting_link, "href")
+                job.location = parser.get_text(
+                    parser.select_one(posting_title, ".location")
+                )
                 if job.location.lower() == "remote":
                     job.remote = True
                 job.id = parse_url_for_job_id(job.url)
@@ -81,60 +87,94 @@ def parse_response_for_job_list(content: bytes) -> list[Job]:
         raise ValueError("Unable to parse response for job list")
 
 
-def get_current_job_list(career_site_url: str) -> list[Job]:
-    try:
-        response_content = get_url(career_site_url)
-        if response_content:
+def parse_api_response_for_job_list(
+    content: bytes, board_token: str, parser: HtmlParser = html_parser
+) -> list[Job]:
+    job_list = []
+    for posting in json.loads(content)["jobs"]:
+        try:
+            job = Job()
+            job.title = posting["title"]
+            job.url = f"{ATS_BASE_URL}/{board_token}/jobs/{posting['id']}"
+            job.id = parse_url_for_job_id(job.url)
+            job.location = (posting.get("location") or {}).get("name")
+            if job.location and job.location.lower() == "remote":
+                job.remote = True
+            if posting.get("content"):
+                description = html.unescape(posting["content"]).encode("utf-8")
+                job.description = parser.get_text(parser.parse(description))
+            job_list.append(job)
+        except ValueError as error:
+            log_error(scrape_run_id, error)
+    return job_list
+
+
+def get_current_job_list_from_api(career_site_url: str) -> list[Job] | None:
+    board_token = get_board_token(career_site_url)
+    response_content, changed = board_cache.fetch(
+        ATS_API_URL.format(board_token=board_token), key=career_site_url
+    )
+    if not changed:
+        return None
+    if response_content is None:
+        raise ValueError(f"No job board API found for {career_site_url}")
+    with run_telemetry.timer("parse_time"):
+        return parse_api_response_for_job_list(response_content, board_token)
+
+
+def get_current_job_list(career_site_url: str) -> list[Job] | None:
+    if FETCH_MODE == "api":
+        try:
+            return get_current_job_list_from_api(career_site_url)
+        except (ValueError, KeyError, TypeError, requests.RequestException) as error:
+            log_error(scrape_run_id, f"Falling back to HTML, {error!r}")
+    response_content, changed = board_cache.fetch(career_site_url, key=career_site_url)
+    if not changed:
+        return None
+    if response_content:
+        with run_telemetry.timer("parse_time"):
             job_list = parse_response_for_job_list(response_content)
-            return job_list
-        else:
-            return []
-    except ValueError as error:
-        log_error(scrape_run_id, error)
-        return []
+        return job_list
+    else:
+        raise ValueError(f"No job board found for {career_site_url}")
+
+
+async def write_jobs(engine: ScrapeEngine, jobs: list[Job]) -> None:
+    pipeline = engine.get_pipeline(
+        ATS_TO_SCRAPE, get_url, parse_job_description, upsert_jobs
+    )
+    await pipeline.submit(jobs)
+    return
+
+
+async def scrape_company(engine: ScrapeEngine, result: tuple) -> tuple[int, int]:
+    career_site_url = result[2]
+    if (career_site_url).startswith(ATS_BASE_URL):
+        print(f"Standard {ATS_TO_SCRAPE} URL found, proceeding...")
+        print(f"{scrape_run_id} | {result[1]} | {career_site_url}")
+        return await engine.scrape_board(
+            result[0], career_site_url, get_current_job_list, write_jobs
+        )
+    print(f"Custom URL found: {career_site_url}")
+    return 0, 0
 
 
 def scrape_jobs() -> None:
     company_queryset = get_company_by_ats(ATS_TO_SCRAPE)
-    for result in company_queryset:
-        career_site_url = result[2]
-        if (career_site_url).startswith(ATS_BASE_URL):
-            print(f"Standard {ATS_TO_SCRAPE} URL found, proceeding...")
-            time.sleep(1)
-            print(f"{scrape_run_id} | {result[1]} | {career_site_url}")
-            current_job_list = get_current_job_list(career_site_url)
-            if current_job_list:
-                ids_to_add, ids_to_deactivate = examine_current_job_list(
-                    current_job_list, result[0]
-                )
-                if ids_to_add:
-                    print(f"{len(ids_to_add)} jobs found to add")
-                    for job in current_job_list:
-                        if job.id in list(ids_to_add):
-                            time.sleep(5)
-                            job.description = get_job_description(job.url)
-                            job.company_id = result[0]
-                            job.scrape_run_id = scrape_run_id
-                            job.active = True
-                            job.new = True
-                            try:
-                                insert_job(job)
-                            except UniqueViolation:
-                                print(f"{job.id} already exists, attempting to update")
-                                update_job(job)
-                else:
-                    print(f"No new jobs found for {career_site_url}")
-                if ids_to_deactivate:
-                    print(f"{len(ids_to_deactivate)} jobs found to deactivate")
-                    update_inactive_jobs(list(ids_to_deactivate), scrape_run_id)
-            else:
-                print(f"No jobs found for {career_site_url}")
-        else:
-            print(f"Custom URL found: {career_site_url}")
+    active_job_index.load(get_active_job_ids())
+    engine = ScrapeEngine(scrape_run_id, ats=ATS_TO_SCRAPE)
+    engine.run(company_queryset, scrape_company)
+    if DEACTIVATION_MODE == "run":
+        deactivate_unseen_jobs(engine.seen_job_ids, scrape_run_id)
+    log_session_stats(scrape_run_id)
+    log_cache_stats(scrape_run_id)
+    log_location_cache_stats(scrape_run_id)
+    log_pool_stats(scrape_run_id)
     return
 
 
 if __name__ == "__main__":
     scrape_run_id, run_time = log_run_begin(ATS_TO_SCRAPE)
     scrape_jobs()
+    log_run_telemetry(scrape_run_id)
     log_run_end(scrape_run_id, ATS_TO_SCRAPE)
@@ -1,80 +1,81 @@
-import time
-from bs4 import BeautifulSoup
-from psycopg2.errors import UniqueViolation
+import json
+
+import requests
 
 from utils.helpers import (
     log_error,
     log_run_begin,
     log_run_end,
     get_url,
-    examine_current_job_list,
+    DEACTIVATION_MODE,
+    FETCH_MODE,
+    get_board_token,
     normalize_career_site_url,
     parse_url_for_uuid,
 )
 
 from utils.queries import (
     get_company_by_ats,
-    insert_job,
-    update_inactive_jobs,
-    update_job,
+    get_active_job_ids,
+    upsert_jobs,
+    deactivate_unseen_jobs,
 )
 
 from utils.models import Job
+from utils.parsers import HtmlParser, html_parser
+from utils.db import log_pool_stats
+from utils.cache import board_cache, log_cache_stats
+from utils.locations import log_location_cache_stats
+from utils.engine import ScrapeEngine
+from utils.snapshot import active_job_index
+from utils.sessions import log_session_stats
+from utils.telemetry import log_run_telemetry, run_telemetry
 
 
 # TODO: add tests, prints -> logging
 
 ATS_TO_SCRAPE = "Lever"
+ATS_API_URL = "https://api.lever.co/v0/postings/{site}?mode=json"
 
 
-def parse_job_description(content: bytes) -> str:
-    soup = BeautifulSoup(content, "html.parser", from_encoding="utf-8")
-    content = soup.select(".section-wrapper.page-full-width div")
+def parse_job_description(content: bytes, parser: HtmlParser = html_parser) -> str:
+    document = parser.parse(content)
+    content = parser.select(document, ".section-wrapper.page-full-width div")
     if content:
         job_description = []
         for detail in content:
-            job_description.append(detail.text)
+            job_description.append(parser.get_text(detail))
         return " ".join(job_description)
     else:
         raise ValueError("Unable to parse job description")
 
 
-def get_job_description(job_url: str) -> bytes | None:
-    try:
-        response_content = get_url(job_url)
-        if response_content:
-            job_description = parse_job_description(response_content)
-            return job_description
-        else:
-            return None
-    except ValueError as error:
-        log_error(scrape_run_id, error)
-        return None
-
-
-def parse_response_for_job_list(content: bytes, career_site_url: str) -> list[Job]:
-    soup = BeautifulSoup(content, "html.parser", from_encoding="utf-8")
+def parse_response_for_job_list(
+    content: bytes, career_site_url: str, parser: HtmlParser = html_parser
+) -> list[Job]:
+    document = parser.parse(content)
     job_list = []
-    posting_titles = soup.select(".posting-title")
+    posting_titles = parser.select(document, ".posting-title")
     if posting_titles:
         for posting_title in posting_titles:
             try:
                 job = Job()
-                job.title = posting_title.find("h5").text
-                job.url = posting_title["href"]
+                job.title = parser.get_text(parser.select_one(posting_title, "h5"))
+                job.url = parser.get_attribute(posting_title, "href")
                 job.id = parse_url_for_uuid(job.url, career_site_url)
-                location = posting_title.select_one(
-                    ".posting-categories > span.location"
+                location = parser.select_one(
+                    posting_title, ".posting-categories > span.location"
                 )
-                if location:
-                    job.location = location.text
-                workplace = posting_title.select_one(
-                    ".posting-categories > span.workplaceTypes"
+                if location is not None:
+                    job.location = parser.get_text(location)
+                workplace = parser.select_one(
+                    posting_title, ".posting-categories > span.workplaceTypes"
                 )
-                if workplace:
-                    if workplace.text.lower() == "remote":
+                if workplace is not None:
+                    workplace_type = parser.get_text(workplace).lower()
+                    if workplace_type == "remote":
                         job.remote = True
-                    elif workplace.text.lower() == "on-site":
+                    elif workplace_type == "on-site":
                         job.remote = False
                 job_list.append(job)
             except ValueError as error:
@@ -84,56 +85,111 @@ def parse_response_for_job_list(content: bytes, career_site_url: str) -> list[Jo
         raise ValueError("Unable to parse response for job list")
 
 
-def get_current_job_list(career_site_url: str) -> list[Job]:
-    try:
-        response_content = get_url(career_site_url)
-        if response_content:
+def parse_api_posting_for_description(
+    posting: dict, parser: HtmlParser = html_parser
+) -> str:
+    job_description = [posting.get("descriptionPlain") or ""]
+    for posting_list in posting.get("lists") or []:
+        job_description.append(posting_list.get("text") or "")
+        if posting_list.get("content"):
+            document = parser.parse(posting_list["content"].encode("utf-8"))
+            job_description.append(parser.get_text(document))
+    job_description.append(posting.get("additionalPlain") or "")
+    return " ".join(job_description)
+
+
+def parse_api_response_for_job_list(
+    content: bytes, career_site_url: str, parser: HtmlParser = html_parser
+) -> list[Job]:
+    job_list = []
+    for posting in json.loads(content):
+        try:
+            job = Job()
+            job.title = posting["text"]
+            job.url = posting["hostedUrl"]
+            job.id = parse_url_for_uuid(job.url, career_site_url)
+            job.location = (posting.get("categories") or {}).get("location")
+            workplace_type = (posting.get("workplaceType") or "").lower()
+            if workplace_type == "remote":
+                job.remote = True
+            elif workplace_type in ("on-site", "onsite"):
+                job.remote = False
+            salary_range = posting.get("salaryRange")
+            if salary_range:
+                job.salary = (
+                    f"{salary_range.get('min')} - {salary_range.get('max')}"
+                    f" {salary_range.get('currency') or ''}"
+                    f" {salary_range.get('interval') or ''}"
+                ).strip()
+            job.description = parse_api_posting_for_description(posting, parser)
+            job_list.append(job)
+        except ValueError as error:
+            log_error(scrape_run_id, error)
+    return job_list
+
+
+def get_current_job_list_from_api(career_site_url: str) -> list[Job] | None:
+    site = get_board_token(career_site_url)
+    response_content, changed = board_cache.fetch(
+        ATS_API_URL.format(site=site), key=career_site_url
+    )
+    if not changed:
+        return None
+    if response_content is None:
+        raise ValueError(f"No postings API found for {career_site_url}")
+    with run_telemetry.timer("parse_time"):
+        return parse_api_response_for_job_list(response_content, career_site_url)
+
+
+def get_current_job_list(career_site_url: str) -> list[Job] | None:
+    if FETCH_MODE == "api":
+        try:
+            return get_current_job_list_from_api(career_site_url)
+        except (ValueError, KeyError, TypeError, requests.RequestException) as error:
+            log_error(scrape_run_id, f"Falling back to HTML, {error!r}")
+    response_content, changed = board_cache.fetch(career_site_url, key=career_site_url)
+    if not changed:
+        return None
+    if response_content:
+        with run_telemetry.timer("parse_time"):
             job_list = parse_response_for_job_list(response_content, career_site_url)
-            return job_list
-        else:
-            return []
-    except ValueError as error:
-        log_error(scrape_run_id, error)
-        return []
+        return job_list
+    else:
+        raise ValueError(f"No job board found for {career_site_url}")
+
+
+async def write_jobs(engine: ScrapeEngine, jobs: list[Job]) -> None:
+    pipeline = engine.get_pipeline(
+        ATS_TO_SCRAPE, get_url, parse_job_description, upsert_jobs
+    )
+    await pipeline.submit(jobs)
+    return
+
+
+async def scrape_company(engine: ScrapeEngine, result: tuple) -> tuple[int, int]:
+    career_site_url = normalize_career_site_url(result[2])
+    print(f"{scrape_run_id} | {result[1]} | {career_site_url}")
+    return await engine.scrape_board(
+        result[0], career_site_url, get_current_job_list, write_jobs
+    )
 
 
 def scrape_jobs() -> None:
     company_queryset = get_company_by_ats(ATS_TO_SCRAPE)
-    for result in company_queryset:
-        time.sleep(1)
-        career_site_url = normalize_career_site_url(result[2])
-        print(f"{scrape_run_id} | {result[1]} | {career_site_url}")
-        current_job_list = get_current_job_list(career_site_url)
-        if current_job_list:
-            ids_to_add, ids_to_deactivate = examine_current_job_list(
-                current_job_list, result[0]
-            )
-            if ids_to_add:
-                print(f"{len(ids_to_add)} jobs found to add")
-                for job in current_job_list:
-                    if job.id in list(ids_to_add):
-                        time.sleep(5)
-                        job.description = get_job_description(job.url)
-                        job.company_id = result[0]
-                        job.scrape_run_id = scrape_run_id
-                        job.active = True
-                        job.new = True
-                        try:
-                            insert_job(job)
-                        except UniqueViolation:
-                            print(f"{job.id} already exists, attempting to update")
-                            update_job(job)
-            else:
-                print(f"No new jobs found for {career_site_url}")
-            if ids_to_deactivate:
-                print(f"{len(ids_to_deactivate)} jobs found to deactivate")
-                update_inactive_jobs(list(ids_to_deactivate), scrape_run_id)
-        else:
-            print(f"No jobs found for {career_site_url}")
+    active_job_index.load(get_active_job_ids())
+    engine = ScrapeEngine(scrape_run_id, ats=ATS_TO_SCRAPE)
+    engine.run(company_queryset, scrape_company)
+    if DEACTIVATION_MODE == "run":
+        deactivate_unseen_jobs(engine.seen_job_ids, scrape_run_id)
+    log_session_stats(scrape_run_id)
+    log_cache_stats(scrape_run_id)
+    log_location_cache_stats(scrape_run_id)
+    log_pool_stats(scrape_run_id)
     return
 
 
 if __name__ == "__main__":
     scrape_run_id, run_time = log_run_begin(ATS_TO_SCRAPE)
     scrape_jobs()
+    log_run_telemetry(scrape_run_id)
     log_run_end(scrape_run_id, ATS_TO_SCRAPE)
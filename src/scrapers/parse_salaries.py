@@ -0,0 +1,34 @@
+import os
+
+from utils.helpers import log_run_begin, log_run_end
+
+from utils.queries import (
+    get_jobs_with_salaries,
+    update_job_salaries,
+)
+
+from utils.salaries import get_salary_row
+
+
+# NOTE: backfills the parsed salary columns for jobs stored before salaries
+# were parsed, and re-parses everything after the parser changes
+
+RUN_NAME = "Salary parsing"
+BATCH_SIZE = int(os.environ.get("parse_salaries_batch_size", 5000))
+
+
+def parse_salaries() -> None:
+    job_salaries = [
+        (job_id, *get_salary_row(salary)) for job_id, salary in get_jobs_with_salaries()
+    ]
+    parsed_count = len([row for row in job_salaries if row[1] is not None])
+    print(f"Parsed {parsed_count} of {len(job_salaries)} job salaries")
+    for i in range(0, len(job_salaries), BATCH_SIZE):
+        update_job_salaries(job_salaries[i : i + BATCH_SIZE])
+    return
+
+
+if __name__ == "__main__":
+    run_id, run_time = log_run_begin(RUN_NAME)
+    parse_salaries()
+    log_run_end(run_id, RUN_NAME)
@@ -0,0 +1,32 @@
+import os
+
+from utils.helpers import log_run_begin, log_run_end
+
+from utils.queries import (
+    get_jobs_without_locations,
+    upsert_jobs_locations,
+)
+
+from utils.locations import log_location_cache_stats
+
+
+# NOTE: backfills jobs_locations for active jobs that were stored before the
+# resolver existed, new jobs are resolved as they are upserted
+
+RUN_NAME = "Location resolution"
+BATCH_SIZE = int(os.environ.get("resolve_locations_batch_size", 5000))
+
+
+def resolve_locations() -> None:
+    job_locations = get_jobs_without_locations()
+    print(f"{len(job_locations)} jobs found without locations")
+    for i in range(0, len(job_locations), BATCH_SIZE):
+        upsert_jobs_locations(job_locations[i : i + BATCH_SIZE])
+    return
+
+
+if __name__ == "__main__":
+    run_id, run_time = log_run_begin(RUN_NAME)
+    resolve_locations()
+    log_location_cache_stats(run_id)
+    log_run_end(run_id, RUN_NAME)
@@ -0,0 +1,141 @@
+import asyncio
+import os
+
+import ashby
+import greenhouse
+import jazzhr
+import lever
+import workable
+
+from utils.helpers import (
+    log_error,
+    log_run_begin,
+    log_run_end,
+    DEACTIVATION_MODE,
+)
+
+from utils.queries import (
+    get_companies_by_ats,
+    get_active_job_ids,
+    deactivate_unseen_jobs,
+)
+
+from utils.cache import board_cache, log_cache_stats
+from utils.locations import log_location_cache_stats
+from utils.db import log_pool_stats
+from utils.drivers import driver_pool
+from utils.engine import ScrapeEngine
+from utils.snapshot import active_job_index
+from utils.sessions import log_session_stats
+from utils.telemetry import log_run_telemetry
+
+
+# NOTE: runs every ATS under a single scrape run, HTTP and browser scrapers
+# get separate concurrency budgets since a Chrome page costs far more than a GET
+
+ATS_TO_SCRAPE = "All"
+HTTP_SCRAPERS = {
+    scraper.ATS_TO_SCRAPE: scraper for scraper in (greenhouse, lever, jazzhr)
+}
+BROWSER_SCRAPERS = {scraper.ATS_TO_SCRAPE: scraper for scraper in (ashby, workable)}
+HTTP_CONCURRENCY = int(os.environ.get("scrape_http_concurrency", 8))
+BROWSER_CONCURRENCY = int(
+    os.environ.get("scrape_browser_concurrency", driver_pool.size)
+)
+
+
+def group_companies_by_ats(company_queryset: list[tuple]) -> dict[str, list]:
+    companies_by_ats = {}
+    for result in company_queryset:
+        companies_by_ats.setdefault(result[3], []).append(result)
+    return companies_by_ats
+
+
+def summarize_results(companies: list[tuple], results: list) -> dict[str, dict]:
+    ats_results = {}
+    for company, result in zip(companies, results):
+        summary = ats_results.setdefault(
+            company[3],
+            {"companies": 0, "failed": 0, "jobs_added": 0, "jobs_deactivated": 0},
+        )
+        summary["companies"] += 1
+        if isinstance(result, Exception):
+            summary["failed"] += 1
+        else:
+            summary["jobs_added"] += result[0]
+            summary["jobs_deactivated"] += result[1]
+    return ats_results
+
+
+async def scrape_company(engine: ScrapeEngine, result: tuple) -> tuple[int, int]:
+    scraper = HTTP_SCRAPERS.get(result[3]) or BROWSER_SCRAPERS[result[3]]
+    return await scraper.scrape_company(engine, result)
+
+
+async def scrape_all(
+    http_engine: ScrapeEngine,
+    http_companies: list[tuple],
+    browser_engine: ScrapeEngine,
+    browser_companies: list[tuple],
+) -> tuple[list, list]:
+    http_results, browser_results = await asyncio.gather(
+        http_engine.scrape(http_companies, scrape_company),
+        browser_engine.scrape(browser_companies, scrape_company),
+    )
+    return http_results, browser_results
+
+
+def scrape_jobs(run_id: str) -> dict[str, dict]:
+    for scraper in (*HTTP_SCRAPERS.values(), *BROWSER_SCRAPERS.values()):
+        scraper.scrape_run_id = run_id
+    active_job_index.load(get_active_job_ids())
+    companies_by_ats = group_companies_by_ats(
+        get_companies_by_ats([*HTTP_SCRAPERS, *BROWSER_SCRAPERS])
+    )
+    http_companies = [
+        result for ats in HTTP_SCRAPERS for result in companies_by_ats.get(ats, [])
+    ]
+    browser_companies = [
+        result for ats in BROWSER_SCRAPERS for result in companies_by_ats.get(ats, [])
+    ]
+    http_engine = ScrapeEngine(run_id, max_concurrency=HTTP_CONCURRENCY)
+    browser_engine = ScrapeEngine(run_id, max_concurrency=BROWSER_CONCURRENCY)
+    http_results, browser_results = asyncio.run(
+        scrape_all(http_engine, http_companies, browser_engine, browser_companies)
+    )
+    board_cache.evict()
+    if DEACTIVATION_MODE == "run":
+        deactivate_unseen_jobs(
+            {**http_engine.seen_job_ids, **browser_engine.seen_job_ids}, run_id
+        )
+    return summarize_results(
+        http_companies + browser_companies, http_results + browser_results
+    )
+
+
+def log_run_results(run_id: str, ats_results: dict[str, dict]) -> None:
+    for ats, summary in ats_results.items():
+        print(
+            f"{run_id} | {ats} | {summary['companies']} companies"
+            f" | {summary['failed']} failed"
+            f" | {summary['jobs_added']} added"
+            f" | {summary['jobs_deactivated']} deactivated"
+        )
+        if summary["failed"]:
+            log_error(run_id, f"{summary['failed']} {ats} companies failed")
+    return
+
+
+if __name__ == "__main__":
+    scrape_run_id, run_time = log_run_begin(ATS_TO_SCRAPE)
+    try:
+        ats_results = scrape_jobs(scrape_run_id)
+    finally:
+        driver_pool.close()
+    log_run_results(scrape_run_id, ats_results)
+    log_session_stats(scrape_run_id)
+    log_cache_stats(scrape_run_id)
+    log_location_cache_stats(scrape_run_id)
+    log_pool_stats(scrape_run_id)
+    log_run_telemetry(scrape_run_id)
+    log_run_end(scrape_run_id, ATS_TO_SCRAPE)
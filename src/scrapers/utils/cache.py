@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from utils.helpers import get_response_content
+from utils.sessions import session_manager
+
+
+# NOTE: an entry is only committed once its board has been fully processed, so
+# a board whose jobs failed to write is re-parsed on the next run. Entries are
+# stored per fetched url, key only names the board that commits them, so a
+# board falling back from its API to HTML caches the page it actually used
+CACHE_DIR = os.environ.get("scrape_board_cache_dir", ".cache/boards")
+CACHE_TTL = int(os.environ.get("scrape_board_cache_ttl", 86400))
+CACHE_MAX_ENTRIES = int(os.environ.get("scrape_board_cache_max_entries", 5000))
+CACHE_ENABLED = os.environ.get("scrape_board_cache", "true").lower() == "true"
+
+
+class BoardCache:
+    def __init__(
+        self,
+        cache_dir: str = CACHE_DIR,
+        ttl: int = CACHE_TTL,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        enabled: bool = CACHE_ENABLED,
+    ):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_entry_path(self, key: str) -> str:
+        key_hash = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key_hash}.json")
+
+    def load(self, url: str) -> dict | None:
+        entry_path = self.get_entry_path(url)
+        try:
+            with open(entry_path, mode="r") as entry_file:
+                entry = json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != url or time.time() - entry["stored_at"] > self.ttl:
+            self.remove(entry_path)
+            return None
+        return entry
+
+    def remove(self, entry_path: str) -> None:
+        try:
+            os.remove(entry_path)
+        except OSError:
+            pass
+        return
+
+    def get_conditional_headers(self, entry: dict | None) -> dict:
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def fetch(self, url: str, key: str | None = None) -> tuple[bytes | None, bool]:
+        key = key or url
+        if not self.enabled:
+            return get_response_content(session_manager.get(url), url), True
+        entry = self.load(url)
+        response = session_manager.get(url, headers=self.get_conditional_headers(entry))
+        if entry and response.status_code == 304:
+            self.record(hit=True)
+            return None, False
+        content = get_response_content(response, url)
+        content_hash = hashlib.sha256(content or b"").hexdigest()
+        if entry and content is not None and entry["content_hash"] == content_hash:
+            self.record(hit=True)
+            return content, False
+        self.record(hit=False)
+        if content is not None:
+            with self.lock:
+                self.pending[key] = {
+                    "url": url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "content_hash": content_hash,
+                }
+        return content, True
+
+    def record(self, hit: bool) -> None:
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return
+
+    def commit(self, key: str) -> None:
+        with self.lock:
+            entry = self.pending.pop(key, None)
+        if not entry:
+            return
+        entry["stored_at"] = time.time()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry_path = self.get_entry_path(entry["url"])
+        temp_path = f"{entry_path}.{threading.get_ident()}.tmp"
+        with open(temp_path, mode="w") as entry_file:
+            json.dump(entry, entry_file)
+        os.replace(temp_path, entry_path)
+        return
+
+    def evict(self) -> None:
+        # NOTE: run once per run after scraping, entries can disappear while it
+        # scans since expired ones are also removed by load
+        if not self.enabled:
+            return
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as dir_entries:
+                for dir_entry in dir_entries:
+                    if not dir_entry.name.endswith(".json"):
+                        continue
+                    try:
+                        entries.append((dir_entry.stat().st_mtime, dir_entry.path))
+                    except FileNotFoundError:
+                        pass
+        except FileNotFoundError:
+            return
+        entries.sort()
+        expired_before = time.time() - self.ttl
+        overflow = max(len(entries) - self.max_entries, 0)
+        for i, (stored_at, entry_path) in enumerate(entries):
+            if i < overflow or stored_at < expired_before:
+                self.remove(entry_path)
+        return
+
+
+board_cache = BoardCache()
+
+
+def log_cache_stats(run_id: str) -> None:
+    print(
+        f"{run_id} | board cache | {board_cache.hits} unchanged"
+        f" | {board_cache.misses} changed"
+    )
+    return
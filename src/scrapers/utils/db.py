@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2 as pg
+from psycopg2.pool import ThreadedConnectionPool
+
+from utils.telemetry import run_telemetry
+
+
+POOL_MINCONN = int(os.environ.get("postgres_pool_minconn", 1))
+POOL_MAXCONN = int(os.environ.get("postgres_pool_maxconn", 8))
+
+
+def build_dsn() -> str:
+    if os.environ.get("postgres_dsn"):
+        return os.environ["postgres_dsn"]
+    dsn = (
+        f"dbname={os.environ['postgres_db_name']}"
+        f" user={os.environ['postgres_user']}"
+        f" password={os.environ['postgres_pwd']}"
+    )
+    if os.environ.get("postgres_host"):
+        dsn += f" host={os.environ['postgres_host']}"
+    if os.environ.get("postgres_port"):
+        dsn += f" port={os.environ['postgres_port']}"
+    return dsn
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        dsn: str | None = None,
+        minconn: int = POOL_MINCONN,
+        maxconn: int = POOL_MAXCONN,
+    ):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.pool = None
+        # NOTE: ThreadedConnectionPool raises when exhausted, the semaphore
+        # makes callers queue for a connection instead
+        self.slots = threading.BoundedSemaphore(maxconn)
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.discarded = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def get_pool(self) -> ThreadedConnectionPool:
+        with self.lock:
+            if self.pool is None:
+                self.pool = ThreadedConnectionPool(
+                    self.minconn, self.maxconn, self.dsn or build_dsn()
+                )
+            return self.pool
+
+    def checkout(self):
+        start = time.perf_counter()
+        self.slots.acquire()
+        try:
+            conn = self.get_pool().getconn()
+        except Exception:
+            self.slots.release()
+            raise
+        wait = time.perf_counter() - start
+        with self.lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        return conn
+
+    def checkin(self, conn, discard: bool = False) -> None:
+        discard = discard or bool(conn.closed)
+        try:
+            self.get_pool().putconn(conn, close=discard)
+        finally:
+            with self.lock:
+                self.in_use -= 1
+                if discard:
+                    self.discarded += 1
+            self.slots.release()
+        return
+
+    @contextmanager
+    def connection(self):
+        conn = self.checkout()
+        start = time.perf_counter()
+        discard = False
+        try:
+            yield conn
+        except (pg.OperationalError, pg.InterfaceError):
+            discard = True
+            raise
+        finally:
+            if not discard and not conn.closed:
+                # NOTE: leave nothing open, callers commit their own writes
+                conn.rollback()
+            self.checkin(conn, discard)
+            run_telemetry.add("db_time", time.perf_counter() - start)
+
+    def get_stats(self) -> dict:
+        with self.lock:
+            return {
+                "checkouts": self.checkouts,
+                "discarded": self.discarded,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "avg_wait": self.total_wait / max(self.checkouts, 1),
+                "max_wait": self.max_wait,
+            }
+
+    def close(self) -> None:
+        with self.lock:
+            if self.pool is not None:
+                self.pool.closeall()
+                self.pool = None
+        return
+
+
+db_pool = ConnectionPool()
+
+
+def log_pool_stats(run_id: str) -> None:
+    stats = db_pool.get_stats()
+    print(
+        f"{run_id} | db pool | {stats['checkouts']} checkouts"
+        f" | peak {stats['peak_in_use']}/{db_pool.maxconn} in use"
+        f" | avg wait {stats['avg_wait']:.3f}s | max wait {stats['max_wait']:.3f}s"
+        f" | {stats['discarded']} discarded"
+    )
+    return
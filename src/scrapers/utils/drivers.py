@@ -0,0 +1,121 @@
+import contextvars
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from selenium.common.exceptions import WebDriverException
+
+from utils.helpers import create_driver
+from utils.telemetry import run_telemetry
+
+POOL_SIZE = int(os.environ.get("scrape_driver_pool_size", 3))
+MAX_PAGES_PER_DRIVER = int(os.environ.get("scrape_driver_max_pages", 50))
+
+
+class PooledDriver:
+    def __init__(self):
+        self.driver = create_driver()
+        self.pages_loaded = 0
+
+    def is_healthy(self) -> bool:
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except WebDriverException:
+            return False
+
+    def quit(self) -> None:
+        try:
+            self.driver.quit()
+        except WebDriverException:
+            pass
+        return
+
+
+class DriverPool:
+    def __init__(
+        self,
+        size: int = POOL_SIZE,
+        max_pages_per_driver: int = MAX_PAGES_PER_DRIVER,
+    ):
+        self.size = size
+        self.max_pages_per_driver = max_pages_per_driver
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.created = 0
+        self.recycled = 0
+
+    def create(self) -> PooledDriver:
+        try:
+            return PooledDriver()
+        except WebDriverException:
+            with self.lock:
+                self.created -= 1
+            raise
+
+    def checkout(self) -> PooledDriver:
+        with self.lock:
+            should_create = self.idle.empty() and self.created < self.size
+            if should_create:
+                self.created += 1
+        if should_create:
+            return self.create()
+        pooled_driver = self.idle.get()
+        if not pooled_driver.is_healthy():
+            pooled_driver = self.replace(pooled_driver)
+        return pooled_driver
+
+    def checkin(self, pooled_driver: PooledDriver, crashed: bool = False) -> None:
+        pooled_driver.pages_loaded += 1
+        if crashed or pooled_driver.pages_loaded >= self.max_pages_per_driver:
+            pooled_driver = self.replace(pooled_driver)
+        else:
+            pooled_driver.driver.implicitly_wait(0)
+        self.idle.put(pooled_driver)
+        return
+
+    def replace(self, pooled_driver: PooledDriver) -> PooledDriver:
+        pooled_driver.quit()
+        with self.lock:
+            self.recycled += 1
+        return self.create()
+
+    @contextmanager
+    def acquire(self):
+        pooled_driver = self.checkout()
+        try:
+            # NOTE: browser time counts as fetch time, it covers page loads and
+            # the DOM queries run against them
+            with run_telemetry.timer("fetch_time"):
+                yield pooled_driver.driver
+        except WebDriverException:
+            self.checkin(pooled_driver, crashed=True)
+            raise
+        except BaseException:
+            self.checkin(pooled_driver)
+            raise
+        else:
+            self.checkin(pooled_driver)
+
+    def map(self, function, items: list) -> list:
+        # NOTE: executor threads do not inherit context variables, so each item
+        # runs in a copy of the caller's context to keep telemetry attributed
+        contexts = [contextvars.copy_context() for item in items]
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(
+                executor.map(
+                    lambda context, item: context.run(function, item), contexts, items
+                )
+            )
+
+    def close(self) -> None:
+        while not self.idle.empty():
+            self.idle.get().quit()
+        with self.lock:
+            self.created = 0
+        return
+
+
+driver_pool = DriverPool()
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import time
+from urllib.parse import urlparse
+
+from utils.cache import board_cache
+from utils.helpers import log_error, examine_current_job_list, DEACTIVATION_MODE
+from utils.pipeline import ScrapePipeline
+from utils.queries import reactivate_unchanged_jobs, update_inactive_jobs
+from utils.telemetry import run_telemetry
+
+
+# NOTE: politeness is enforced per host, so a run is bounded by the slowest
+# host's interval rather than by the sum of all sleeps
+MAX_CONCURRENCY = int(os.environ.get("scrape_max_concurrency", 8))
+HOST_INTERVAL = float(os.environ.get("scrape_host_interval", 1.0))
+
+
+class ScrapeEngine:
+    def __init__(
+        self,
+        run_id: str,
+        ats: str | None = None,
+        max_concurrency: int = MAX_CONCURRENCY,
+        host_interval: float = HOST_INTERVAL,
+    ):
+        self.run_id = run_id
+        self.ats = ats
+        self.max_concurrency = max_concurrency
+        self.host_interval = host_interval
+        self.semaphore = None
+        self.host_locks = {}
+        self.host_last_request = {}
+        self.seen_job_ids = {}
+        self.pipelines = {}
+
+    async def wait_for_host(self, url: str) -> None:
+        host = urlparse(url).netloc
+        lock = self.host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            last_request = self.host_last_request.get(host)
+            if last_request is not None:
+                wait = last_request + self.host_interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            self.host_last_request[host] = time.monotonic()
+        return
+
+    async def fetch(self, fetch_function, url: str, *args):
+        # NOTE: the host interval is taken once a slot is held, otherwise
+        # requests queued on the semaphore would all reach the host at once
+        async with self.semaphore:
+            await self.wait_for_host(url)
+            return await asyncio.to_thread(fetch_function, url, *args)
+
+    async def run_blocking(self, function, *args):
+        async with self.semaphore:
+            return await asyncio.to_thread(function, *args)
+
+    def record_seen_jobs(self, company_id: str, job_list: list) -> None:
+        self.seen_job_ids[company_id] = [job.id for job in job_list]
+        return
+
+    async def gather(self, coroutines: list) -> list:
+        return await asyncio.gather(*coroutines)
+
+    def get_pipeline(
+        self, name: str, fetch_function, parse_function, write_function
+    ) -> ScrapePipeline:
+        if name not in self.pipelines:
+            self.pipelines[name] = ScrapePipeline(
+                self, fetch_function, parse_function, write_function
+            )
+        return self.pipelines[name]
+
+    async def close_pipelines(self) -> None:
+        for name, pipeline in self.pipelines.items():
+            await pipeline.close()
+            pipeline.log_stats(name)
+        return
+
+    async def scrape_board(
+        self,
+        company_id: str,
+        career_site_url: str,
+        get_current_job_list,
+        write_jobs,
+    ) -> tuple[int, int]:
+        # NOTE: the flow every scraper shares, get_current_job_list fetches the
+        # board's listing and write_jobs(engine, jobs) fills in descriptions and
+        # writes the jobs that could not be reactivated as they were
+        jobs_added, jobs_deactivated = 0, 0
+        current_job_list = await self.fetch(get_current_job_list, career_site_url)
+        if current_job_list is None:
+            print(f"No changes found for {career_site_url}")
+            return jobs_added, jobs_deactivated
+        if not current_job_list:
+            print(f"No jobs found for {career_site_url}")
+        self.record_seen_jobs(company_id, current_job_list)
+        ids_to_add, ids_to_deactivate = await self.run_blocking(
+            examine_current_job_list, current_job_list, company_id
+        )
+        if ids_to_add:
+            print(f"{len(ids_to_add)} jobs found to add")
+            jobs_to_add = [job for job in current_job_list if job.id in ids_to_add]
+            for job in jobs_to_add:
+                job.company_id = company_id
+                job.scrape_run_id = self.run_id
+                job.active = True
+                job.new = True
+            reactivated_ids = await self.run_blocking(
+                reactivate_unchanged_jobs, jobs_to_add
+            )
+            await write_jobs(
+                self, [job for job in jobs_to_add if job.id not in reactivated_ids]
+            )
+            jobs_added = len(jobs_to_add) - len(reactivated_ids)
+        else:
+            print(f"No new jobs found for {career_site_url}")
+        if ids_to_deactivate and DEACTIVATION_MODE == "company":
+            print(f"{len(ids_to_deactivate)} jobs found to deactivate")
+            await self.run_blocking(
+                update_inactive_jobs, list(ids_to_deactivate), self.run_id
+            )
+            jobs_deactivated = len(ids_to_deactivate)
+        board_cache.commit(career_site_url)
+        return jobs_added, jobs_deactivated
+
+    async def scrape_one(self, company: tuple, scrape_company):
+        # NOTE: runs in its own task, so the telemetry context set here only
+        # covers this company's work
+        ats = company[3] if len(company) > 3 else self.ats
+        run_telemetry.start_company(company[0], ats)
+        try:
+            result = await scrape_company(self, company)
+        except Exception as error:
+            run_telemetry.fail_company(company[0])
+            log_error(self.run_id, f"{company[1]} | {error!r}")
+            return error
+        run_telemetry.add("jobs_added", result[0])
+        run_telemetry.add("jobs_deactivated", result[1])
+        return result
+
+    async def scrape(self, companies: list[tuple], scrape_company) -> list:
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            results = await asyncio.gather(
+                *[self.scrape_one(company, scrape_company) for company in companies],
+                return_exceptions=True,
+            )
+        finally:
+            await self.close_pipelines()
+        return results
+
+    def run(self, companies: list[tuple], scrape_company) -> list:
+        return asyncio.run(self.scrape(companies, scrape_company))
@@ -1,12 +1,24 @@
 import datetime
-import requests
+import os
 import uuid
 import re
+from urllib.parse import urlparse
 
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 
 from utils.models import Job
+from utils.sessions import session_manager
+from utils.snapshot import active_job_index
+from utils.telemetry import run_telemetry
+
+
+# NOTE: "company" deactivates jobs as each board is scraped, "run" deactivates
+# every job not seen during the run with a single statement once it finishes
+DEACTIVATION_MODE = os.environ.get("scrape_deactivation_mode", "company")
+# NOTE: "api" reads the public job board APIs and falls back to the HTML or
+# Selenium path when they fail, "html" always uses the fallback path
+FETCH_MODE = os.environ.get("scrape_fetch_mode", "api")
 
 
 def get_utc_now_string() -> str:
@@ -16,6 +28,7 @@ def get_utc_now_string() -> str:
 def log_run_begin(ats_to_scrape: str):
     run_id = str(uuid.uuid4())
     run_time = get_utc_now_string()
+    run_telemetry.begin(run_id, ats_to_scrape)
     print(f"{ats_to_scrape} scrape run {run_id} beginning at {run_time} UTC")
     return run_id, run_time
 
@@ -27,12 +40,17 @@ def log_run_end(run_id: str, ats_to_scrape: str) -> None:
 
 
 def log_error(run_id: str, error: str) -> None:
+    run_telemetry.add("errors", 1)
     print(f"{run_id} | {error}")
     return
 
 
 def get_url(url: str) -> bytes | None:
-    response = requests.get(url)
+    response = session_manager.get(url)
+    return get_response_content(response, url)
+
+
+def get_response_content(response, url: str) -> bytes | None:
     if response.status_code == 200:
         return response.content
     elif response.status_code == 404:
@@ -53,10 +71,13 @@ def examine_current_job_list(job_list: list[Job], company_id: str) -> set:
     from utils.queries import get_active_job_ids_by_company_id
 
     job_list_ids = set([job.id for job in job_list])
-    active_company_job_ids_results = get_active_job_ids_by_company_id(company_id)
-    active_company_job_ids = set(
-        [result[0] for result in active_company_job_ids_results]
-    )
+    if active_job_index.loaded:
+        active_company_job_ids = active_job_index.get_job_ids(company_id)
+    else:
+        active_company_job_ids_results = get_active_job_ids_by_company_id(company_id)
+        active_company_job_ids = set(
+            [result[0] for result in active_company_job_ids_results]
+        )
     ids_to_add = job_list_ids.difference(active_company_job_ids)
     ids_to_deactivate = active_company_job_ids.difference(job_list_ids)
     return ids_to_add, ids_to_deactivate
@@ -68,6 +89,14 @@ def normalize_career_site_url(career_site_url: str) -> str:
     return career_site_url
 
 
+def get_board_token(career_site_url: str) -> str:
+    path = urlparse(career_site_url).path.strip("/")
+    if path:
+        return path.split("/")[0]
+    else:
+        raise ValueError(f"Unable to parse url {career_site_url} for board token")
+
+
 def validate_uuid(uuid: str) -> bool:
     if re.search(
         "^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", uuid
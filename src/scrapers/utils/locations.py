@@ -0,0 +1,275 @@
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+
+# NOTE: resolves free text job locations ("Chicago, IL", "Remote - US",
+# "NYC / Hybrid") against the locations table, which is loaded once into
+# normalized name hashes. Text is split into segments on "/", ";", "|" and "or",
+# each segment is read right to left as country, division then city. When a
+# name is ambiguous the default country wins, then the larger city
+DEFAULT_COUNTRY_CODE = os.environ.get("scrape_default_country", "US")
+# NOTE: resolutions are memoized per location key in an LRU in front of the
+# location_resolutions table, build_locations.py clears the table on reload
+LOCATION_CACHE_SIZE = int(os.environ.get("scrape_location_cache_size", 10000))
+
+NOISE_TOKENS = {
+    "remote",
+    "hybrid",
+    "onsite",
+    "site",
+    "office",
+    "anywhere",
+    "flexible",
+    "based",
+    "wfh",
+    "only",
+    "hq",
+    "headquarters",
+    "multiple",
+    "locations",
+    "location",
+    "area",
+    "greater",
+    "metro",
+    "metropolitan",
+}
+# NOTE: also the Indiana and Ontario codes, only noise next to other words as
+# in "Remote in Texas" or "On-site", a part that is just "IN" is a division
+CONNECTOR_TOKENS = {"in", "on"}
+TOKEN_ALIASES = {
+    "saint": "st",
+    "sainte": "ste",
+    "fort": "ft",
+    "mount": "mt",
+}
+COUNTRY_ALIASES = {
+    "usa": "US",
+    "united states of america": "US",
+    "america": "US",
+    "uk": "GB",
+    "great britain": "GB",
+    "england": "GB",
+}
+CITY_ALIASES = {
+    "nyc": "new york city",
+    "new york": "new york city",
+    "sf": "san francisco",
+    "la": "los angeles",
+    "dc": "washington",
+    "washington dc": "washington",
+    "philly": "philadelphia",
+}
+SEGMENT_PATTERN = re.compile(r"\s*(?:/|;|\||\n)\s*|\s+or\s+")
+PART_PATTERN = re.compile(r"\s*(?:,|\s-\s|\(|\)|:)\s*")
+
+
+def normalize_name(name: str) -> str:
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    tokens = re.sub(r"[^a-z0-9]+", " ", name.lower()).split()
+    return " ".join(TOKEN_ALIASES.get(token, token) for token in tokens)
+
+
+def get_location_key(location: str) -> str:
+    return " ".join(location.lower().split())
+
+
+def normalize_part(part: str) -> str:
+    tokens = normalize_name(part).split()
+    if len(tokens) > 1:
+        tokens = [token for token in tokens if token not in CONNECTOR_TOKENS]
+    return " ".join(token for token in tokens if token not in NOISE_TOKENS)
+
+
+class LocationIndex:
+    def __init__(self, default_country_code: str = DEFAULT_COUNTRY_CODE):
+        self.default_country_code = default_country_code
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        self.loaded = False
+        self.countries = {}
+        self.divisions = {}
+        self.cities = {}
+
+    def load(self, locations: list[tuple]) -> None:
+        countries, divisions, cities = {}, {}, {}
+        country_codes = {}
+        default_country_id = None
+        for location in locations:
+            (
+                location_id,
+                country_id,
+                country_division_id,
+                city_id,
+                country_name,
+                country_code,
+                division_name,
+                division_code,
+                city_name,
+                population,
+            ) = location
+            if city_id is not None:
+                cities.setdefault(normalize_name(city_name), []).append(
+                    (country_id, country_division_id, location_id, population or 0)
+                )
+            elif country_division_id is not None:
+                division = (country_id, country_division_id, location_id)
+                divisions.setdefault(normalize_name(division_name), []).append(division)
+                if division_code and division_code.isalpha():
+                    divisions.setdefault(division_code.lower(), []).append(division)
+            else:
+                country = (country_id, location_id)
+                countries[normalize_name(country_name)] = country
+                countries[country_code.lower()] = country
+                country_codes[country_code] = country
+                if country_code == self.default_country_code:
+                    default_country_id = country_id
+        for alias, country_code in COUNTRY_ALIASES.items():
+            if country_code in country_codes:
+                countries[alias] = country_codes[country_code]
+        for division_list in divisions.values():
+            division_list.sort(key=lambda division: division[0] != default_country_id)
+        for city_list in cities.values():
+            city_list.sort(key=lambda city: (city[0] != default_country_id, -city[3]))
+        with self.lock:
+            self.countries = countries
+            self.divisions = divisions
+            self.cities = cities
+            self.loaded = True
+        print(f"Loaded {len(locations)} locations into location index")
+        return
+
+    def ensure_loaded(self, get_locations) -> None:
+        with self.load_lock:
+            if not self.loaded:
+                self.load(get_locations())
+        return
+
+    def get_contexts(self, part: str, country_id: int | None) -> list[tuple]:
+        contexts = []
+        for division in self.divisions.get(part, []):
+            if country_id is None or division[0] == country_id:
+                contexts.append(division)
+        country = self.countries.get(part)
+        if country and country_id is None:
+            contexts.append((country[0], None, country[1]))
+        return contexts
+
+    def find_city(
+        self, part: str, country_id: int | None, division_id: int | None
+    ) -> int | None:
+        for city in self.cities.get(CITY_ALIASES.get(part, part), []):
+            if country_id is not None and city[0] != country_id:
+                continue
+            if division_id is not None and city[1] != division_id:
+                continue
+            return city[2]
+        return None
+
+    def resolve_parts(
+        self,
+        parts: list[str],
+        country_id: int | None = None,
+        division_id: int | None = None,
+        location_id: int | None = None,
+    ) -> int | None:
+        fallback_location_id = None
+        if division_id is None and len(parts) > 1:
+            for context in self.get_contexts(parts[-1], country_id):
+                resolved_location_id = self.resolve_parts(parts[:-1], *context)
+                if resolved_location_id != context[2]:
+                    return resolved_location_id
+                fallback_location_id = fallback_location_id or resolved_location_id
+        for part in reversed(parts):
+            city_location_id = self.find_city(part, country_id, division_id)
+            if city_location_id is not None:
+                return city_location_id
+        if location_id is None and len(parts) == 1:
+            for context in self.get_contexts(parts[0], country_id):
+                return context[2]
+        return fallback_location_id or location_id
+
+    def resolve_segment(self, segment: str) -> int | None:
+        parts = [normalize_part(part) for part in PART_PATTERN.split(segment)]
+        parts = [part for part in parts if part]
+        if not parts:
+            return None
+        location_id = self.resolve_parts(parts)
+        if location_id is None and len(parts) == 1:
+            tokens = parts[0].split()
+            for i in range(len(tokens) - 1, 0, -1):
+                location_id = self.resolve_parts(
+                    [" ".join(tokens[:i]), " ".join(tokens[i:])]
+                )
+                if location_id is not None:
+                    break
+        return location_id
+
+    def resolve(self, location: str | None) -> list[int]:
+        location_ids = []
+        if not location:
+            return location_ids
+        for segment in SEGMENT_PATTERN.split(location):
+            location_id = self.resolve_segment(segment)
+            if location_id is not None and location_id not in location_ids:
+                location_ids.append(location_id)
+        return location_ids
+
+
+class LocationCache:
+    def __init__(self, max_entries: int = LOCATION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.table_hits = 0
+        self.misses = 0
+
+    def get(self, location_key: str) -> list[int] | None:
+        with self.lock:
+            location_ids = self.entries.get(location_key)
+            if location_ids is not None:
+                self.entries.move_to_end(location_key)
+                self.hits += 1
+            return location_ids
+
+    def put(self, location_key: str, location_ids: list[int]) -> None:
+        with self.lock:
+            self.entries[location_key] = location_ids
+            self.entries.move_to_end(location_key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return
+
+    def record(self, table_hits: int, misses: int) -> None:
+        with self.lock:
+            self.table_hits += table_hits
+            self.misses += misses
+        return
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+        return
+
+    def get_hit_rate(self) -> float:
+        lookups = self.hits + self.table_hits + self.misses
+        if not lookups:
+            return 0.0
+        return (self.hits + self.table_hits) / lookups
+
+
+location_index = LocationIndex()
+location_cache = LocationCache()
+
+
+def log_location_cache_stats(run_id: str) -> None:
+    print(
+        f"{run_id} | location cache | {location_cache.hits} memory hits"
+        f" | {location_cache.table_hits} table hits"
+        f" | {location_cache.misses} resolved"
+        f" | {location_cache.get_hit_rate():.1%} hit rate"
+    )
+    return
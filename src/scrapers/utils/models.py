@@ -1,17 +1,29 @@
+import hashlib
+import json
+from dataclasses import dataclass, fields
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# NOTE: field order matches the column order of logistics_jobs.jobs, to_row
+# feeds execute_values directly and the serialized formats store bare rows
+@dataclass(slots=True, eq=False)
 class Job:
-    def __init__(self):
-        self.id = None
-        self.company_id = None
-        self.title = None
-        self.url = None
-        self.description = None
-        self.salary = None
-        self.location = None
-        self.active = None
-        self.new = None
-        self.remote = None
-        self.insert_timestamp = None
-        self.scrape_run_id = None
+    id: str | None = None
+    company_id: str | None = None
+    title: str | None = None
+    url: str | None = None
+    description: str | None = None
+    salary: str | None = None
+    location: str | None = None
+    active: bool | None = None
+    new: bool | None = None
+    remote: bool | None = None
+    insert_timestamp: str | None = None
+    scrape_run_id: str | None = None
 
     def dump(self) -> dict:
         job = {
@@ -26,3 +38,63 @@ class Job:
             "remote": self.remote,
         }
         return job
+
+    def to_row(self) -> tuple:
+        return (
+            self.id,
+            self.company_id,
+            self.title,
+            self.url,
+            self.description,
+            self.salary,
+            self.location,
+            self.active,
+            self.new,
+            self.remote,
+            self.insert_timestamp,
+            self.scrape_run_id,
+        )
+
+    def get_listing_fingerprint(self, stored_location: str | None = None) -> str:
+        location = self.location or stored_location or ""
+        listing = "\x1f".join([self.title or "", self.url or "", location])
+        return hashlib.sha256(listing.encode("utf-8")).hexdigest()
+
+    def get_description_hash(self) -> str | None:
+        if self.description is None:
+            return None
+        return hashlib.sha256(self.description.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def from_row(cls, row) -> "Job":
+        return cls(*row)
+
+
+JOB_FIELDS = tuple(field.name for field in fields(Job))
+SERIALIZATION_FORMATS = ("json", "msgpack")
+
+
+def serialize_jobs(jobs: list[Job], format: str = "json") -> bytes:
+    document = {"fields": JOB_FIELDS, "rows": [job.to_row() for job in jobs]}
+    if format == "json":
+        return json.dumps(document, separators=(",", ":")).encode("utf-8")
+    elif format == "msgpack":
+        if msgpack is None:
+            raise ValueError("msgpack is not installed")
+        return msgpack.packb(document)
+    else:
+        raise ValueError(f"Unknown serialization format {format}")
+
+
+def deserialize_jobs(content: bytes, format: str = "json") -> list[Job]:
+    if format == "json":
+        document = json.loads(content)
+    elif format == "msgpack":
+        if msgpack is None:
+            raise ValueError("msgpack is not installed")
+        document = msgpack.unpackb(content)
+    else:
+        raise ValueError(f"Unknown serialization format {format}")
+    if tuple(document["fields"]) != JOB_FIELDS:
+        raise ValueError("Serialized jobs do not match the Job fields")
+    return [Job.from_row(row) for row in document["rows"]]
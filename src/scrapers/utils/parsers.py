@@ -0,0 +1,121 @@
+import os
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.etree
+    import lxml.html
+    import cssselect  # noqa: F401
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+
+# NOTE: BeautifulSoup leaves <script> and <style> contents out of get_text, the
+# fast backends strip those tags at parse time so every backend returns the
+# same text
+
+
+class HtmlParser:
+    name = "html.parser"
+
+    def parse(self, content: bytes):
+        return BeautifulSoup(content, "html.parser", from_encoding="utf-8")
+
+    def select(self, node, selector: str) -> list:
+        return node.select(selector)
+
+    def select_one(self, node, selector: str):
+        return node.select_one(selector)
+
+    def get_by_id(self, node, element_id: str):
+        return node.find(id=element_id)
+
+    def get_text(self, node) -> str:
+        return node.get_text()
+
+    def get_attribute(self, node, attribute: str) -> str | None:
+        return node.get(attribute)
+
+
+class LxmlParser(HtmlParser):
+    name = "lxml"
+
+    def parse(self, content: bytes):
+        document = lxml.html.document_fromstring(
+            content, parser=lxml.html.HTMLParser(encoding="utf-8")
+        )
+        lxml.etree.strip_elements(document, "script", "style", with_tail=False)
+        return document
+
+    def select(self, node, selector: str) -> list:
+        return node.cssselect(selector)
+
+    def select_one(self, node, selector: str):
+        selected = node.cssselect(selector)
+        return selected[0] if selected else None
+
+    def get_by_id(self, node, element_id: str):
+        return node.get_element_by_id(element_id, None)
+
+    def get_text(self, node) -> str:
+        return node.text_content()
+
+    def get_attribute(self, node, attribute: str) -> str | None:
+        return node.get(attribute)
+
+
+class SelectolaxParser(HtmlParser):
+    name = "selectolax"
+
+    def parse(self, content: bytes):
+        document = LexborHTMLParser(content.decode("utf-8", errors="replace"))
+        document.strip_tags(["script", "style"])
+        return document
+
+    def select(self, node, selector: str) -> list:
+        return node.css(selector)
+
+    def select_one(self, node, selector: str):
+        return node.css_first(selector)
+
+    def get_by_id(self, node, element_id: str):
+        return node.css_first(f'[id="{element_id}"]')
+
+    def get_text(self, node) -> str:
+        return node.text(deep=True)
+
+    def get_attribute(self, node, attribute: str) -> str | None:
+        return node.attributes.get(attribute)
+
+
+PARSERS = {
+    HtmlParser.name: HtmlParser,
+    LxmlParser.name: LxmlParser,
+    SelectolaxParser.name: SelectolaxParser,
+}
+
+
+def get_available_parsers() -> list[str]:
+    available_parsers = [HtmlParser.name]
+    if lxml is not None:
+        available_parsers.append(LxmlParser.name)
+    if LexborHTMLParser is not None:
+        available_parsers.append(SelectolaxParser.name)
+    return available_parsers
+
+
+def get_parser(name: str | None = None) -> HtmlParser:
+    available_parsers = get_available_parsers()
+    if name is None:
+        name = os.environ.get("scrape_html_parser", available_parsers[-1])
+    if name not in available_parsers:
+        raise ValueError(f"HTML parser {name} is not available")
+    return PARSERS[name]()
+
+
+html_parser = get_parser()
@@ -0,0 +1,189 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.helpers import log_error
+from utils.telemetry import run_telemetry
+
+
+# NOTE: fetch -> parse -> persist stages connected by bounded queues, a full
+# queue blocks the stage feeding it so a slow database throttles fetching
+# instead of piling descriptions up in memory. Parsing runs in a process pool
+# since it is CPU bound, scrape_parse_workers=0 parses in a thread instead
+QUEUE_SIZE = int(os.environ.get("scrape_pipeline_queue_size", 100))
+PARSE_WORKERS = int(os.environ.get("scrape_parse_workers", os.cpu_count() or 1))
+BATCH_SIZE = int(os.environ.get("scrape_pipeline_batch_size", 200))
+FLUSH_INTERVAL = float(os.environ.get("scrape_pipeline_flush_interval", 2.0))
+
+STOP = None
+
+
+class ScrapePipeline:
+    def __init__(
+        self,
+        engine,
+        fetch_function,
+        parse_function,
+        write_function,
+        queue_size: int = QUEUE_SIZE,
+        parse_workers: int = PARSE_WORKERS,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+    ):
+        self.engine = engine
+        self.fetch_function = fetch_function
+        self.parse_function = parse_function
+        self.write_function = write_function
+        self.queue_size = queue_size
+        self.parse_workers = parse_workers
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fetch_queue = None
+        self.parse_queue = None
+        self.write_queue = None
+        self.process_pool = None
+        self.fetch_tasks = []
+        self.parse_tasks = []
+        self.write_task = None
+        self.jobs_fetched = 0
+        self.jobs_parsed = 0
+        self.jobs_written = 0
+        self.batches_written = 0
+
+    def start(self) -> None:
+        self.fetch_queue = asyncio.Queue(maxsize=self.queue_size)
+        self.parse_queue = asyncio.Queue(maxsize=self.queue_size)
+        self.write_queue = asyncio.Queue(maxsize=self.queue_size)
+        if self.parse_workers > 0:
+            self.process_pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+        self.fetch_tasks = [
+            asyncio.create_task(self.fetch_stage())
+            for i in range(self.engine.max_concurrency)
+        ]
+        self.parse_tasks = [
+            asyncio.create_task(self.parse_stage())
+            for i in range(max(self.parse_workers, 1))
+        ]
+        self.write_task = asyncio.create_task(self.write_stage())
+        return
+
+    async def submit(self, jobs: list) -> None:
+        if self.write_task is None:
+            self.start()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for job in jobs:
+            future = loop.create_future()
+            futures.append(future)
+            if job.description is None:
+                await self.fetch_queue.put((job, future))
+            else:
+                await self.write_queue.put((job, future))
+        await asyncio.gather(*futures)
+        return
+
+    async def fetch_stage(self) -> None:
+        while True:
+            item = await self.fetch_queue.get()
+            if item is STOP:
+                return
+            job, future = item
+            run_telemetry.set_companies((job.company_id,))
+            content = None
+            try:
+                content = await self.engine.fetch(self.fetch_function, job.url)
+                self.jobs_fetched += 1
+            except Exception as error:
+                log_error(self.engine.run_id, f"{job.url} | {error!r}")
+            await self.parse_queue.put((job, content, future))
+
+    async def parse_stage(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self.parse_queue.get()
+            if item is STOP:
+                return
+            job, content, future = item
+            run_telemetry.set_companies((job.company_id,))
+            if content:
+                try:
+                    with run_telemetry.timer("parse_time"):
+                        if self.process_pool:
+                            job.description = await loop.run_in_executor(
+                                self.process_pool, self.parse_function, content
+                            )
+                        else:
+                            job.description = await asyncio.to_thread(
+                                self.parse_function, content
+                            )
+                    self.jobs_parsed += 1
+                except Exception as error:
+                    # NOTE: the job still moves on so its batch completes, a
+                    # dead parse task would leave submit() waiting forever
+                    log_error(self.engine.run_id, f"{job.url} | {error!r}")
+            await self.write_queue.put((job, future))
+
+    async def write_stage(self) -> None:
+        loop = asyncio.get_running_loop()
+        batch = []
+        flush_at = None
+        stopping = False
+        while not stopping:
+            timeout = None if flush_at is None else max(flush_at - loop.time(), 0)
+            try:
+                item = await asyncio.wait_for(self.write_queue.get(), timeout=timeout)
+                if item is STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+                    flush_at = flush_at or loop.time() + self.flush_interval
+            except asyncio.TimeoutError:
+                pass
+            if batch and (
+                stopping or len(batch) >= self.batch_size or loop.time() >= flush_at
+            ):
+                await self.write_batch(batch)
+                batch = []
+                flush_at = None
+        return
+
+    async def write_batch(self, batch: list) -> None:
+        run_telemetry.set_companies(tuple(job.company_id for job, future in batch))
+        try:
+            await self.engine.run_blocking(
+                self.write_function, [job for job, future in batch]
+            )
+            self.jobs_written += len(batch)
+            self.batches_written += 1
+            for job, future in batch:
+                if not future.done():
+                    future.set_result(job)
+        except Exception as error:
+            for job, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+        return
+
+    async def close(self) -> None:
+        if self.write_task is None:
+            return
+        for task in self.fetch_tasks:
+            await self.fetch_queue.put(STOP)
+        await asyncio.gather(*self.fetch_tasks)
+        for task in self.parse_tasks:
+            await self.parse_queue.put(STOP)
+        await asyncio.gather(*self.parse_tasks)
+        await self.write_queue.put(STOP)
+        await self.write_task
+        if self.process_pool:
+            self.process_pool.shutdown()
+        self.write_task = None
+        return
+
+    def log_stats(self, name: str) -> None:
+        print(
+            f"{self.engine.run_id} | {name} pipeline | {self.jobs_fetched} fetched"
+            f" | {self.jobs_parsed} parsed | {self.jobs_written} written"
+            f" | {self.batches_written} batches"
+        )
+        return
@@ -1,151 +1,576 @@
-import os
-import psycopg2 as pg
+from psycopg2.extras import execute_values
 
+from utils.db import db_pool
 from utils.helpers import get_utc_now_string
+from utils.locations import get_location_key, location_cache, location_index
 from utils.models import Job
+from utils.salaries import get_salary_row
+from utils.snapshot import active_job_index
+from utils.telemetry import run_telemetry
 
-db_name = os.environ["postgres_db_name"]
-db_user = os.environ["postgres_user"]
-db_pwd = os.environ["postgres_pwd"]
+UPSERT_PAGE_SIZE = 1000
 
 
-def connect_to_db():
-    conn = pg.connect(f"dbname={db_name} user={db_user} password={db_pwd}")
-    return conn
+def get_company_by_ats(ats: str) -> list[tuple]:
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id
+            , company_name
+            , career_site_url 
+            FROM logistics_jobs.companies
+            WHERE ats = %s""",
+            [ats],
+        )
+        queryset = cursor.fetchall()
+    return queryset
 
 
-def get_company_by_ats(ats: str) -> list[tuple]:
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT id
-        , company_name
-        , career_site_url 
-        FROM logistics_jobs.companies
-        WHERE ats = %s""",
-        [ats],
-    )
-    queryset = cursor.fetchall()
-    conn.close()
+def get_companies_by_ats(ats_list: list[str]) -> list[tuple]:
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id
+            , company_name
+            , career_site_url
+            , ats
+            FROM logistics_jobs.companies
+            WHERE ats = ANY(%s)
+            """,
+            [ats_list],
+        )
+        queryset = cursor.fetchall()
     return queryset
 
 
 def get_active_job_ids_by_company_id(company_id: str) -> list[tuple]:
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT id 
-        FROM logistics_jobs.jobs 
-        WHERE company_id = %s 
-            AND active = true
-        """,
-        [company_id],
-    )
-    queryset = cursor.fetchall()
-    conn.close()
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id 
+            FROM logistics_jobs.jobs 
+            WHERE company_id = %s 
+                AND active = true
+            """,
+            [company_id],
+        )
+        queryset = cursor.fetchall()
+    return queryset
+
+
+def get_active_job_ids() -> list[tuple]:
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT company_id
+            , id
+            FROM logistics_jobs.jobs
+            WHERE active = true
+            """
+        )
+        queryset = cursor.fetchall()
+    return queryset
+
+
+def upsert_jobs(jobs: list[Job]) -> None:
+    insert_timestamp = get_utc_now_string()
+    jobs_by_id = {}
+    for job in jobs:
+        print(f"Upserting : {job.id} | {job.title} | {job.url}")
+        job.insert_timestamp = insert_timestamp
+        jobs_by_id[job.id] = (
+            *job.to_row(),
+            job.get_listing_fingerprint(),
+            job.get_description_hash(),
+            *get_salary_row(job.salary),
+        )
+    if not jobs_by_id:
+        return
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        execute_values(
+            cursor,
+            """
+            INSERT INTO logistics_jobs.jobs(
+                id
+                , company_id
+                , title
+                , url
+                , description
+                , salary
+                , location
+                , active
+                , new
+                , remote
+                , insert_timestamp
+                , scrape_insert_run_id
+                , listing_fingerprint
+                , description_hash
+                , salary_min
+                , salary_max
+                , salary_currency
+                , salary_period
+                , salary_annual_min
+                , salary_annual_max
+                , salary_bucket
+                )
+            VALUES %s
+            ON CONFLICT (id) DO UPDATE
+            SET title = EXCLUDED.title
+                , url = EXCLUDED.url
+                , description = EXCLUDED.description
+                , salary = EXCLUDED.salary
+                , location = EXCLUDED.location
+                , active = EXCLUDED.active
+                , new = EXCLUDED.new
+                , remote = EXCLUDED.remote
+                , insert_timestamp = EXCLUDED.insert_timestamp
+                , scrape_insert_run_id = EXCLUDED.scrape_insert_run_id
+                , scrape_inactive_run_id = NULL
+                , listing_fingerprint = EXCLUDED.listing_fingerprint
+                , description_hash = EXCLUDED.description_hash
+                , salary_min = EXCLUDED.salary_min
+                , salary_max = EXCLUDED.salary_max
+                , salary_currency = EXCLUDED.salary_currency
+                , salary_period = EXCLUDED.salary_period
+                , salary_annual_min = EXCLUDED.salary_annual_min
+                , salary_annual_max = EXCLUDED.salary_annual_max
+                , salary_bucket = EXCLUDED.salary_bucket
+            """,
+            list(jobs_by_id.values()),
+            page_size=UPSERT_PAGE_SIZE,
+        )
+        conn.commit()
+    for job in jobs_by_id.values():
+        if job[7]:
+            active_job_index.add(job[1], [job[0]])
+    upsert_jobs_locations([(job[0], job[6]) for job in jobs_by_id.values()])
+    return
+
+
+def get_locations() -> list[tuple]:
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT l.id
+            , l.country_id
+            , l.country_division_id
+            , l.city_id
+            , co.name
+            , co.code
+            , cd.name
+            , cd.code
+            , c.name
+            , c.population
+            FROM logistics_jobs.locations AS l
+                INNER JOIN logistics_jobs.countries AS co
+                    ON l.country_id = co.id
+                LEFT JOIN logistics_jobs.country_divisions AS cd
+                    ON l.country_division_id = cd.id
+                LEFT JOIN logistics_jobs.cities AS c
+                    ON l.city_id = c.id
+            """
+        )
+        queryset = cursor.fetchall()
     return queryset
 
 
-def insert_job(job: Job) -> None:
-    # TODO: called as n+1 in scraper
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    print(f"Inserting : {job.id} | {job.title} | {job.url}")
-    job.insert_timestamp = get_utc_now_string()
-    cursor.execute(
-        """
-        INSERT INTO logistics_jobs.jobs(
-            id
-            , company_id
-            , title
-            , url
-            , description
+def get_jobs_with_salaries() -> list[tuple]:
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id
             , salary
-            , location
-            , active
-            , new
-            , remote
-            , insert_timestamp
-            , scrape_insert_run_id
-            ) 
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)""",
-        [
-            job.id,
-            job.company_id,
-            job.title,
-            job.url,
-            job.description,
-            job.salary,
-            job.location,
-            job.active,
-            job.new,
-            job.remote,
-            job.insert_timestamp,
-            job.scrape_run_id,
-        ],
+            FROM logistics_jobs.jobs
+            WHERE salary IS NOT NULL
+            """
+        )
+        queryset = cursor.fetchall()
+    return queryset
+
+
+def update_job_salaries(job_salaries: list[tuple]) -> None:
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        execute_values(
+            cursor,
+            """
+            UPDATE logistics_jobs.jobs AS j
+            SET salary_min = s.salary_min
+                , salary_max = s.salary_max
+                , salary_currency = s.salary_currency
+                , salary_period = s.salary_period
+                , salary_annual_min = s.salary_annual_min
+                , salary_annual_max = s.salary_annual_max
+                , salary_bucket = s.salary_bucket
+            FROM (VALUES %s) AS s(
+                id
+                , salary_min
+                , salary_max
+                , salary_currency
+                , salary_period
+                , salary_annual_min
+                , salary_annual_max
+                , salary_bucket
+                )
+            WHERE j.id = s.id
+            """,
+            job_salaries,
+            template=(
+                "(%s::uuid, %s::numeric, %s::numeric, %s, %s, %s::numeric,"
+                " %s::numeric, %s::integer)"
+            ),
+            page_size=UPSERT_PAGE_SIZE,
+        )
+        conn.commit()
+    return
+
+
+def get_jobs_without_locations() -> list[tuple]:
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT j.id
+            , j.location
+            FROM logistics_jobs.jobs AS j
+            WHERE j.active = true
+                AND NOT EXISTS (
+                    SELECT 1
+                    FROM logistics_jobs.jobs_locations AS jl
+                    WHERE jl.job_id = j.id
+                )
+            """
+        )
+        queryset = cursor.fetchall()
+    return queryset
+
+
+def get_location_resolutions(location_keys: list[str]) -> list[tuple]:
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT location_key
+            , location_ids
+            FROM logistics_jobs.location_resolutions
+            WHERE location_key = ANY(%s)
+            """,
+            [location_keys],
+        )
+        queryset = cursor.fetchall()
+    return queryset
+
+
+def resolve_location_keys(location_keys: set) -> dict[str, list]:
+    resolved = {}
+    missing_keys = []
+    for location_key in location_keys:
+        location_ids = location_cache.get(location_key)
+        if location_ids is None:
+            missing_keys.append(location_key)
+        else:
+            resolved[location_key] = location_ids
+    if not missing_keys:
+        return resolved
+    table_hits = 0
+    for location_key, location_ids in get_location_resolutions(missing_keys):
+        resolved[location_key] = location_ids
+        location_cache.put(location_key, location_ids)
+        table_hits += 1
+    location_resolutions = []
+    for location_key in missing_keys:
+        if location_key not in resolved:
+            location_index.ensure_loaded(get_locations)
+            location_ids = location_index.resolve(location_key)
+            resolved[location_key] = location_ids
+            location_cache.put(location_key, location_ids)
+            location_resolutions.append(
+                (location_key, location_ids, get_utc_now_string())
+            )
+    location_cache.record(table_hits, len(location_resolutions))
+    if location_resolutions:
+        with db_pool.connection() as conn:
+            cursor = conn.cursor()
+            execute_values(
+                cursor,
+                """
+                INSERT INTO logistics_jobs.location_resolutions(
+                    location_key
+                    , location_ids
+                    , resolved_at
+                    )
+                VALUES %s
+                ON CONFLICT (location_key) DO UPDATE
+                SET location_ids = EXCLUDED.location_ids
+                    , resolved_at = EXCLUDED.resolved_at
+                """,
+                location_resolutions,
+                template="(%s, %s::bigint[], %s)",
+            )
+            conn.commit()
+    return resolved
+
+
+def upsert_jobs_locations(job_locations: list[tuple]) -> None:
+    # NOTE: a job whose text does not resolve keeps one row with a null
+    # location_id so it is not resolved again on every run. It is picked up
+    # again once refresh_locations invalidates the null rows matching a new or
+    # moved city or division
+    resolved = resolve_location_keys(
+        {get_location_key(location) for job_id, location in job_locations if location}
     )
-    conn.commit()
-    conn.close()
+    jobs_locations = []
+    for job_id, location in job_locations:
+        location_ids = []
+        if location:
+            location_ids = resolved[get_location_key(location)]
+        for location_id in location_ids or [None]:
+            jobs_locations.append((job_id, location_id, location))
+    if not jobs_locations:
+        return
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            DELETE FROM logistics_jobs.jobs_locations
+            WHERE job_id = ANY(%s::uuid[])
+            """,
+            [[job_id for job_id, location in job_locations]],
+        )
+        execute_values(
+            cursor,
+            """
+            INSERT INTO logistics_jobs.jobs_locations(
+                job_id
+                , location_id
+                , location
+                )
+            VALUES %s
+            ON CONFLICT DO NOTHING
+            """,
+            jobs_locations,
+            page_size=UPSERT_PAGE_SIZE,
+        )
+        conn.commit()
+    refresh_jobs_timezone_buckets([job_id for job_id, location in job_locations])
     return
 
 
+def refresh_jobs_timezone_buckets(job_ids: list) -> None:
+    # NOTE: jobs_timezone_buckets only holds active jobs, rows are rebuilt here
+    # when a job is written or reactivated and deleted when it is deactivated
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            DELETE FROM logistics_jobs.jobs_timezone_buckets
+            WHERE job_id = ANY(%s::uuid[])
+            """,
+            [job_ids],
+        )
+        cursor.execute(
+            """
+            INSERT INTO logistics_jobs.jobs_timezone_buckets(timezone_bucket, job_id)
+            SELECT DISTINCT l.timezone_bucket
+            , jl.job_id
+            FROM logistics_jobs.jobs_locations AS jl
+                INNER JOIN logistics_jobs.locations AS l
+                    ON jl.location_id = l.id
+                INNER JOIN logistics_jobs.jobs AS j
+                    ON jl.job_id = j.id
+            WHERE jl.job_id = ANY(%s::uuid[])
+                AND j.active = true
+                AND l.timezone_bucket IS NOT NULL
+            """,
+            [job_ids],
+        )
+        conn.commit()
+    return
+
+
+def reactivate_unchanged_jobs(jobs: list[Job]) -> set:
+    # NOTE: a job that comes back with the same title, url and location keeps its
+    # stored description, so it is flipped back to active without a page fetch.
+    # Jobs stored without a description are refetched. Browser listings carry no
+    # location until the detail page is read, those match on the stored one
+    jobs_by_id = {job.id: job for job in jobs}
+    if not jobs_by_id:
+        return set()
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT id::text
+            , listing_fingerprint
+            , description_hash
+            , location
+            FROM logistics_jobs.jobs
+            WHERE id = ANY(%s::uuid[])
+                AND active = false
+                AND description_hash IS NOT NULL
+            """,
+            [list(jobs_by_id.keys())],
+        )
+        unchanged_ids = []
+        for (
+            job_id,
+            listing_fingerprint,
+            description_hash,
+            location,
+        ) in cursor.fetchall():
+            job = jobs_by_id[job_id]
+            if listing_fingerprint != job.get_listing_fingerprint(location):
+                continue
+            if job.description is not None and (
+                description_hash != job.get_description_hash()
+            ):
+                continue
+            unchanged_ids.append(job_id)
+        if unchanged_ids:
+            print(f"Reactivating unchanged IDs: {unchanged_ids}")
+            cursor.execute(
+                """
+                UPDATE logistics_jobs.jobs
+                SET active = true
+                    , scrape_inactive_run_id = NULL
+                WHERE id = ANY(%s::uuid[])
+                """,
+                [unchanged_ids],
+            )
+        conn.commit()
+    if unchanged_ids:
+        refresh_jobs_timezone_buckets(unchanged_ids)
+    for job_id in unchanged_ids:
+        active_job_index.add(jobs_by_id[job_id].company_id, [job_id])
+    run_telemetry.add("jobs_reactivated", len(unchanged_ids))
+    return set(unchanged_ids)
+
+
 def update_inactive_jobs(id_list: list, run_id: str) -> None:
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    print(f"Deactivating IDs: {id_list}")
-    for id in id_list:
-        # TODO: n+1 query
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        print(f"Deactivating IDs: {id_list}")
         cursor.execute(
             """
             UPDATE logistics_jobs.jobs
             SET active = false
                 , scrape_inactive_run_id = %s
-            WHERE id = %s
-        """,
-            [run_id, id],
+            WHERE id = ANY(%s::uuid[])
+                AND active = true
+            """,
+            [run_id, id_list],
+        )
+        cursor.execute(
+            """
+            DELETE FROM logistics_jobs.jobs_timezone_buckets
+            WHERE job_id = ANY(%s::uuid[])
+            """,
+            [id_list],
         )
         conn.commit()
-    conn.close()
+    active_job_index.remove(id_list)
     return
 
 
-def update_job(job: Job) -> None:
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    print(f"Updating ID: {job.id}")
-    job.insert_timestamp = get_utc_now_string()
-    cursor.execute(
-        """
-        UPDATE logistics_jobs.jobs
-        SET title = %s
-            , url = %s
-            , description = %s
-            , salary = %s
-            , location = %s
-            , active = %s
-            , new = %s
-            , remote = %s
-            , insert_timestamp = %s
-            , scrape_insert_run_id = %s
-            , scrape_inactive_run_id = NULL
-        WHERE id = %s
-    """,
-        [
-            job.title,
-            job.url,
-            job.description,
-            job.salary,
-            job.location,
-            job.active,
-            job.new,
-            job.remote,
-            job.insert_timestamp,
-            job.scrape_run_id,
-            job.id,
-        ],
-    )
-    conn.commit()
-    conn.close()
+def deactivate_unseen_jobs(seen_job_ids: dict[str, list], run_id: str) -> int:
+    # NOTE: only companies whose job list was fetched belong in seen_job_ids,
+    # otherwise a failed fetch would deactivate every job for the company. A
+    # board fetched with no jobs is recorded with an empty list
+    if not seen_job_ids:
+        return 0
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            UPDATE logistics_jobs.jobs AS j
+            SET active = false
+                , scrape_inactive_run_id = %s
+            WHERE j.company_id = ANY(%s::uuid[])
+                AND j.active = true
+                AND NOT EXISTS (
+                    SELECT 1
+                    FROM unnest(%s::uuid[]) AS seen(id)
+                    WHERE seen.id = j.id
+                )
+            """,
+            [
+                run_id,
+                list(seen_job_ids.keys()),
+                [job_id for job_ids in seen_job_ids.values() for job_id in job_ids],
+            ],
+        )
+        deactivated_count = cursor.rowcount
+        cursor.execute(
+            """
+            DELETE FROM logistics_jobs.jobs_timezone_buckets AS t
+            USING logistics_jobs.jobs AS j
+            WHERE t.job_id = j.id
+                AND j.company_id = ANY(%s::uuid[])
+                AND j.active = false
+            """,
+            [list(seen_job_ids.keys())],
+        )
+        conn.commit()
+    active_job_index.retain(seen_job_ids)
+    run_telemetry.add("jobs_deactivated", deactivated_count)
+    print(f"Deactivated {deactivated_count} jobs not seen in run {run_id}")
+    return deactivated_count
+
+
+def insert_scrape_run(scrape_run: tuple, scrape_run_companies: list[tuple]) -> None:
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO logistics_jobs.scrape_runs(
+                id
+                , run_name
+                , started_at
+                , ended_at
+                , duration
+                , companies
+                , companies_failed
+                , requests
+                , bytes_downloaded
+                , fetch_time
+                , parse_time
+                , db_time
+                , jobs_added
+                , jobs_deactivated
+                , jobs_reactivated
+                , errors)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            scrape_run,
+        )
+        execute_values(
+            cursor,
+            """
+            INSERT INTO logistics_jobs.scrape_run_companies(
+                run_id
+                , company_id
+                , ats
+                , failed
+                , requests
+                , bytes_downloaded
+                , fetch_time
+                , parse_time
+                , db_time
+                , jobs_added
+                , jobs_deactivated
+                , jobs_reactivated
+                , errors)
+            VALUES %s
+            """,
+            scrape_run_companies,
+            page_size=UPSERT_PAGE_SIZE,
+        )
+        conn.commit()
     return
@@ -0,0 +1,164 @@
+import os
+import re
+from dataclasses import dataclass
+
+
+# NOTE: salaries are annualized from the posted period so buckets and range
+# filters compare like for like, amounts stay in the posted currency
+SALARY_BUCKET_SIZE = int(os.environ.get("scrape_salary_bucket_size", 10000))
+MIN_ANNUAL_SALARY = 5000
+MAX_ANNUAL_SALARY = 2000000
+
+CURRENCY_SYMBOLS = [
+    ("ca$", "CAD"),
+    ("c$", "CAD"),
+    ("a$", "AUD"),
+    ("mx$", "MXN"),
+    ("$", "USD"),
+    ("€", "EUR"),
+    ("£", "GBP"),
+]
+CURRENCY_CODES = ("usd", "cad", "aud", "mxn", "eur", "gbp")
+PERIOD_PATTERNS = [
+    ("hour", re.compile(r"hour|\bhr\b|/\s*h\b|\bwage\b")),
+    ("day", re.compile(r"\bday\b|daily")),
+    ("week", re.compile(r"week|\bwk\b")),
+    ("month", re.compile(r"month|\bmo\b")),
+    ("year", re.compile(r"year|\byr\b|annual|salary")),
+]
+PERIODS_PER_YEAR = {
+    "hour": 2080,
+    "day": 260,
+    "week": 52,
+    "month": 12,
+    "year": 1,
+}
+# NOTE: "." followed by exactly three digits is a thousands separator as in
+# "€50.000", amounts after a "+" are add ons like "$20/hr + $2 shift
+# differential" and are not part of the range
+AMOUNT_PATTERN = re.compile(
+    r"(\+\s*[^\d\s]{0,3}\s*)?"
+    r"(\d{1,3}(?:,\d{3})+(?!\d)|\d{1,3}(?:\.\d{3})+(?!\d)|\d+(?:\.\d+)?)"
+    r"\s*(k|m)?\b"
+)
+THOUSANDS_PATTERN = re.compile(r"\d{1,3}(?:[,.]\d{3})+")
+# NOTE: numbers next to a currency, written with thousands separators or joined
+# to one of those by a range dash are amounts. When a salary has any, the other
+# numbers are dropped so "401k match, $50k" is not read as a 50k to 401k range
+CURRENCY_BEFORE_PATTERN = re.compile(r"(?:\$|€|£|\b(?:usd|cad|aud|mxn|eur|gbp))\s*$")
+CURRENCY_AFTER_PATTERN = re.compile(r"^\s*(?:usd|cad|aud|mxn|eur|gbp)\b")
+RANGE_PATTERN = re.compile(r"^\s*(?:-|–|—|to)\s*$")
+
+
+@dataclass(slots=True)
+class Salary:
+    salary_min: float
+    salary_max: float
+    currency: str | None
+    period: str
+    annual_min: float
+    annual_max: float
+    bucket: int
+
+    def to_row(self) -> tuple:
+        return (
+            self.salary_min,
+            self.salary_max,
+            self.currency,
+            self.period,
+            self.annual_min,
+            self.annual_max,
+            self.bucket,
+        )
+
+
+EMPTY_SALARY_ROW = (None, None, None, None, None, None, None)
+
+
+def parse_currency(text: str) -> str | None:
+    for symbol, currency in CURRENCY_SYMBOLS:
+        if symbol in text:
+            return currency
+    for code in CURRENCY_CODES:
+        if re.search(rf"\b{code}\b", text):
+            return code.upper()
+    return None
+
+
+def parse_amounts(text: str) -> list[float]:
+    matches = []
+    anchored = []
+    previous_end = None
+    for match in AMOUNT_PATTERN.finditer(text):
+        add_on, number, suffix = match.groups()
+        if add_on:
+            previous_end = None
+            continue
+        is_anchored = (
+            CURRENCY_BEFORE_PATTERN.search(text[: match.start()]) is not None
+            or CURRENCY_AFTER_PATTERN.search(text[match.end() :]) is not None
+            or THOUSANDS_PATTERN.fullmatch(number) is not None
+            or (
+                previous_end is not None
+                and RANGE_PATTERN.match(text[previous_end : match.start()]) is not None
+            )
+        )
+        matches.append((number, suffix or ""))
+        anchored.append(is_anchored)
+        previous_end = match.end() if is_anchored else None
+    if any(anchored):
+        matches = [
+            match for match, is_anchored in zip(matches, anchored) if is_anchored
+        ]
+    amounts = []
+    suffixes = []
+    for number, suffix in matches:
+        if THOUSANDS_PATTERN.fullmatch(number):
+            number = re.sub(r"[,.]", "", number)
+        amounts.append(float(number))
+        suffixes.append(suffix)
+    if len(amounts) >= 2 and suffixes[1] and not suffixes[0] and amounts[0] < 1000:
+        suffixes[0] = suffixes[1]
+    multipliers = {"k": 1000, "m": 1000000, "": 1}
+    return [amount * multipliers[suffix] for amount, suffix in zip(amounts, suffixes)]
+
+
+def parse_period(text: str, amount: float) -> str:
+    for period, pattern in PERIOD_PATTERNS:
+        if pattern.search(text):
+            return period
+    if amount < 200:
+        return "hour"
+    return "year"
+
+
+def parse_salary(salary: str | None) -> Salary | None:
+    if not salary:
+        return None
+    text = salary.lower()
+    amounts = [amount for amount in parse_amounts(text) if amount > 0][:2]
+    if not amounts:
+        return None
+    salary_min, salary_max = min(amounts), max(amounts)
+    period = parse_period(text, salary_min)
+    annual_min = salary_min * PERIODS_PER_YEAR[period]
+    annual_max = salary_max * PERIODS_PER_YEAR[period]
+    if annual_min < MIN_ANNUAL_SALARY or annual_max > MAX_ANNUAL_SALARY:
+        return None
+    bucket = int((annual_min + annual_max) / 2 // SALARY_BUCKET_SIZE)
+    return Salary(
+        salary_min,
+        salary_max,
+        parse_currency(text),
+        period,
+        annual_min,
+        annual_max,
+        bucket * SALARY_BUCKET_SIZE,
+    )
+
+
+def get_salary_row(salary: str | None) -> tuple:
+    parsed_salary = parse_salary(salary)
+    if parsed_salary is None:
+        return EMPTY_SALARY_ROW
+    return parsed_salary.to_row()
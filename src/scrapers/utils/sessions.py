@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.telemetry import run_telemetry
+
+try:
+    import brotli  # noqa: F401
+
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+
+CONNECT_TIMEOUT = float(os.environ.get("scrape_connect_timeout", 5))
+READ_TIMEOUT = float(os.environ.get("scrape_read_timeout", 30))
+POOL_MAXSIZE = int(os.environ.get("scrape_pool_maxsize", 8))
+RETRY_TOTAL = int(os.environ.get("scrape_retry_total", 3))
+RETRY_BACKOFF_FACTOR = float(os.environ.get("scrape_retry_backoff_factor", 0.5))
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+USER_AGENT = "Bonhomme-Richard/1.0"
+
+
+class HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.bytes_downloaded = 0
+
+    def record(self, latency: float, response: requests.Response | None) -> None:
+        self.requests += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        if response is None:
+            self.errors += 1
+        else:
+            self.bytes_downloaded += len(response.content)
+        return
+
+
+class SessionManager:
+    def __init__(
+        self,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        pool_maxsize: int = POOL_MAXSIZE,
+        retry_total: int = RETRY_TOTAL,
+        retry_backoff_factor: float = RETRY_BACKOFF_FACTOR,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_maxsize = pool_maxsize
+        self.retry = Retry(
+            total=retry_total,
+            backoff_factor=retry_backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=["GET", "HEAD"],
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.stats = {}
+
+    def create_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=self.retry,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(
+            {"Accept-Encoding": ACCEPT_ENCODING, "User-Agent": USER_AGENT}
+        )
+        return session
+
+    def get_session(self, host: str) -> requests.Session:
+        with self.lock:
+            if host not in self.sessions:
+                self.sessions[host] = self.create_session()
+                self.stats[host] = HostStats()
+            return self.sessions[host]
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        host = urlparse(url).netloc
+        session = self.get_session(host)
+        kwargs.setdefault("timeout", self.timeout)
+        response = None
+        start = time.perf_counter()
+        try:
+            response = session.get(url, **kwargs)
+            return response
+        finally:
+            latency = time.perf_counter() - start
+            with self.lock:
+                self.stats[host].record(latency, response)
+            run_telemetry.add("requests", 1)
+            run_telemetry.add("fetch_time", latency)
+            if response is not None:
+                run_telemetry.add("bytes_downloaded", len(response.content))
+
+    def get_connections_opened(self, host: str) -> int:
+        pools = self.sessions[host].get_adapter(f"https://{host}").poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def get_host_stats(self) -> list[dict]:
+        host_stats = []
+        with self.lock:
+            for host, stats in self.stats.items():
+                connections_opened = self.get_connections_opened(host)
+                host_stats.append(
+                    {
+                        "host": host,
+                        "requests": stats.requests,
+                        "errors": stats.errors,
+                        "avg_latency": stats.total_latency / max(stats.requests, 1),
+                        "max_latency": stats.max_latency,
+                        "bytes_downloaded": stats.bytes_downloaded,
+                        "connections_opened": connections_opened,
+                        "connections_reused": max(
+                            stats.requests - connections_opened, 0
+                        ),
+                    }
+                )
+        return host_stats
+
+    def close(self) -> None:
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+        return
+
+
+session_manager = SessionManager()
+
+
+def log_session_stats(run_id: str) -> None:
+    for stats in session_manager.get_host_stats():
+        print(
+            f"{run_id} | {stats['host']} | {stats['requests']} requests"
+            f" | {stats['errors']} errors"
+            f" | avg {stats['avg_latency']:.3f}s | max {stats['max_latency']:.3f}s"
+            f" | {stats['connections_opened']} opened"
+            f" | {stats['connections_reused']} reused"
+            f" | {stats['bytes_downloaded']} bytes"
+        )
+    return
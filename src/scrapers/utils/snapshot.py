@@ -0,0 +1,65 @@
+import threading
+
+
+class ActiveJobIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.company_job_ids = {}
+        self.job_company_ids = {}
+
+    def load(self, active_job_ids: list[tuple]) -> None:
+        company_job_ids = {}
+        job_company_ids = {}
+        for company_id, job_id in active_job_ids:
+            company_id, job_id = str(company_id), str(job_id)
+            company_job_ids.setdefault(company_id, set()).add(job_id)
+            job_company_ids[job_id] = company_id
+        with self.lock:
+            self.company_job_ids = company_job_ids
+            self.job_company_ids = job_company_ids
+            self.loaded = True
+        print(f"Loaded {len(job_company_ids)} active jobs into snapshot")
+        return
+
+    def get_job_ids(self, company_id: str) -> set:
+        with self.lock:
+            return set(self.company_job_ids.get(str(company_id), ()))
+
+    def add(self, company_id: str, job_ids: list) -> None:
+        if not self.loaded:
+            return
+        company_id = str(company_id)
+        with self.lock:
+            for job_id in job_ids:
+                job_id = str(job_id)
+                previous_company_id = self.job_company_ids.get(job_id)
+                if previous_company_id and previous_company_id != company_id:
+                    self.company_job_ids[previous_company_id].discard(job_id)
+                self.company_job_ids.setdefault(company_id, set()).add(job_id)
+                self.job_company_ids[job_id] = company_id
+        return
+
+    def remove(self, job_ids: list) -> None:
+        if not self.loaded:
+            return
+        with self.lock:
+            for job_id in job_ids:
+                company_id = self.job_company_ids.pop(str(job_id), None)
+                if company_id:
+                    self.company_job_ids[company_id].discard(str(job_id))
+        return
+
+    def retain(self, seen_job_ids: dict[str, list]) -> None:
+        if not self.loaded:
+            return
+        unseen_job_ids = []
+        with self.lock:
+            for company_id, job_ids in seen_job_ids.items():
+                active_job_ids = self.company_job_ids.get(str(company_id), set())
+                unseen_job_ids.extend(active_job_ids.difference(map(str, job_ids)))
+        self.remove(unseen_job_ids)
+        return
+
+
+active_job_index = ActiveJobIndex()
@@ -0,0 +1,220 @@
+import contextvars
+import datetime
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2 as pg
+
+
+# NOTE: counters are attributed to the company whose work is running, tracked
+# in a context variable so asyncio.to_thread carries it into worker threads.
+# Work shared by several companies, like a pipeline write batch, is split
+# evenly between them, work outside any company is kept at the run level
+METRICS_PATH = os.environ.get("scrape_metrics_path", ".cache/metrics/scrape.prom")
+COUNTERS = (
+    "requests",
+    "bytes_downloaded",
+    "fetch_time",
+    "parse_time",
+    "db_time",
+    "jobs_added",
+    "jobs_deactivated",
+    "jobs_reactivated",
+    "errors",
+)
+
+current_company_ids = contextvars.ContextVar("current_company_ids", default=())
+
+
+class RunTelemetry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.run_id = None
+        self.run_name = None
+        self.started_at = None
+        self.ended_at = None
+        self.companies = {}
+        self.run_counters = dict.fromkeys(COUNTERS, 0)
+
+    def begin(self, run_id: str, run_name: str) -> None:
+        with self.lock:
+            self.run_id = run_id
+            self.run_name = run_name
+            self.started_at = datetime.datetime.utcnow()
+            self.ended_at = None
+            self.companies = {}
+            self.run_counters = dict.fromkeys(COUNTERS, 0)
+        return
+
+    def end(self) -> None:
+        self.ended_at = datetime.datetime.utcnow()
+        return
+
+    def start_company(self, company_id: str, ats: str | None) -> None:
+        with self.lock:
+            self.companies.setdefault(
+                company_id, {"ats": ats, "failed": False, **dict.fromkeys(COUNTERS, 0)}
+            )
+        current_company_ids.set((company_id,))
+        return
+
+    def set_companies(self, company_ids: tuple) -> None:
+        current_company_ids.set(company_ids)
+        return
+
+    def fail_company(self, company_id: str) -> None:
+        with self.lock:
+            if company_id in self.companies:
+                self.companies[company_id]["failed"] = True
+        return
+
+    def add(self, counter: str, value: float, company_ids: tuple | None = None) -> None:
+        company_ids = company_ids or current_company_ids.get()
+        with self.lock:
+            targets = [
+                self.companies[company_id]
+                for company_id in company_ids
+                if company_id in self.companies
+            ] or [self.run_counters]
+            for target in targets:
+                target[counter] += value / len(targets)
+        return
+
+    @contextmanager
+    def timer(self, counter: str, company_ids: tuple | None = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(counter, time.perf_counter() - start, company_ids)
+
+    def get_totals(self, companies: list[dict]) -> dict:
+        totals = {"companies": len(companies), "failed": 0}
+        totals.update(dict.fromkeys(COUNTERS, 0))
+        for company in companies:
+            totals["failed"] += company["failed"]
+            for counter in COUNTERS:
+                totals[counter] += company[counter]
+        return totals
+
+    def get_ats_totals(self) -> dict[str, dict]:
+        with self.lock:
+            companies_by_ats = {}
+            for company in self.companies.values():
+                companies_by_ats.setdefault(company["ats"], []).append(company)
+            return {
+                ats: self.get_totals(companies)
+                for ats, companies in companies_by_ats.items()
+            }
+
+    def get_run_totals(self) -> dict:
+        with self.lock:
+            totals = self.get_totals(list(self.companies.values()))
+            for counter in COUNTERS:
+                totals[counter] += self.run_counters[counter]
+        return totals
+
+    def get_run_row(self) -> tuple:
+        totals = self.get_run_totals()
+        return (
+            self.run_id,
+            self.run_name,
+            self.started_at,
+            self.ended_at,
+            (self.ended_at - self.started_at).total_seconds(),
+            totals["companies"],
+            totals["failed"],
+            *get_counter_values(totals),
+        )
+
+    def get_company_rows(self) -> list[tuple]:
+        with self.lock:
+            return [
+                (
+                    self.run_id,
+                    company_id,
+                    company["ats"],
+                    company["failed"],
+                    *get_counter_values(company),
+                )
+                for company_id, company in self.companies.items()
+            ]
+
+
+def get_counter_values(counters: dict) -> list:
+    # NOTE: shared work is split evenly, so counts can carry fractions
+    return [
+        counters[counter] if counter.endswith("_time") else round(counters[counter])
+        for counter in COUNTERS
+    ]
+
+
+def get_prometheus_text(telemetry: RunTelemetry) -> str:
+    run_totals = telemetry.get_run_totals()
+    lines = []
+    run_labels = f'run="{telemetry.run_name}"'
+    for name, value, help_text in (
+        (
+            "scrape_last_run_timestamp_seconds",
+            telemetry.ended_at.replace(tzinfo=datetime.timezone.utc).timestamp(),
+            "Time the last scrape run ended",
+        ),
+        (
+            "scrape_last_run_duration_seconds",
+            (telemetry.ended_at - telemetry.started_at).total_seconds(),
+            "Wall time of the last scrape run",
+        ),
+        (
+            "scrape_last_run_db_seconds",
+            run_totals["db_time"],
+            "Time spent holding database connections in the last scrape run",
+        ),
+    ):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name}{{{run_labels}}} {value}")
+    ats_totals = telemetry.get_ats_totals()
+    for counter in ("companies", "failed", *COUNTERS):
+        name = f"scrape_last_run_ats_{counter.replace('_time', '_seconds')}"
+        lines.append(f"# HELP {name} {counter} per ATS in the last scrape run")
+        lines.append(f"# TYPE {name} gauge")
+        for ats, totals in ats_totals.items():
+            lines.append(f'{name}{{{run_labels},ats="{ats}"}} {totals[counter]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_file(telemetry: RunTelemetry, metrics_path: str) -> None:
+    # NOTE: written for the node_exporter textfile collector, which must never
+    # see a partially written file
+    os.makedirs(os.path.dirname(metrics_path) or ".", exist_ok=True)
+    temp_path = f"{metrics_path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as metrics_file:
+        metrics_file.write(get_prometheus_text(telemetry))
+    os.replace(temp_path, metrics_path)
+    return
+
+
+run_telemetry = RunTelemetry()
+
+
+def log_run_telemetry(run_id: str) -> None:
+    from utils.queries import insert_scrape_run
+
+    run_telemetry.end()
+    totals = run_telemetry.get_run_totals()
+    print(
+        f"{run_id} | telemetry | {totals['companies']} companies"
+        f" | {totals['failed']} failed | {totals['requests']:.0f} requests"
+        f" | {totals['bytes_downloaded']:.0f} bytes"
+        f" | fetch {totals['fetch_time']:.1f}s | parse {totals['parse_time']:.1f}s"
+        f" | db {totals['db_time']:.1f}s | {totals['errors']:.0f} errors"
+    )
+    try:
+        insert_scrape_run(run_telemetry.get_run_row(), run_telemetry.get_company_rows())
+    except pg.Error as error:
+        print(f"{run_id} | Unable to store run telemetry, {error!r}")
+    if METRICS_PATH:
+        write_prometheus_file(run_telemetry, METRICS_PATH)
+    return
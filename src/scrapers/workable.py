@@ -1,6 +1,7 @@
-import time
+import json
 import uuid
 
+import requests
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -10,18 +11,29 @@ from utils.helpers import (
     log_error,
     log_run_begin,
     log_run_end,
-    create_driver,
-    examine_current_job_list,
+    DEACTIVATION_MODE,
+    FETCH_MODE,
+    get_board_token,
     normalize_career_site_url,
 )
 
 from utils.queries import (
     get_company_by_ats,
-    insert_job,
-    update_inactive_jobs,
+    get_active_job_ids,
+    upsert_jobs,
+    deactivate_unseen_jobs,
 )
 
 from utils.models import Job
+from utils.parsers import HtmlParser, html_parser
+from utils.db import log_pool_stats
+from utils.cache import board_cache, log_cache_stats
+from utils.locations import log_location_cache_stats
+from utils.drivers import driver_pool
+from utils.engine import ScrapeEngine
+from utils.snapshot import active_job_index
+from utils.sessions import log_session_stats
+from utils.telemetry import log_run_telemetry, run_telemetry
 
 
 # TODO: add tests, prints -> logging
@@ -29,6 +41,7 @@ from utils.models import Job
 
 ATS_TO_SCRAPE = "Workable"
 ATS_BASE_URL = "https://apply.workable.com"
+ATS_API_URL = "https://apply.workable.com/api/v1/widget/accounts/{account}?details=true"
 
 
 def parse_url_for_job_id(url: str) -> str:
@@ -42,117 +55,173 @@ def parse_url_for_job_id(url: str) -> str:
 
 
 def get_job_details(job: Job) -> Job | None:
-    driver = create_driver()
-    try:
-        main_selector = "main[role='main']"
-        driver.get(job.url)
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, main_selector))
-        )
-        job.description = driver.find_element(By.CSS_SELECTOR, main_selector).text
-        job.location = driver.find_element(
-            By.CSS_SELECTOR, "span[data-ui='job-location']"
-        ).text
+    with driver_pool.acquire() as driver:
         try:
-            remote_pill = driver.find_element(
-                By.CSS_SELECTOR, "span[data-ui='job-remote']"
+            main_selector = "main[role='main']"
+            driver.get(job.url)
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, main_selector))
+            )
+            job.description = driver.find_element(By.CSS_SELECTOR, main_selector).text
+            job.location = driver.find_element(
+                By.CSS_SELECTOR, "span[data-ui='job-location']"
             ).text
-            if remote_pill.lower() == "remote":
-                job.remote = True
-        except NoSuchElementException:
-            job.remote = False
-    except TimeoutException:
-        log_error(scrape_run_id, f"Timed out on {job.url}")
-    except NoSuchElementException as error:
-        log_error(scrape_run_id, error)
-    driver.close()
+            try:
+                remote_pill = driver.find_element(
+                    By.CSS_SELECTOR, "span[data-ui='job-remote']"
+                ).text
+                if remote_pill.lower() == "remote":
+                    job.remote = True
+            except NoSuchElementException:
+                job.remote = False
+        except TimeoutException:
+            log_error(scrape_run_id, f"Timed out on {job.url}")
+        except NoSuchElementException as error:
+            log_error(scrape_run_id, error)
     return job
 
 
-def get_current_job_list(career_site_url: str) -> list[Job]:
+def parse_api_response_for_job_list(
+    content: bytes, account: str, parser: HtmlParser = html_parser
+) -> list[Job]:
     job_list = []
-    driver = create_driver()
-    try:
-        posting_selector = "li[role='listitem']"
-        driver.get(career_site_url)
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "app")))
-        driver.implicitly_wait(10)  # added for shippo
-        postings = driver.find_elements(By.CSS_SELECTOR, posting_selector)
-        if len(postings) == 10:
-            show_more = True
-            button_selector = "button[data-ui='load-more-button']"
-            while show_more is True:
-                try:
-                    current_postings_len = len(postings)
-                    WebDriverWait(driver, 5).until(
-                        EC.presence_of_element_located(
-                            (By.CSS_SELECTOR, button_selector)
+    for posting in json.loads(content)["jobs"]:
+        try:
+            job = Job()
+            job.title = posting["title"]
+            job.url = f"{ATS_BASE_URL}/{account}/j/{posting['shortcode']}/"
+            job.id, ats_job_id = parse_url_for_job_id(job.url)
+            location = [
+                posting.get(field)
+                for field in ("city", "state", "country")
+                if posting.get(field)
+            ]
+            job.location = ", ".join(location) or None
+            job.remote = bool(posting.get("telecommuting"))
+            if posting.get("description"):
+                document = parser.parse(posting["description"].encode("utf-8"))
+                job.description = parser.get_text(document)
+            job_list.append(job)
+        except ValueError as error:
+            log_error(scrape_run_id, error)
+    return job_list
+
+
+def get_current_job_list_from_api(career_site_url: str) -> list[Job] | None:
+    account = get_board_token(career_site_url)
+    response_content, changed = board_cache.fetch(
+        ATS_API_URL.format(account=account), key=career_site_url
+    )
+    if not changed:
+        return None
+    if response_content is None:
+        raise ValueError(f"No widget API found for {career_site_url}")
+    with run_telemetry.timer("parse_time"):
+        return parse_api_response_for_job_list(response_content, account)
+
+
+def get_current_job_list_from_browser(career_site_url: str) -> list[Job]:
+    job_list = []
+    with driver_pool.acquire() as driver:
+        try:
+            posting_selector = "li[role='listitem']"
+            driver.get(career_site_url)
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_element_located((By.ID, "app"))
+            )
+            driver.implicitly_wait(10)  # added for shippo
+            postings = driver.find_elements(By.CSS_SELECTOR, posting_selector)
+            if len(postings) == 10:
+                show_more = True
+                button_selector = "button[data-ui='load-more-button']"
+                while show_more is True:
+                    try:
+                        current_postings_len = len(postings)
+                        WebDriverWait(driver, 5).until(
+                            EC.presence_of_element_located(
+                                (By.CSS_SELECTOR, button_selector)
+                            )
                         )
-                    )
-                    driver.find_element(By.CSS_SELECTOR, button_selector).click()
-                    WebDriverWait(driver, 5).until(
-                        lambda driver: len(
-                            driver.find_elements(By.CSS_SELECTOR, posting_selector)
+                        driver.find_element(By.CSS_SELECTOR, button_selector).click()
+                        WebDriverWait(driver, 5).until(
+                            lambda driver: len(
+                                driver.find_elements(By.CSS_SELECTOR, posting_selector)
+                            )
+                            > current_postings_len
                         )
-                        > current_postings_len
-                    )
-                    postings = driver.find_elements(By.CSS_SELECTOR, posting_selector)
-                    try:
-                        driver.find_element(By.CSS_SELECTOR, button_selector)
-                    except NoSuchElementException:
+                        postings = driver.find_elements(
+                            By.CSS_SELECTOR, posting_selector
+                        )
+                        try:
+                            driver.find_element(By.CSS_SELECTOR, button_selector)
+                        except NoSuchElementException:
+                            show_more = False
+                    except TimeoutException:
                         show_more = False
-                except TimeoutException:
-                    show_more = False
-        for posting in postings:
-            try:
-                job = Job()
-                job.url = posting.find_element(By.TAG_NAME, "a").get_attribute("href")
-                job.id, ats_job_id = parse_url_for_job_id(job.url)
-                job.title = posting.find_element(By.ID, f"{ats_job_id}_title").text
-                job_list.append(job)
-            except ValueError as error:
-                log_error(scrape_run_id, error)
-    except TimeoutException:
-        log_error(scrape_run_id, f"Timed out on {career_site_url}")
-    except NoSuchElementException as error:
-        log_error(scrape_run_id, error)
-    driver.close()
+            for posting in postings:
+                try:
+                    job = Job()
+                    job.url = posting.find_element(By.TAG_NAME, "a").get_attribute(
+                        "href"
+                    )
+                    job.id, ats_job_id = parse_url_for_job_id(job.url)
+                    job.title = posting.find_element(By.ID, f"{ats_job_id}_title").text
+                    job_list.append(job)
+                except ValueError as error:
+                    log_error(scrape_run_id, error)
+        except TimeoutException as error:
+            raise ValueError(f"Timed out on {career_site_url}") from error
+        except NoSuchElementException as error:
+            raise ValueError(f"Unable to load {career_site_url}") from error
     return job_list
 
 
+def get_current_job_list(career_site_url: str) -> list[Job] | None:
+    if FETCH_MODE == "api":
+        try:
+            return get_current_job_list_from_api(career_site_url)
+        except (ValueError, KeyError, TypeError, requests.RequestException) as error:
+            log_error(scrape_run_id, f"Falling back to Selenium, {error!r}")
+    return get_current_job_list_from_browser(career_site_url)
+
+
+async def write_jobs(engine: ScrapeEngine, jobs: list[Job]) -> None:
+    jobs_to_detail = [job for job in jobs if job.description is None]
+    if jobs_to_detail:
+        await engine.run_blocking(driver_pool.map, get_job_details, jobs_to_detail)
+    await engine.run_blocking(upsert_jobs, jobs)
+    return
+
+
+async def scrape_company(engine: ScrapeEngine, result: tuple) -> tuple[int, int]:
+    career_site_url = normalize_career_site_url(result[2])
+    print(f"{scrape_run_id} | {result[1]} | {career_site_url}")
+    return await engine.scrape_board(
+        result[0], career_site_url, get_current_job_list, write_jobs
+    )
+
+
 def scrape_jobs() -> None:
     company_queryset = get_company_by_ats(ATS_TO_SCRAPE)
-    for result in company_queryset:
-        time.sleep(1)
-        career_site_url = normalize_career_site_url(result[2])
-        print(f"{scrape_run_id} | {result[1]} | {career_site_url}")
-        current_job_list = get_current_job_list(career_site_url)
-        if current_job_list:
-            ids_to_add, ids_to_deactivate = examine_current_job_list(
-                current_job_list, result[0]
-            )
-            if ids_to_add:
-                print(f"{len(ids_to_add)} jobs found to add")
-                for job in current_job_list:
-                    if job.id in list(ids_to_add):
-                        time.sleep(5)
-                        job = get_job_details(job)
-                        job.company_id = result[0]
-                        job.active = True
-                        job.new = True
-                        job.scrape_run_id = scrape_run_id
-                        insert_job(job)
-            else:
-                print(f"No new jobs found for {career_site_url}")
-            if ids_to_deactivate:
-                print(f"{len(ids_to_deactivate)} jobs found to deactivate")
-                update_inactive_jobs(list(ids_to_deactivate), scrape_run_id)
-        else:
-            print(f"No jobs found for {career_site_url}")
+    active_job_index.load(get_active_job_ids())
+    engine = ScrapeEngine(
+        scrape_run_id, ats=ATS_TO_SCRAPE, max_concurrency=driver_pool.size
+    )
+    engine.run(company_queryset, scrape_company)
+    if DEACTIVATION_MODE == "run":
+        deactivate_unseen_jobs(engine.seen_job_ids, scrape_run_id)
+    log_session_stats(scrape_run_id)
+    log_cache_stats(scrape_run_id)
+    log_location_cache_stats(scrape_run_id)
+    log_pool_stats(scrape_run_id)
     return
 
 
 if __name__ == "__main__":
     scrape_run_id, run_time = log_run_begin(ATS_TO_SCRAPE)
-    scrape_jobs()
+    try:
+        scrape_jobs()
+    finally:
+        driver_pool.close()
+    log_run_telemetry(scrape_run_id)
     log_run_end(scrape_run_id, ATS_TO_SCRAPE)
@@ -1,4 +1,9 @@
-# NOTE: used to build location tables from geonames csvs
+# NOTE: used to build location tables from geonames csvs, set
+# build_locations_mode=upsert to re-run against already loaded tables
+
+import io
+import os
+from typing import Iterator
 
 import pandas as pd
 from psycopg2.errors import UniqueViolation
@@ -8,19 +13,93 @@ from utils.queries import (
     get_country_divisions,
     insert_countries,
     insert_country_divisions,
-    insert_cities,
+    copy_cities,
     insert_locations_countries,
     insert_locations_country_divisions,
     insert_locations_cities,
+    clear_location_resolutions,
+    update_locations_timezone_buckets,
+    refresh_jobs_timezone_buckets,
 )
 
 
 COUNTRIES_PATH = "src/transformations/utils/data/countryInfo.csv"
 DIVISION_PATH = "src/transformations/utils/data/admin1CodesASCII.csv"
 CITIES_PATH = "src/transformations/utils/data/cities1000.csv"
+CITIES_CHUNK_SIZE = int(os.environ.get("build_locations_chunk_size", 50000))
+UPSERT = os.environ.get("build_locations_mode", "insert") == "upsert"
+CITIES_COLUMNS = {
+    "GEONAMEID": "int64",
+    "ASCIINAME": "string",
+    "COUNTRY_CODE": "string",
+    "ADMIN1": "string",
+    "LAT": "float64",
+    "LNG": "float64",
+    "POPULATION": "int64",
+    "TZ": "string",
+}
+US_MIN_POPULATION = 15000
+GLOBAL_MIN_POPULATION = 500000
+TIMEZONE_BUCKETS = {
+    "PT": [
+        "America/Los_Angeles",
+        "America/Vancouver",
+        "America/Tijuana",
+    ],
+    "MT": [
+        "America/Denver",
+        "America/Phoenix",
+        "America/Boise",
+        "America/Edmonton",
+        "America/Ciudad_Juarez",
+        "America/Hermosillo",
+        "America/Mazatlan",
+        "America/Yellowknife",
+        "America/Cambridge_Bay",
+        "America/Inuvik",
+    ],
+    "CT": [
+        "America/Chicago",
+        "America/Indiana/Knox",
+        "America/Indiana/Tell_City",
+        "America/Menominee",
+        "America/North_Dakota/Beulah",
+        "America/North_Dakota/Center",
+        "America/North_Dakota/New_Salem",
+        "America/Winnipeg",
+        "America/Regina",
+        "America/Rainy_River",
+        "America/Rankin_Inlet",
+        "America/Resolute",
+        "America/Mexico_City",
+        "America/Monterrey",
+        "America/Matamoros",
+        "America/Merida",
+        "America/Bahia_Banderas",
+        "America/Chihuahua",
+        "America/Ojinaga",
+    ],
+    "ET": [
+        "America/New_York",
+        "America/Detroit",
+        "America/Indiana/Indianapolis",
+        "America/Indiana/Marengo",
+        "America/Indiana/Petersburg",
+        "America/Indiana/Vevay",
+        "America/Indiana/Vincennes",
+        "America/Indiana/Winamac",
+        "America/Kentucky/Louisville",
+        "America/Kentucky/Monticello",
+        "America/Toronto",
+        "America/Nipigon",
+        "America/Thunder_Bay",
+        "America/Iqaluit",
+        "America/Cancun",
+    ],
+}
 
 
-def add_countries(countries_path: str) -> None:
+def add_countries(countries_path: str, upsert: bool = False) -> None:
     print(f"Adding countries from: {countries_path}")
     co_df = pd.read_csv(
         countries_path,
@@ -31,13 +110,13 @@ def add_countries(countries_path: str) -> None:
     co_df = co_df.rename(columns={"ISO2": "code", "COUNTRY": "name"})
     countries = [tuple(co) for co in co_df.to_numpy()]
     try:
-        insert_countries(countries)
+        insert_countries(countries, upsert)
     except UniqueViolation as error:
         print(error)
     return
 
 
-def add_country_divisions(division_path: str) -> None:
+def add_country_divisions(division_path: str, upsert: bool = False) -> None:
     print(f"Adding country divisions from: {division_path}")
     co_df = pd.DataFrame(get_countries())
     cd_df = pd.read_csv(
@@ -52,73 +131,69 @@ def add_country_divisions(division_path: str) -> None:
     cd_df = cd_df[["country_id", "name", "code"]].copy()
     country_divisions = [tuple(cd) for cd in cd_df.to_numpy()]
     try:
-        insert_country_divisions(country_divisions)
+        insert_country_divisions(country_divisions, upsert)
     except UniqueViolation as error:
         print(error)
     return
 
 
-def add_cities(cities_path: str) -> None:
-    print(f"Adding cities from: {cities_path}")
-    co_df = pd.DataFrame(get_countries())
-    cd_df = pd.DataFrame(get_country_divisions())
-    cocd_df = cd_df.merge(co_df, how="inner", on="country_id")
-    cocd_df["cocd_id"] = (
-        cocd_df["country_code"] + "." + cocd_df["country_division_code"]
-    )
-    c_df = pd.read_csv(
+def get_country_division_ids() -> dict:
+    country_codes = {co["country_id"]: co["country_code"] for co in get_countries()}
+    return {
+        f"{country_codes[cd['country_id']]}.{cd['country_division_code']}": (
+            cd["country_id"],
+            cd["country_division_id"],
+        )
+        for cd in get_country_divisions()
+        if cd["country_id"] in country_codes
+    }
+
+
+def read_cities(cities_path: str, country_division_ids: dict) -> Iterator[io.StringIO]:
+    # NOTE: streams cities1000 in chunks, only the small country and division
+    # maps are held in memory. Each chunk is filtered, joined to its ids and
+    # serialized to csv for COPY
+    for c_df in pd.read_csv(
         cities_path,
-        usecols=[
-            "ASCIINAME",
-            "COUNTRY_CODE",
-            "ADMIN1",
-            "LAT",
-            "LNG",
-            "POPULATION",
-            "TZ",
-        ],
-        dtype={
-            "ASCIINAME": "string",
-            "COUNTRY_CODE": "string",
-            "ADMIN1": "string",
-            "LAT": "string",
-            "LNG": "string",
-            "POPULATION": "int64",
-            "TZ": "string",
-        },
-    )
-    c_df = c_df.rename(
-        columns={
-            "ASCIINAME": "name",
-            "COUNTRY_CODE": "country_code",
-            "ADMIN1": "country_division_code",
-            "LAT": "latitude",
-            "LNG": "longitude",
-            "POPULATION": "population",
-            "TZ": "timezone",
-        }
-    )
-    c_df["cocd_id"] = c_df["country_code"] + "." + c_df["country_division_code"]
-    usc_df = c_df[c_df["country_code"] == "US"]
-    usc_df = usc_df[usc_df["population"] > 15000]
-    gc_df = c_df[c_df["country_code"] != "US"]
-    gc_df = gc_df[gc_df["population"] > 500000]
-    c_df = pd.concat([usc_df, gc_df])
-    c_df = c_df.merge(cocd_df, how="inner", on="cocd_id")
-    c_df = c_df[
-        [
-            "country_id",
-            "country_division_id",
-            "name",
-            "latitude",
-            "longitude",
-            "timezone",
-            "population",
+        usecols=list(CITIES_COLUMNS),
+        dtype=CITIES_COLUMNS,
+        chunksize=CITIES_CHUNK_SIZE,
+    ):
+        c_df = c_df[
+            (c_df["POPULATION"] > GLOBAL_MIN_POPULATION)
+            | (
+                (c_df["COUNTRY_CODE"] == "US")
+                & (c_df["POPULATION"] > US_MIN_POPULATION)
+            )
         ]
-    ].copy()
-    cities = [tuple(c) for c in c_df.to_numpy()]
+        ids = (c_df["COUNTRY_CODE"] + "." + c_df["ADMIN1"]).map(country_division_ids)
+        c_df = c_df[ids.notna()]
+        ids = ids[ids.notna()]
+        if c_df.empty:
+            continue
+        cities_file = io.StringIO()
+        pd.DataFrame(
+            {
+                "country_id": [country_id for country_id, _ in ids],
+                "country_division_id": [division_id for _, division_id in ids],
+                "name": c_df["ASCIINAME"].to_numpy(),
+                "latitude": c_df["LAT"].to_numpy(),
+                "longitude": c_df["LNG"].to_numpy(),
+                "timezone": c_df["TZ"].to_numpy(),
+                "population": c_df["POPULATION"].to_numpy(),
+                "geoname_id": c_df["GEONAMEID"].to_numpy(),
+            }
+        ).to_csv(cities_file, index=False, header=False)
+        cities_file.seek(0)
+        yield cities_file
+
+
+def add_cities(cities_path: str, upsert: bool = False) -> None:
+    print(f"Adding cities from: {cities_path}")
+    country_division_ids = get_country_division_ids()
     try:
-        insert_cities(cities)
+        city_count = copy_cities(read_cities(cities_path, country_division_ids), upsert)
+        print(f"Added {city_count} cities")
     except UniqueViolation as error:
         print(error)
     return
@@ -128,11 +203,25 @@ def add_locations() -> None:
     insert_locations_countries()
     insert_locations_country_divisions()
     insert_locations_cities()
+    clear_location_resolutions()
+    return
+
+
+def add_timezone_buckets(location_ids: list[int] | None = None) -> None:
+    print("Adding timezone buckets to locations")
+    timezone_buckets = [
+        (timezone, timezone_bucket)
+        for timezone_bucket, timezones in TIMEZONE_BUCKETS.items()
+        for timezone in timezones
+    ]
+    update_locations_timezone_buckets(timezone_buckets, location_ids)
+    refresh_jobs_timezone_buckets(location_ids)
     return
 
 
 if __name__ == "__main__":
-    add_countries(COUNTRIES_PATH)
-    add_country_divisions(DIVISION_PATH)
-    add_cities(CITIES_PATH)
+    add_countries(COUNTRIES_PATH, UPSERT)
+    add_country_divisions(DIVISION_PATH, UPSERT)
+    add_cities(CITIES_PATH, UPSERT)
     add_locations()
+    add_timezone_buckets()
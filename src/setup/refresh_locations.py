@@ -0,0 +1,171 @@
+# NOTE: applies a GeoNames daily modifications and deletes diff to an already
+# built set of location tables instead of rebuilding from the full dumps. Only
+# the changed divisions and cities get their locations refreshed, and jobs
+# mapped to them are cleared for resolve_locations.py to re-resolve. Country
+# rows come from countryInfo, whose names differ from GeoNames features, so new
+# countries still go through build_locations.py in upsert mode
+
+import csv
+import os
+
+import pandas as pd
+from psycopg2.errors import UniqueViolation
+
+from build_locations import (
+    GLOBAL_MIN_POPULATION,
+    US_MIN_POPULATION,
+    add_timezone_buckets,
+    get_country_division_ids,
+)
+from utils.queries import (
+    upsert_country_divisions_by_code,
+    upsert_geonames_cities,
+    invalidate_jobs_locations,
+    delete_cities,
+    insert_locations_country_divisions,
+    insert_locations_cities,
+    invalidate_location_resolutions,
+    get_timezone_location_ids,
+)
+
+
+MODIFICATIONS_PATH = os.environ.get(
+    "geonames_modifications_path",
+    "src/transformations/utils/data/modifications.txt",
+)
+DELETES_PATH = os.environ.get(
+    "geonames_deletes_path", "src/transformations/utils/data/deletes.txt"
+)
+MODIFICATIONS_COLUMNS = [
+    "geoname_id",
+    "name",
+    "asciiname",
+    "alternatenames",
+    "latitude",
+    "longitude",
+    "feature_class",
+    "feature_code",
+    "country_code",
+    "cc2",
+    "admin1_code",
+    "admin2_code",
+    "admin3_code",
+    "admin4_code",
+    "population",
+    "elevation",
+    "dem",
+    "timezone",
+    "modification_date",
+]
+DELETES_COLUMNS = ["geoname_id", "name", "comment"]
+
+
+def read_geonames(path: str, columns: list[str]) -> pd.DataFrame:
+    # NOTE: diffs are tab separated without a header, "NA" is Namibia
+    return pd.read_csv(
+        path,
+        sep="\t",
+        header=None,
+        names=columns,
+        dtype="string",
+        quoting=csv.QUOTE_NONE,
+        keep_default_na=False,
+    )
+
+
+def refresh_country_divisions(m_df: pd.DataFrame) -> list[int]:
+    d_df = m_df[(m_df["feature_code"] == "ADM1") & (m_df["admin1_code"] != "")]
+    d_df = d_df.drop_duplicates(["country_code", "admin1_code"], keep="last")
+    country_divisions = list(
+        d_df[["country_code", "admin1_code", "asciiname"]].itertuples(
+            index=False, name=None
+        )
+    )
+    if not country_divisions:
+        return []
+    return upsert_country_divisions_by_code(country_divisions)
+
+
+def refresh_cities(m_df: pd.DataFrame) -> tuple[list[int], list[int], set[int]]:
+    # NOTE: modified places that no longer pass the population filter or map to
+    # a division are removed, the same as a full build would leave them out
+    c_df = m_df[m_df["feature_class"] == "P"].copy()
+    c_df = c_df.drop_duplicates("geoname_id", keep="last")
+    c_df["population"] = pd.to_numeric(c_df["population"]).fillna(0).astype("int64")
+    ids = (c_df["country_code"] + "." + c_df["admin1_code"]).map(
+        get_country_division_ids()
+    )
+    keep = ids.notna() & (
+        (c_df["population"] > GLOBAL_MIN_POPULATION)
+        | ((c_df["country_code"] == "US") & (c_df["population"] > US_MIN_POPULATION))
+    )
+    removed_geoname_ids = set(c_df.loc[~keep, "geoname_id"].astype(int))
+    c_df, ids = c_df[keep], ids[keep]
+    c_df["country_id"] = [country_id for country_id, _ in ids]
+    c_df["country_division_id"] = [division_id for _, division_id in ids]
+    c_df = c_df.astype({"geoname_id": "int64", "latitude": float, "longitude": float})
+    cities = list(
+        c_df[
+            [
+                "geoname_id",
+                "country_id",
+                "country_division_id",
+                "asciiname",
+                "latitude",
+                "longitude",
+                "timezone",
+                "population",
+            ]
+        ].itertuples(index=False, name=None)
+    )
+    if not cities:
+        return [], [], removed_geoname_ids
+    city_ids = upsert_geonames_cities(cities)
+    return (
+        [city_id for city_id, _ in city_ids],
+        [city_id for city_id, moved in city_ids if moved],
+        removed_geoname_ids,
+    )
+
+
+def refresh_locations(modifications_path: str, deletes_path: str) -> None:
+    print(f"Applying GeoNames diffs from: {modifications_path}, {deletes_path}")
+    m_df = read_geonames(modifications_path, MODIFICATIONS_COLUMNS)
+    geoname_ids = set(
+        read_geonames(deletes_path, DELETES_COLUMNS)["geoname_id"].astype(int)
+    )
+    try:
+        country_division_ids = refresh_country_divisions(m_df)
+    except UniqueViolation as error:
+        print(error)
+        return
+    # NOTE: the divisions are committed by now, a failed city upsert still
+    # gives them their locations below instead of leaving them without
+    try:
+        city_ids, moved_city_ids, removed_geoname_ids = refresh_cities(m_df)
+    except UniqueViolation as error:
+        print(error)
+        city_ids, moved_city_ids, removed_geoname_ids = [], [], set()
+    geoname_ids |= removed_geoname_ids
+    # NOTE: population and timezone changes, most of a daily diff, only move
+    # timezone buckets, mappings and resolutions follow the moved cities
+    job_count = invalidate_jobs_locations(moved_city_ids, country_division_ids)
+    city_count = delete_cities(list(geoname_ids))
+    insert_locations_country_divisions(country_division_ids)
+    insert_locations_cities(moved_city_ids, country_division_ids)
+    resolution_count = invalidate_location_resolutions(
+        moved_city_ids, country_division_ids
+    )
+    add_timezone_buckets(get_timezone_location_ids(city_ids, country_division_ids))
+    print(
+        f"{len(country_division_ids)} country divisions added or renamed"
+        f" | {len(city_ids)} cities added or changed, {len(moved_city_ids)} moved"
+        f" | {city_count} cities removed"
+        f" | {job_count} jobs cleared for resolve_locations.py"
+        f" | {resolution_count} location resolutions cleared"
+    )
+    return
+
+
+if __name__ == "__main__":
+    refresh_locations(MODIFICATIONS_PATH, DELETES_PATH)
@@ -1,6 +1,10 @@
 CREATE SCHEMA IF NOT EXISTS bhr
     AUTHORIZATION postgres;
 
+-- cube and earthdistance back the GiST radius index on cities
+CREATE EXTENSION IF NOT EXISTS cube;
+CREATE EXTENSION IF NOT EXISTS earthdistance;
+
 -- Create main tables
 CREATE TABLE IF NOT EXISTS bhr.companies
 (
@@ -31,6 +35,15 @@ CREATE TABLE IF NOT EXISTS bhr.jobs
     scrape_inactive_run_id uuid,
     remote boolean,
     searchable_description tsvector GENERATED ALWAYS AS (to_tsvector('english'::regconfig, description)) STORED,
+    listing_fingerprint text COLLATE pg_catalog."default",
+    description_hash text COLLATE pg_catalog."default",
+    salary_min numeric,
+    salary_max numeric,
+    salary_currency text COLLATE pg_catalog."default",
+    salary_period text COLLATE pg_catalog."default",
+    salary_annual_min numeric,
+    salary_annual_max numeric,
+    salary_bucket integer,
     CONSTRAINT jobs_pkey PRIMARY KEY (id),
     CONSTRAINT jobs_fkey_companies FOREIGN KEY (company_id)
         REFERENCES bhr.companies (id) MATCH SIMPLE
@@ -41,6 +54,16 @@ CREATE TABLE IF NOT EXISTS bhr.jobs
 TABLESPACE pg_default;
 ALTER TABLE IF EXISTS bhr.jobs
     OWNER to postgres;
+ALTER TABLE IF EXISTS bhr.jobs
+    ADD COLUMN IF NOT EXISTS listing_fingerprint text COLLATE pg_catalog."default",
+    ADD COLUMN IF NOT EXISTS description_hash text COLLATE pg_catalog."default",
+    ADD COLUMN IF NOT EXISTS salary_min numeric,
+    ADD COLUMN IF NOT EXISTS salary_max numeric,
+    ADD COLUMN IF NOT EXISTS salary_currency text COLLATE pg_catalog."default",
+    ADD COLUMN IF NOT EXISTS salary_period text COLLATE pg_catalog."default",
+    ADD COLUMN IF NOT EXISTS salary_annual_min numeric,
+    ADD COLUMN IF NOT EXISTS salary_annual_max numeric,
+    ADD COLUMN IF NOT EXISTS salary_bucket integer;
 CREATE INDEX IF NOT EXISTS fki_jobs_fkey_companies
     ON bhr.jobs USING btree
     (company_id ASC NULLS LAST)
@@ -49,6 +72,21 @@ CREATE INDEX IF NOT EXISTS ts_searchable_description_idx
     ON bhr.jobs USING gin
     (searchable_description)
     TABLESPACE pg_default;
+CREATE INDEX IF NOT EXISTS jobs_salary_bucket_idx
+    ON bhr.jobs USING btree
+    (salary_bucket ASC NULLS LAST)
+    TABLESPACE pg_default
+    WHERE active = true;
+CREATE INDEX IF NOT EXISTS jobs_salary_annual_max_idx
+    ON bhr.jobs USING btree
+    (salary_annual_max ASC NULLS LAST)
+    TABLESPACE pg_default
+    WHERE active = true;
+CREATE INDEX IF NOT EXISTS jobs_active_insert_timestamp_idx
+    ON bhr.jobs USING btree
+    (insert_timestamp DESC, id DESC)
+    TABLESPACE pg_default
+    WHERE active = true;
 
 -- Create location tables
 CREATE TABLE IF NOT EXISTS bhr.countries
@@ -87,10 +125,11 @@ CREATE TABLE IF NOT EXISTS bhr.cities
     country_id integer NOT NULL,
     country_division_id integer NOT NULL,
     name text COLLATE pg_catalog."default" NOT NULL,
-    latitude text COLLATE pg_catalog."default" NOT NULL,
-    longitude text COLLATE pg_catalog."default" NOT NULL,
+    latitude double precision NOT NULL,
+    longitude double precision NOT NULL,
     timezone text COLLATE pg_catalog."default" NOT NULL,
     population integer NOT NULL,
+    geoname_id integer,
     CONSTRAINT cities_pkey PRIMARY KEY (id),
     CONSTRAINT cities_unique UNIQUE (country_id, country_division_id, name, latitude, longitude),
     CONSTRAINT cities_countries_fkey FOREIGN KEY (country_id)
@@ -107,6 +146,32 @@ CREATE TABLE IF NOT EXISTS bhr.cities
 TABLESPACE pg_default;
 ALTER TABLE IF EXISTS bhr.cities
     OWNER to postgres;
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1
+        FROM information_schema.columns
+        WHERE table_schema = 'bhr'
+            AND table_name = 'cities'
+            AND column_name IN ('latitude', 'longitude')
+            AND data_type <> 'double precision'
+    ) THEN
+        ALTER TABLE bhr.cities
+            ALTER COLUMN latitude TYPE double precision USING latitude::double precision,
+            ALTER COLUMN longitude TYPE double precision USING longitude::double precision;
+    END IF;
+END
+$$;
+ALTER TABLE IF EXISTS bhr.cities
+    ADD COLUMN IF NOT EXISTS geoname_id integer;
+CREATE UNIQUE INDEX IF NOT EXISTS cities_geoname_id_idx
+    ON bhr.cities USING btree
+    (geoname_id ASC NULLS LAST)
+    TABLESPACE pg_default;
+CREATE INDEX IF NOT EXISTS cities_earth_idx
+    ON bhr.cities USING gist
+    (ll_to_earth(latitude, longitude))
+    TABLESPACE pg_default;
 
 CREATE TABLE IF NOT EXISTS bhr.locations
 (
@@ -115,6 +180,7 @@ CREATE TABLE IF NOT EXISTS bhr.locations
     country_division_id integer,
     city_id bigint,
     location text COLLATE pg_catalog."default" NOT NULL,
+    timezone_bucket text COLLATE pg_catalog."default",
     CONSTRAINT normalized_locations_pkey PRIMARY KEY (id),
     CONSTRAINT normalized_locations_unique_location UNIQUE NULLS NOT DISTINCT (country_id, country_division_id, city_id),
     CONSTRAINT normalized_locations_fkey_cities FOREIGN KEY (city_id)
@@ -136,6 +202,12 @@ CREATE TABLE IF NOT EXISTS bhr.locations
 TABLESPACE pg_default;
 ALTER TABLE IF EXISTS bhr.locations
     OWNER to postgres;
+ALTER TABLE IF EXISTS bhr.locations
+    ADD COLUMN IF NOT EXISTS timezone_bucket text COLLATE pg_catalog."default";
+CREATE INDEX IF NOT EXISTS fki_normalized_locations_fkey_cities
+    ON bhr.locations USING btree
+    (city_id ASC NULLS LAST)
+    TABLESPACE pg_default;
 
 CREATE TABLE IF NOT EXISTS bhr.jobs_locations
 (
@@ -168,3 +240,95 @@ CREATE INDEX IF NOT EXISTS fki_job_locations_fkey_locations
     (location_id ASC NULLS LAST)
     TABLESPACE pg_default;
 
+CREATE TABLE IF NOT EXISTS bhr.jobs_timezone_buckets
+(
+    timezone_bucket text COLLATE pg_catalog."default" NOT NULL,
+    job_id uuid NOT NULL,
+    CONSTRAINT jobs_timezone_buckets_pkey PRIMARY KEY (timezone_bucket, job_id),
+    CONSTRAINT jobs_timezone_buckets_fkey_jobs FOREIGN KEY (job_id)
+        REFERENCES bhr.jobs (id) MATCH SIMPLE
+        ON UPDATE NO ACTION
+        ON DELETE CASCADE
+        NOT VALID
+)
+TABLESPACE pg_default;
+ALTER TABLE IF EXISTS bhr.jobs_timezone_buckets
+    OWNER to postgres;
+CREATE INDEX IF NOT EXISTS fki_jobs_timezone_buckets_fkey_jobs
+    ON bhr.jobs_timezone_buckets USING btree
+    (job_id ASC NULLS LAST)
+    TABLESPACE pg_default;
+
+CREATE TABLE IF NOT EXISTS bhr.location_resolutions
+(
+    location_key text COLLATE pg_catalog."default" NOT NULL,
+    location_ids bigint[] NOT NULL,
+    resolved_at timestamp without time zone NOT NULL,
+    CONSTRAINT location_resolutions_pkey PRIMARY KEY (location_key)
+)
+TABLESPACE pg_default;
+ALTER TABLE IF EXISTS bhr.location_resolutions
+    OWNER to postgres;
+
+-- Create scrape telemetry tables
+CREATE TABLE IF NOT EXISTS bhr.scrape_runs
+(
+    id uuid NOT NULL,
+    run_name text COLLATE pg_catalog."default" NOT NULL,
+    started_at timestamp without time zone NOT NULL,
+    ended_at timestamp without time zone NOT NULL,
+    duration double precision NOT NULL,
+    companies integer NOT NULL,
+    companies_failed integer NOT NULL,
+    requests integer NOT NULL,
+    bytes_downloaded bigint NOT NULL,
+    fetch_time double precision NOT NULL,
+    parse_time double precision NOT NULL,
+    db_time double precision NOT NULL,
+    jobs_added integer NOT NULL,
+    jobs_deactivated integer NOT NULL,
+    jobs_reactivated integer NOT NULL,
+    errors integer NOT NULL,
+    CONSTRAINT scrape_runs_pkey PRIMARY KEY (id)
+)
+TABLESPACE pg_default;
+ALTER TABLE IF EXISTS bhr.scrape_runs
+    OWNER to postgres;
+CREATE INDEX IF NOT EXISTS scrape_runs_started_at_idx
+    ON bhr.scrape_runs USING btree
+    (started_at DESC)
+    TABLESPACE pg_default;
+
+CREATE TABLE IF NOT EXISTS bhr.scrape_run_companies
+(
+    run_id uuid NOT NULL,
+    company_id uuid NOT NULL,
+    ats text COLLATE pg_catalog."default",
+    failed boolean NOT NULL,
+    requests integer NOT NULL,
+    bytes_downloaded bigint NOT NULL,
+    fetch_time double precision NOT NULL,
+    parse_time double precision NOT NULL,
+    db_time double precision NOT NULL,
+    jobs_added integer NOT NULL,
+    jobs_deactivated integer NOT NULL,
+    jobs_reactivated integer NOT NULL,
+    errors integer NOT NULL,
+    CONSTRAINT scrape_run_companies_pkey PRIMARY KEY (run_id, company_id),
+    CONSTRAINT scrape_run_companies_fkey_scrape_runs FOREIGN KEY (run_id)
+        REFERENCES bhr.scrape_runs (id) MATCH SIMPLE
+        ON UPDATE NO ACTION
+        ON DELETE CASCADE,
+    CONSTRAINT scrape_run_companies_fkey_companies FOREIGN KEY (company_id)
+        REFERENCES bhr.companies (id) MATCH SIMPLE
+        ON UPDATE NO ACTION
+        ON DELETE CASCADE
+        NOT VALID
+)
+TABLESPACE pg_default;
+ALTER TABLE IF EXISTS bhr.scrape_run_companies
+    OWNER to postgres;
+CREATE INDEX IF NOT EXISTS fki_scrape_run_companies_fkey_companies
+    ON bhr.scrape_run_companies USING btree
+    (company_id ASC NULLS LAST)
+    TABLESPACE pg_default;
@@ -1,221 +1,807 @@
-import os
-import psycopg2 as pg
-from psycopg2.extras import RealDictCursor, RealDictRow, execute_values
-
-
-db_name = os.environ["postgres_db_name"]
-db_user = os.environ["postgres_user"]
-db_pwd = os.environ["postgres_pwd"]
+from typing import Iterable, TextIO
 
+from psycopg2.extras import RealDictCursor, RealDictRow, execute_values
 
-def connect_to_db():
-    conn = pg.connect(f"dbname={db_name} user={db_user} password={db_pwd}")
-    return conn
+from utils.db import db_pool
 
 
 def create_tables(create_table_query: str) -> None:
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    cursor.execute(create_table_query)
-    conn.commit()
-    conn.close()
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(create_table_query)
+        conn.commit()
     return
 
 
 def insert_companies(companies: list[tuple]) -> None:
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    execute_values(
-        cursor,
-        """
-        INSERT INTO logistics_jobs.companies(
-            id
-            , company_name
-            , ats
-            , career_site_url
-        )
-        VALUES %s
-        """,
-        companies,
-    )
-    conn.commit()
-    conn.close()
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        execute_values(
+            cursor,
+            """
+            INSERT INTO logistics_jobs.companies(
+                id
+                , company_name
+                , ats
+                , career_site_url
+            )
+            VALUES %s
+            """,
+            companies,
+        )
+        conn.commit()
     return
 
 
 def get_countries() -> list[RealDictRow]:
-    conn = connect_to_db()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute(
-        """
-        SELECT id as country_id
-        , name as country_name
-        , code as country_code
-        FROM logistics_jobs.countries
-        """
-    )
-    queryset = cursor.fetchall()
-    conn.close()
+    with db_pool.connection() as conn:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute(
+            """
+            SELECT id as country_id
+            , name as country_name
+            , code as country_code
+            FROM logistics_jobs.countries
+            """
+        )
+        queryset = cursor.fetchall()
     return queryset
 
 
 def get_country_divisions() -> list[RealDictRow]:
-    conn = connect_to_db()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute(
-        """
-        SELECT id as country_division_id
-        , country_id
-        , name as country_division_name
-        , code as country_division_code
-        FROM logistics_jobs.country_divisions
-        """
-    )
-    queryset = cursor.fetchall()
-    conn.close()
+    with db_pool.connection() as conn:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute(
+            """
+            SELECT id as country_division_id
+            , country_id
+            , name as country_division_name
+            , code as country_division_code
+            FROM logistics_jobs.country_divisions
+            """
+        )
+        queryset = cursor.fetchall()
     return queryset
 
 
 def get_cities() -> list[RealDictRow]:
-    conn = connect_to_db()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute(
-        """
-        SELECT id as city_id
-        , country_id
-        , country_division_id
-        , name as city_name
-        FROM logistics_jobs.cities
-        """
-    )
-    queryset = cursor.fetchall()
-    conn.close()
+    with db_pool.connection() as conn:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor.execute(
+            """
+            SELECT id as city_id
+            , country_id
+            , country_division_id
+            , name as city_name
+            FROM logistics_jobs.cities
+            """
+        )
+        queryset = cursor.fetchall()
     return queryset
 
 
-def insert_countries(countries: list[tuple]) -> None:
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    execute_values(
-        cursor,
-        """
-        INSERT INTO logistics_jobs.countries(code, name)
-        VALUES %s
-        """,
-        countries,
-    )
-    conn.commit()
-    conn.close()
+def insert_countries(countries: list[tuple], upsert: bool = False) -> None:
+    on_conflict = "ON CONFLICT ON CONSTRAINT countries_unique DO NOTHING"
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        execute_values(
+            cursor,
+            f"""
+            INSERT INTO logistics_jobs.countries(code, name)
+            VALUES %s
+            {on_conflict if upsert else ""}
+            """,
+            countries,
+        )
+        conn.commit()
     return
 
 
-def insert_country_divisions(country_divisions: list[tuple]) -> None:
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    execute_values(
-        cursor,
-        """
-        INSERT INTO logistics_jobs.country_divisions(
-            country_id
-            , name
-            , code)
-        VALUES %s
-        """,
-        country_divisions,
-    )
-    conn.commit()
-    conn.close()
+def insert_country_divisions(
+    country_divisions: list[tuple], upsert: bool = False
+) -> None:
+    on_conflict = """
+        ON CONFLICT ON CONSTRAINT country_divisions_unique
+        DO UPDATE SET code = EXCLUDED.code
+        WHERE country_divisions.code IS DISTINCT FROM EXCLUDED.code
+    """
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        execute_values(
+            cursor,
+            f"""
+            INSERT INTO logistics_jobs.country_divisions(
+                country_id
+                , name
+                , code)
+            VALUES %s
+            {on_conflict if upsert else ""}
+            """,
+            country_divisions,
+        )
+        conn.commit()
     return
 
 
-def insert_cities(cities: list[tuple]) -> None:
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    execute_values(
-        cursor,
-        """
-        INSERT INTO logistics_jobs.cities(
-            country_id
-            , country_division_id
-            , name
-            , latitude
-            , longitude
-            , timezone
-            , population)
-        VALUES %s
-        """,
-        cities,
-    )
-    conn.commit()
-    conn.close()
-    return
+def copy_cities(cities_files: Iterable[TextIO], upsert: bool = False) -> int:
+    # NOTE: each file is one csv chunk, all chunks load in one transaction so a
+    # failed load leaves no partial cities behind. Upserts COPY into a staging
+    # table first because COPY itself has no ON CONFLICT
+    city_count = 0
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        table = "logistics_jobs.cities"
+        if upsert:
+            table = "cities_staging"
+            cursor.execute(
+                """
+                CREATE TEMPORARY TABLE cities_staging (
+                    country_id integer NOT NULL,
+                    country_division_id integer NOT NULL,
+                    name text NOT NULL,
+                    latitude double precision NOT NULL,
+                    longitude double precision NOT NULL,
+                    timezone text NOT NULL,
+                    population integer NOT NULL,
+                    geoname_id integer
+                ) ON COMMIT DROP
+                """
+            )
+        for cities_file in cities_files:
+            cursor.copy_expert(
+                f"""
+                COPY {table}(
+                    country_id
+                    , country_division_id
+                    , name
+                    , latitude
+                    , longitude
+                    , timezone
+                    , population
+                    , geoname_id)
+                FROM STDIN WITH (FORMAT csv)
+                """,
+                cities_file,
+            )
+            city_count += cursor.rowcount
+        if upsert:
+            # NOTE: geoname_id is the stable key, cities matched on it take the
+            # new name and coordinates first, so the insert below only conflicts
+            # on cities_unique for new geonames or rows loaded without one
+            cursor.execute(
+                """
+                UPDATE logistics_jobs.cities
+                SET country_id = staged.country_id
+                , country_division_id = staged.country_division_id
+                , name = staged.name
+                , latitude = staged.latitude
+                , longitude = staged.longitude
+                , timezone = staged.timezone
+                , population = staged.population
+                FROM (
+                    SELECT DISTINCT ON (geoname_id) *
+                    FROM cities_staging
+                    WHERE geoname_id IS NOT NULL
+                    ORDER BY geoname_id, population DESC
+                ) AS staged
+                WHERE cities.geoname_id = staged.geoname_id
+                AND (
+                    cities.country_id
+                    , cities.country_division_id
+                    , cities.name
+                    , cities.latitude
+                    , cities.longitude
+                    , cities.timezone
+                    , cities.population
+                ) IS DISTINCT FROM (
+                    staged.country_id
+                    , staged.country_division_id
+                    , staged.name
+                    , staged.latitude
+                    , staged.longitude
+                    , staged.timezone
+                    , staged.population
+                )
+                """
+            )
+            city_count = cursor.rowcount
+            cursor.execute(
+                """
+                INSERT INTO logistics_jobs.cities(
+                    country_id
+                    , country_division_id
+                    , name
+                    , latitude
+                    , longitude
+                    , timezone
+                    , population
+                    , geoname_id)
+                SELECT DISTINCT ON (
+                    country_id, country_division_id, name, latitude, longitude
+                ) country_id
+                , country_division_id
+                , name
+                , latitude
+                , longitude
+                , timezone
+                , population
+                , geoname_id
+                FROM cities_staging
+                WHERE NOT EXISTS (
+                    SELECT 1
+                    FROM logistics_jobs.cities
+                    WHERE cities.geoname_id = cities_staging.geoname_id
+                )
+                ORDER BY country_id
+                , country_division_id
+                , name
+                , latitude
+                , longitude
+                , population DESC
+                , geoname_id
+                ON CONFLICT ON CONSTRAINT cities_unique
+                DO UPDATE SET timezone = EXCLUDED.timezone
+                    , population = EXCLUDED.population
+                    , geoname_id = EXCLUDED.geoname_id
+                WHERE (cities.timezone, cities.population, cities.geoname_id)
+                    IS DISTINCT FROM (
+                        EXCLUDED.timezone, EXCLUDED.population, EXCLUDED.geoname_id
+                    )
+                """
+            )
+            city_count += cursor.rowcount
+        conn.commit()
+    return city_count
 
 
 def insert_locations_countries() -> None:
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        INSERT INTO logistics_jobs.locations(country_id, location)	
-        SELECT co.id AS country_id
-        , co.name AS location
-        FROM logistics_jobs.countries AS co
-            LEFT JOIN logistics_jobs.locations AS l
-                ON co.id = l.country_id
-        WHERE l.country_id IS NULL
-        """
-    )
-    conn.commit()
-    conn.close()
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO logistics_jobs.locations(country_id, location)	
+            SELECT co.id AS country_id
+            , co.name AS location
+            FROM logistics_jobs.countries AS co
+                LEFT JOIN logistics_jobs.locations AS l
+                    ON co.id = l.country_id
+            WHERE l.country_id IS NULL
+            """
+        )
+        conn.commit()
     return
 
 
-def insert_locations_country_divisions() -> None:
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        INSERT INTO logistics_jobs.locations(
-            country_id, country_division_id, location
-        )	
-        SELECT cd.country_id
-        , cd.id AS country_division_id
-        , cd.name || ', ' || co.name AS location
-        FROM logistics_jobs.country_divisions AS cd
-            INNER JOIN logistics_jobs.countries AS co
-                ON cd.country_id = co.id
-            LEFT JOIN logistics_jobs.locations AS l
-                ON cd.id = l.country_division_id
-        WHERE l.country_division_id IS NULL
-        """
-    )
-    conn.commit()
-    conn.close()
+def insert_locations_country_divisions(
+    country_division_ids: list[int] | None = None,
+) -> None:
+    # NOTE: inserts missing division locations, divisions passed by id also
+    # have their location text refreshed after a rename
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO logistics_jobs.locations(
+                country_id, country_division_id, location
+            )
+            SELECT cd.country_id
+            , cd.id AS country_division_id
+            , cd.name || ', ' || co.name AS location
+            FROM logistics_jobs.country_divisions AS cd
+                INNER JOIN logistics_jobs.countries AS co
+                    ON cd.country_id = co.id
+            WHERE cd.id = ANY(%(country_division_ids)s)
+                OR NOT EXISTS (
+                    SELECT 1
+                    FROM logistics_jobs.locations AS l
+                    WHERE l.country_division_id = cd.id
+                )
+            ON CONFLICT ON CONSTRAINT normalized_locations_unique_location
+            DO UPDATE SET location = EXCLUDED.location
+            WHERE locations.location IS DISTINCT FROM EXCLUDED.location
+            """,
+            {"country_division_ids": country_division_ids or []},
+        )
+        conn.commit()
     return
 
 
-def insert_locations_cities() -> None:
-    conn = connect_to_db()
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        INSERT INTO logistics_jobs.locations(
-            country_id, country_division_id, city_id, location
-        )	
-        SELECT c.country_id
-        , c.country_division_id
-        , c.id AS city_id
-        , c.name || ', ' || cd.name || ', ' || co.name AS location
-        FROM logistics_jobs.cities AS c
-            INNER JOIN logistics_jobs.country_divisions AS cd
-                ON c.country_division_id = cd.id
-            INNER JOIN logistics_jobs.countries AS co
-                ON c.country_id = co.id
-            LEFT JOIN logistics_jobs.locations AS l
-                ON c.id = l.city_id
-        WHERE l.city_id IS NULL
-        """
-    )
-    conn.commit()
-    conn.close()
+def insert_locations_cities(
+    city_ids: list[int] | None = None,
+    country_division_ids: list[int] | None = None,
+) -> None:
+    # NOTE: inserts missing city locations, cities passed by id or by division
+    # also have their location text refreshed after a rename
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO logistics_jobs.locations(
+                country_id, country_division_id, city_id, location
+            )
+            SELECT c.country_id
+            , c.country_division_id
+            , c.id AS city_id
+            , c.name || ', ' || cd.name || ', ' || co.name AS location
+            FROM logistics_jobs.cities AS c
+                INNER JOIN logistics_jobs.country_divisions AS cd
+                    ON c.country_division_id = cd.id
+                INNER JOIN logistics_jobs.countries AS co
+                    ON c.country_id = co.id
+            WHERE c.id = ANY(%(city_ids)s)
+                OR c.country_division_id = ANY(%(country_division_ids)s)
+                OR NOT EXISTS (
+                    SELECT 1
+                    FROM logistics_jobs.locations AS l
+                    WHERE l.city_id = c.id
+                )
+            ON CONFLICT ON CONSTRAINT normalized_locations_unique_location
+            DO UPDATE SET location = EXCLUDED.location
+            WHERE locations.location IS DISTINCT FROM EXCLUDED.location
+            """,
+            {
+                "city_ids": city_ids or [],
+                "country_division_ids": country_division_ids or [],
+            },
+        )
+        conn.commit()
     return
+
+
+def clear_location_resolutions() -> None:
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            TRUNCATE TABLE logistics_jobs.location_resolutions
+            """
+        )
+        conn.commit()
+    return
+
+
+def invalidate_location_resolutions(
+    city_ids: list[int], country_division_ids: list[int]
+) -> int:
+    # NOTE: takes the added or moved cities and changed divisions, clears the
+    # resolutions that point at them or whose text contains one of their names
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            DELETE FROM logistics_jobs.location_resolutions AS r
+            WHERE r.location_ids && ARRAY(
+                SELECT l.id
+                FROM logistics_jobs.locations AS l
+                WHERE l.city_id = ANY(%(city_ids)s)
+                    OR l.country_division_id = ANY(%(country_division_ids)s)
+            )::bigint[]
+                OR EXISTS (
+                    SELECT 1
+                    FROM (
+                        SELECT c.name
+                        FROM logistics_jobs.cities AS c
+                        WHERE c.id = ANY(%(city_ids)s)
+                        UNION
+                        SELECT cd.name
+                        FROM logistics_jobs.country_divisions AS cd
+                        WHERE cd.id = ANY(%(country_division_ids)s)
+                    ) AS n(name)
+                    WHERE r.location_key LIKE '%%' || lower(n.name) || '%%'
+                )
+            """,
+            {"city_ids": city_ids, "country_division_ids": country_division_ids},
+        )
+        resolution_count = cursor.rowcount
+        conn.commit()
+    return resolution_count
+
+
+def get_timezone_location_ids(
+    city_ids: list[int], country_division_ids: list[int]
+) -> list[int]:
+    # NOTE: locations whose timezone bucket a diff can change, the changed
+    # cities and divisions and the division locations of changed cities
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT l.id
+            FROM logistics_jobs.locations AS l
+            WHERE l.city_id = ANY(%(city_ids)s)
+                OR l.country_division_id = ANY(%(country_division_ids)s)
+                OR (
+                    l.city_id IS NULL
+                    AND l.country_division_id IN (
+                        SELECT c.country_division_id
+                        FROM logistics_jobs.cities AS c
+                        WHERE c.id = ANY(%(city_ids)s)
+                    )
+                )
+            """,
+            {"city_ids": city_ids, "country_division_ids": country_division_ids},
+        )
+        queryset = cursor.fetchall()
+    return [location_id for location_id, in queryset]
+
+
+def update_locations_timezone_buckets(
+    timezone_buckets: list[tuple], location_ids: list[int] | None = None
+) -> None:
+    # NOTE: division locations take the bucket holding most of their city
+    # population, country locations span too many zones to get one. Passing
+    # location_ids recomputes only those locations
+    scope = {
+        "all": location_ids is None,
+        "location_ids": location_ids or [],
+        "timezones": [timezone for timezone, _ in timezone_buckets],
+        "timezone_buckets": [
+            timezone_bucket for _, timezone_bucket in timezone_buckets
+        ],
+    }
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            UPDATE logistics_jobs.locations
+            SET timezone_bucket = NULL
+            WHERE %(all)s
+                OR id = ANY(%(location_ids)s)
+            """,
+            scope,
+        )
+        cursor.execute(
+            """
+            UPDATE logistics_jobs.locations AS l
+            SET timezone_bucket = tz.timezone_bucket
+            FROM logistics_jobs.cities AS c
+                , unnest(%(timezones)s::text[], %(timezone_buckets)s::text[])
+                    AS tz(timezone, timezone_bucket)
+            WHERE l.city_id = c.id
+                AND c.timezone = tz.timezone
+                AND (%(all)s OR l.id = ANY(%(location_ids)s))
+            """,
+            scope,
+        )
+        cursor.execute(
+            """
+            UPDATE logistics_jobs.locations AS l
+            SET timezone_bucket = d.timezone_bucket
+            FROM (
+                SELECT DISTINCT ON (cl.country_division_id) cl.country_division_id
+                , cl.timezone_bucket
+                FROM logistics_jobs.locations AS cl
+                    INNER JOIN logistics_jobs.cities AS c
+                        ON cl.city_id = c.id
+                WHERE cl.timezone_bucket IS NOT NULL
+                GROUP BY cl.country_division_id, cl.timezone_bucket
+                ORDER BY cl.country_division_id, sum(c.population) DESC
+            ) AS d
+            WHERE l.city_id IS NULL
+                AND l.country_division_id = d.country_division_id
+                AND (%(all)s OR l.id = ANY(%(location_ids)s))
+            """,
+            scope,
+        )
+        conn.commit()
+    return
+
+
+def refresh_jobs_timezone_buckets(location_ids: list[int] | None = None) -> None:
+    # NOTE: passing location_ids rebuilds only the jobs linked to them instead
+    # of the whole table
+    scope = {"all": location_ids is None, "location_ids": location_ids or []}
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        if location_ids is None:
+            cursor.execute(
+                """
+                TRUNCATE TABLE logistics_jobs.jobs_timezone_buckets
+                """
+            )
+        else:
+            cursor.execute(
+                """
+                DELETE FROM logistics_jobs.jobs_timezone_buckets
+                WHERE job_id IN (
+                    SELECT jl.job_id
+                    FROM logistics_jobs.jobs_locations AS jl
+                    WHERE jl.location_id = ANY(%(location_ids)s)
+                )
+                """,
+                scope,
+            )
+        cursor.execute(
+            """
+            INSERT INTO logistics_jobs.jobs_timezone_buckets(timezone_bucket, job_id)
+            SELECT DISTINCT l.timezone_bucket
+            , jl.job_id
+            FROM logistics_jobs.jobs_locations AS jl
+                INNER JOIN logistics_jobs.locations AS l
+                    ON jl.location_id = l.id
+                INNER JOIN logistics_jobs.jobs AS j
+                    ON jl.job_id = j.id
+            WHERE j.active = true
+                AND l.timezone_bucket IS NOT NULL
+                AND (
+                    %(all)s
+                    OR jl.job_id IN (
+                        SELECT sjl.job_id
+                        FROM logistics_jobs.jobs_locations AS sjl
+                        WHERE sjl.location_id = ANY(%(location_ids)s)
+                    )
+                )
+            """,
+            scope,
+        )
+        conn.commit()
+    return
+
+
+def upsert_country_divisions_by_code(country_divisions: list[tuple]) -> list[int]:
+    # NOTE: divisions are matched on country and admin1 code, returns the ids
+    # of divisions that were added or renamed
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        country_division_ids = execute_values(
+            cursor,
+            """
+            WITH d(country_code, code, name) AS (
+                VALUES %s
+            )
+            , updated AS (
+                UPDATE logistics_jobs.country_divisions AS cd
+                SET name = d.name
+                FROM d
+                    INNER JOIN logistics_jobs.countries AS co
+                        ON d.country_code = co.code
+                WHERE cd.country_id = co.id
+                    AND cd.code = d.code
+                    AND cd.name <> d.name
+                RETURNING cd.id
+            )
+            , inserted AS (
+                INSERT INTO logistics_jobs.country_divisions(country_id, name, code)
+                SELECT co.id AS country_id
+                , d.name
+                , d.code
+                FROM d
+                    INNER JOIN logistics_jobs.countries AS co
+                        ON d.country_code = co.code
+                WHERE NOT EXISTS (
+                    SELECT 1
+                    FROM logistics_jobs.country_divisions AS cd
+                    WHERE cd.country_id = co.id
+                        AND cd.code = d.code
+                )
+                ON CONFLICT ON CONSTRAINT country_divisions_unique DO NOTHING
+                RETURNING id
+            )
+            SELECT id FROM updated
+            UNION ALL
+            SELECT id FROM inserted
+            """,
+            country_divisions,
+            fetch=True,
+        )
+        conn.commit()
+    return [country_division_id for country_division_id, in country_division_ids]
+
+
+def upsert_geonames_cities(cities: list[tuple]) -> list[tuple]:
+    # NOTE: cities are matched on geoname_id, returns (id, moved) for cities
+    # that were added or changed, moved when the name, coordinates or division
+    # changed rather than only the population or timezone
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        city_ids = execute_values(
+            cursor,
+            """
+            WITH c(
+                geoname_id
+                , country_id
+                , country_division_id
+                , name
+                , latitude
+                , longitude
+                , timezone
+                , population
+            ) AS (
+                VALUES %s
+            )
+            , previous AS (
+                SELECT ci.geoname_id
+                , ci.country_id
+                , ci.country_division_id
+                , ci.name
+                , ci.latitude
+                , ci.longitude
+                FROM logistics_jobs.cities AS ci
+                    INNER JOIN c
+                        ON ci.geoname_id = c.geoname_id
+            )
+            , upserted AS (
+                INSERT INTO logistics_jobs.cities(
+                    geoname_id
+                    , country_id
+                    , country_division_id
+                    , name
+                    , latitude
+                    , longitude
+                    , timezone
+                    , population)
+                SELECT * FROM c
+                ON CONFLICT (geoname_id)
+                DO UPDATE SET country_id = EXCLUDED.country_id
+                    , country_division_id = EXCLUDED.country_division_id
+                    , name = EXCLUDED.name
+                    , latitude = EXCLUDED.latitude
+                    , longitude = EXCLUDED.longitude
+                    , timezone = EXCLUDED.timezone
+                    , population = EXCLUDED.population
+                WHERE (
+                    cities.country_id
+                    , cities.country_division_id
+                    , cities.name
+                    , cities.latitude
+                    , cities.longitude
+                    , cities.timezone
+                    , cities.population
+                ) IS DISTINCT FROM (
+                    EXCLUDED.country_id
+                    , EXCLUDED.country_division_id
+                    , EXCLUDED.name
+                    , EXCLUDED.latitude
+                    , EXCLUDED.longitude
+                    , EXCLUDED.timezone
+                    , EXCLUDED.population
+                )
+                RETURNING id
+                , geoname_id
+                , country_id
+                , country_division_id
+                , name
+                , latitude
+                , longitude
+            )
+            SELECT u.id
+            , (
+                u.country_id
+                , u.country_division_id
+                , u.name
+                , u.latitude
+                , u.longitude
+            ) IS DISTINCT FROM (
+                p.country_id
+                , p.country_division_id
+                , p.name
+                , p.latitude
+                , p.longitude
+            ) AS moved
+            FROM upserted AS u
+                LEFT JOIN previous AS p
+                    ON u.geoname_id = p.geoname_id
+            """,
+            cities,
+            fetch=True,
+        )
+        conn.commit()
+    return city_ids
+
+
+def invalidate_jobs_locations(
+    city_ids: list[int], country_division_ids: list[int]
+) -> int:
+    # NOTE: takes the moved cities and changed divisions. Drops every mapping
+    # of jobs that touch them, and of jobs with unresolved text containing one
+    # of their names, so resolve_locations.py re-resolves them as a whole
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            DELETE FROM logistics_jobs.jobs_locations
+            WHERE job_id IN (
+                SELECT jl.job_id
+                FROM logistics_jobs.jobs_locations AS jl
+                    LEFT JOIN logistics_jobs.locations AS l
+                        ON jl.location_id = l.id
+                WHERE l.city_id = ANY(%(city_ids)s)
+                    OR l.country_division_id = ANY(%(country_division_ids)s)
+                    OR (
+                        jl.location_id IS NULL
+                        AND EXISTS (
+                            SELECT 1
+                            FROM (
+                                SELECT c.name
+                                FROM logistics_jobs.cities AS c
+                                WHERE c.id = ANY(%(city_ids)s)
+                                UNION
+                                SELECT cd.name
+                                FROM logistics_jobs.country_divisions AS cd
+                                WHERE cd.id = ANY(%(country_division_ids)s)
+                            ) AS n(name)
+                            WHERE lower(jl.location) LIKE '%%' || lower(n.name) || '%%'
+                        )
+                    )
+            )
+            RETURNING job_id
+            """,
+            {"city_ids": city_ids, "country_division_ids": country_division_ids},
+        )
+        job_ids = {job_id for job_id, in cursor.fetchall()}
+        cursor.execute(
+            """
+            DELETE FROM logistics_jobs.jobs_timezone_buckets
+            WHERE job_id = ANY(%s::uuid[])
+            """,
+            [list(job_ids)],
+        )
+        conn.commit()
+    return len(job_ids)
+
+
+def delete_cities(geoname_ids: list[int]) -> int:
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            DELETE FROM logistics_jobs.jobs_timezone_buckets
+            WHERE job_id IN (
+                SELECT jl.job_id
+                FROM logistics_jobs.jobs_locations AS jl
+                    INNER JOIN logistics_jobs.locations AS l
+                        ON jl.location_id = l.id
+                    INNER JOIN logistics_jobs.cities AS c
+                        ON l.city_id = c.id
+                WHERE c.geoname_id = ANY(%(geoname_ids)s)
+            )
+            """,
+            {"geoname_ids": geoname_ids},
+        )
+        cursor.execute(
+            """
+            DELETE FROM logistics_jobs.jobs_locations
+            WHERE job_id IN (
+                SELECT jl.job_id
+                FROM logistics_jobs.jobs_locations AS jl
+                    INNER JOIN logistics_jobs.locations AS l
+                        ON jl.location_id = l.id
+                    INNER JOIN logistics_jobs.cities AS c
+                        ON l.city_id = c.id
+                WHERE c.geoname_id = ANY(%(geoname_ids)s)
+            )
+            """,
+            {"geoname_ids": geoname_ids},
+        )
+        cursor.execute(
+            """
+            DELETE FROM logistics_jobs.location_resolutions
+            WHERE location_ids && ARRAY(
+                SELECT l.id
+                FROM logistics_jobs.locations AS l
+                    INNER JOIN logistics_jobs.cities AS c
+                        ON l.city_id = c.id
+                WHERE c.geoname_id = ANY(%(geoname_ids)s)
+            )::bigint[]
+            """,
+            {"geoname_ids": geoname_ids},
+        )
+        cursor.execute(
+            """
+            DELETE FROM logistics_jobs.locations AS l
+            USING logistics_jobs.cities AS c
+            WHERE l.city_id = c.id
+                AND c.geoname_id = ANY(%(geoname_ids)s)
+            """,
+            {"geoname_ids": geoname_ids},
+        )
+        cursor.execute(
+            """
+            DELETE FROM logistics_jobs.cities
+            WHERE geoname_id = ANY(%(geoname_ids)s)
+            """,
+            {"geoname_ids": geoname_ids},
+        )
+        city_count = cursor.rowcount
+        conn.commit()
+    return city_count